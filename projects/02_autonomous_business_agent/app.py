@@ -2,22 +2,106 @@ from __future__ import annotations
 
 import json
 import os
-from datetime import datetime
+import sys
+import time
+from datetime import datetime, timedelta
 from enum import Enum
-from typing import Any, Literal
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Literal
 
-from agents import Agent, Runner, function_tool
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Response
 from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import Index
 from sqlmodel import Field as SQLField
 from sqlmodel import SQLModel, Session, create_engine
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from shared.admission import AdmissionLimiter
+from shared.analytics import LogAnalytics, log_analytics
+from shared.cassette import Cassette
+from shared.db import SingleWriter, sync_tables, tune_sqlite
+from shared.idempotency import IdempotencyStore
+from shared.lanes import Lane, LaneScheduler, lane, resolve_lane
+from shared.lazy import Lazy, prewarm
+from shared.loop_monitor import LoopMonitor
+from shared.memory import AllocationSampler, MemoryDiagnostics
+from shared.model_calls import ModelCaller
+from shared.model_client import ModelClient
+from shared.profiling import ProfilerMiddleware
+from shared.prompts import build_input
+from shared.tracing import LocalTraceStore
+
+if TYPE_CHECKING:
+    from agents import Agent
+
 
 class Settings(BaseSettings):
     database_url: str = "sqlite:///./autonomous_business_agent.db"
     openai_api_key: str | None = None
     model_name: str = "gpt-4.1"
+    idempotency_ttl_seconds: int = 86400
+    idempotency_wait_seconds: float = 60.0
+    idempotency_lease_seconds: float = 30.0
+    model_deadline_seconds: float = 120.0
+    model_attempt_timeout_seconds: float = 60.0
+    model_max_attempts: int = 3
+    model_retry_backoff_seconds: float = 0.5
+    model_retry_backoff_max_seconds: float = 8.0
+    model_hedge_agents: list[str] = []
+    model_hedge_delay_seconds: float = 5.0
+    model_fallback_name: str | None = None
+    circuit_error_rate: float = 0.5
+    circuit_slow_call_seconds: float = 30.0
+    circuit_min_calls: int = 10
+    circuit_open_seconds: float = 30.0
+    model_cassette_mode: Literal["off", "record", "replay"] = "off"
+    model_cassette_path: str = "cassettes/autonomous_business_agent.jsonl"
+    model_cassette_latency_scale: float = 1.0
+    lazy_startup: bool = False
+    profile_sample_rate: float = 0.0
+    profile_dir: str = "profiles"
+    profile_interval_ms: float = 5.0
+    profile_min_duration_ms: float = 0.0
+    loop_monitor: bool = True
+    loop_probe_interval_ms: float = 100.0
+    loop_slow_callback_ms: float = 250.0
+    admin_token: str | None = None
+    memory_dir: str = "memory"
+    memory_trace_frames: int = 0
+    memory_sample_rate: float = 0.0
+    trace_store_enabled: bool = True
+    trace_store_path: str = "traces/autonomous_business_agent.db"
+    model_base_url: str | None = None
+    model_client_max_connections: int = 100
+    model_client_max_keepalive: int = 20
+    model_client_keepalive_seconds: float = 30.0
+    model_client_connect_timeout_seconds: float = 5.0
+    model_client_http2: bool = True
+    model_client_warmup: bool = True
+    model_client_warmup_url: str | None = None
+    model_client_warmup_connections: int = 2
+    lanes_enabled: bool = True
+    lane_limit: int = 8
+    lane_mode: Literal["weighted", "strict"] = "weighted"
+    lane_weights: dict[str, int] = {"interactive": 4, "batch": 1}
+    lane_reserved_interactive: int = 1
+    lane_max_wait_seconds: float = 30.0
+    sqlite_tuning: bool = True
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 268435456
+    sqlite_cache_size_kib: int = 16384
+    db_single_writer: bool = False
+    db_writer_batch_size: int = 64
+    admission_limit: int = 8
+    admission_queue_size: int = 16
+    admission_queue_timeout_seconds: float = 10.0
+    admission_adaptive: bool = True
+    admission_min_limit: int = 1
+    admission_max_limit: int = 32
+    admission_latency_target_ms: float = 30000.0
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
@@ -27,21 +111,100 @@ if settings.openai_api_key and not os.getenv("OPENAI_API_KEY"):
 
 connect_args = {"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
 engine = create_engine(settings.database_url, connect_args=connect_args)
+if settings.sqlite_tuning:
+    tune_sqlite(
+        engine,
+        busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+        synchronous=settings.sqlite_synchronous,
+        mmap_size=settings.sqlite_mmap_size,
+        cache_size_kib=settings.sqlite_cache_size_kib,
+    )
+db_writer = SingleWriter(engine, enabled=settings.db_single_writer, batch_size=settings.db_writer_batch_size)
+idempotency = IdempotencyStore(
+    engine,
+    settings.idempotency_ttl_seconds,
+    settings.idempotency_wait_seconds,
+    lease_seconds=settings.idempotency_lease_seconds,
+)
+cassette = (
+    Cassette(settings.model_cassette_path, settings.model_cassette_mode, settings.model_cassette_latency_scale)
+    if settings.model_cassette_mode != "off"
+    else None
+)
+lane_scheduler = LaneScheduler(
+    limit=settings.lane_limit,
+    mode=settings.lane_mode,
+    weights=settings.lane_weights,
+    reserved_interactive=settings.lane_reserved_interactive,
+    max_wait_seconds=settings.lane_max_wait_seconds,
+    enabled=settings.lanes_enabled,
+)
+model_calls = ModelCaller(
+    deadline_seconds=settings.model_deadline_seconds,
+    attempt_timeout_seconds=settings.model_attempt_timeout_seconds,
+    max_attempts=settings.model_max_attempts,
+    backoff_seconds=settings.model_retry_backoff_seconds,
+    backoff_max_seconds=settings.model_retry_backoff_max_seconds,
+    hedge_agents=settings.model_hedge_agents,
+    hedge_delay_seconds=settings.model_hedge_delay_seconds,
+    fallback_model=settings.model_fallback_name,
+    circuit_options={
+        "error_rate": settings.circuit_error_rate,
+        "slow_call_seconds": settings.circuit_slow_call_seconds,
+        "min_calls": settings.circuit_min_calls,
+        "open_seconds": settings.circuit_open_seconds,
+    },
+    cassette=cassette,
+    scheduler=lane_scheduler,
+)
+loop_monitor = LoopMonitor(
+    interval_seconds=settings.loop_probe_interval_ms / 1000,
+    slow_callback_seconds=settings.loop_slow_callback_ms / 1000,
+)
+trace_store = LocalTraceStore(settings.trace_store_path, enabled=settings.trace_store_enabled)
+model_client = ModelClient(
+    base_url=settings.model_base_url,
+    api_key=settings.openai_api_key,
+    max_connections=settings.model_client_max_connections,
+    max_keepalive_connections=settings.model_client_max_keepalive,
+    keepalive_seconds=settings.model_client_keepalive_seconds,
+    connect_timeout_seconds=settings.model_client_connect_timeout_seconds,
+    attempt_timeout_seconds=settings.model_attempt_timeout_seconds,
+    http2=settings.model_client_http2,
+    warmup_url=settings.model_client_warmup_url,
+    warmup_connections=settings.model_client_warmup_connections,
+)
+admission = AdmissionLimiter(
+    "business_task",
+    limit=settings.admission_limit,
+    queue_size=settings.admission_queue_size,
+    queue_timeout=settings.admission_queue_timeout_seconds,
+    adaptive=settings.admission_adaptive,
+    min_limit=settings.admission_min_limit,
+    max_limit=settings.admission_max_limit,
+    latency_target_ms=settings.admission_latency_target_ms,
+)
 
 
 class ActionLog(SQLModel, table=True):
     __tablename__ = "business_action_logs"
+    # Covering indexes for the analytics window queries (see shared/analytics.py).
+    __table_args__ = (
+        Index("ix_business_action_logs_task_created", "task", "created_at", "status", "latency_ms"),
+        Index("ix_business_action_logs_created", "created_at", "status", "latency_ms"),
+    )
 
     id: int | None = SQLField(default=None, primary_key=True)
     task: str
     request_json: str
     response_json: str
     status: str
+    latency_ms: int | None = None
     created_at: datetime = SQLField(default_factory=datetime.utcnow)
 
 
 def init_db() -> None:
-    SQLModel.metadata.create_all(engine)
+    sync_tables(engine, SQLModel.metadata)
 
 
 def get_session():
@@ -66,6 +229,7 @@ class BusinessTaskRequest(BaseModel):
     content: str | None = None
     platform: str | None = None
     metrics: dict[str, Any] | None = None
+    priority: Lane | None = None
 
 
 class BusinessTaskResponse(BaseModel):
@@ -86,27 +250,33 @@ class BusinessAgentOutput(BaseModel):
     metadata: dict[str, Any] = Field(default_factory=dict)
 
 
-@function_tool
 def estimate_email_send_count(email_list: list[str]) -> dict[str, int]:
     return {"emails_sent": len(email_list)}
 
 
-@function_tool
 def estimate_lead_count(lead_sources: list[str]) -> dict[str, int]:
     return {"lead_sources": len(lead_sources), "estimated_leads": max(5, len(lead_sources) * 10)}
 
 
-business_agent = Agent(
-    name="Autonomous Business Agent",
-    model=settings.model_name,
-    instructions=(
-        "You are an autonomous business agent. Responsibilities: lead generation, "
-        "email campaigns, social posting, scheduling, and metrics tracking. "
-        "Use tools where useful, keep logs in response metadata, and suggest next growth action."
-    ),
-    tools=[estimate_email_send_count, estimate_lead_count],
-    output_type=BusinessAgentOutput,
-)
+def build_business_agent() -> Agent:
+    from agents import Agent, function_tool
+
+    model_client.install()
+    trace_store.register()
+    return Agent(
+        name="Autonomous Business Agent",
+        model=settings.model_name,
+        instructions=(
+            "You are an autonomous business agent. Responsibilities: lead generation, "
+            "email campaigns, social posting, scheduling, and metrics tracking. "
+            "Use tools where useful, keep logs in response metadata, and suggest next growth action."
+        ),
+        tools=[function_tool(estimate_email_send_count), function_tool(estimate_lead_count)],
+        output_type=BusinessAgentOutput,
+    )
+
+
+business_agent = Lazy(build_business_agent)
 
 
 def extract_payload(req: BusinessTaskRequest) -> dict[str, Any]:
@@ -137,30 +307,14 @@ def extract_payload(req: BusinessTaskRequest) -> dict[str, Any]:
 
 
 async def run_business_task(task: str, payload: dict[str, Any]) -> BusinessAgentOutput:
-    result = await Runner.run(business_agent, json.dumps({"task": task, **payload}))
+    result = await model_calls.run(business_agent.get(), build_input({"task": task}, payload))
     return result.final_output
 
 
-app = FastAPI(title="Autonomous Business Agent API", version="1.0.0")
-
-
-@app.on_event("startup")
-def startup() -> None:
-    init_db()
-
-
-@app.get("/health")
-def health() -> dict[str, str]:
-    return {"status": "ok"}
-
-
-@app.post("/api/business_task", response_model=BusinessTaskResponse)
-async def business_task(req: BusinessTaskRequest, session: Session = Depends(get_session)) -> BusinessTaskResponse:
-    try:
-        payload = extract_payload(req)
-    except ValueError as exc:
-        raise HTTPException(status_code=422, detail=str(exc)) from exc
-
+async def process_business_task(
+    req: BusinessTaskRequest, payload: dict[str, Any], session: Session
+) -> BusinessTaskResponse:
+    started = time.perf_counter()
     try:
         output = await run_business_task(req.task.value, payload)
         response = BusinessTaskResponse(
@@ -183,14 +337,135 @@ async def business_task(req: BusinessTaskRequest, session: Session = Depends(get
         )
         status = "error"
 
-    session.add(
-        ActionLog(
-            task=req.task.value,
-            request_json=json.dumps(req.model_dump(), ensure_ascii=False),
-            response_json=json.dumps(response.model_dump(), ensure_ascii=False),
-            status=status,
-        )
+    log = ActionLog(
+        task=req.task.value,
+        request_json=json.dumps(req.model_dump(), ensure_ascii=False),
+        response_json=json.dumps(response.model_dump(), ensure_ascii=False),
+        status=status,
+        latency_ms=int((time.perf_counter() - started) * 1000),
     )
-    session.commit()
+    await db_writer.run(lambda db: db.add(log), session)
     return response
 
+
+app = FastAPI(title="Autonomous Business Agent API", version="1.0.0")
+if settings.profile_sample_rate > 0:
+    app.add_middleware(
+        ProfilerMiddleware,
+        directory=settings.profile_dir,
+        sample_rate=settings.profile_sample_rate,
+        interval_ms=settings.profile_interval_ms,
+        min_duration_ms=settings.profile_min_duration_ms,
+    )
+memory = MemoryDiagnostics(settings.memory_dir)
+app.include_router(memory.router(settings.admin_token))
+if settings.memory_sample_rate > 0:
+    app.add_middleware(AllocationSampler, diagnostics=memory, sample_rate=settings.memory_sample_rate)
+
+
+@app.on_event("startup")
+def startup() -> None:
+    init_db()
+    idempotency.purge_expired()
+    if settings.lazy_startup:
+        prewarm(business_agent)
+    else:
+        business_agent.get()
+    if settings.loop_monitor:
+        loop_monitor.start()
+    if settings.memory_trace_frames > 0:
+        memory.start(settings.memory_trace_frames)
+    if settings.model_client_warmup:
+        model_client.start_warm_up()
+
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    loop_monitor.stop()
+    trace_store.force_flush()
+    await model_client.aclose()
+    await db_writer.close()
+
+
+@app.get("/health")
+def health() -> dict[str, str]:
+    return {"status": "ok"}
+
+
+@app.get("/api/model_calls")
+def model_call_metrics() -> dict[str, Any]:
+    return model_calls.metrics()
+
+
+@app.get("/api/loop")
+def loop_metrics() -> dict[str, Any]:
+    return {"loop": loop_monitor.metrics(), "model_runs": model_calls.in_flight()}
+
+
+@app.get("/api/traces")
+def trace_store_metrics() -> dict[str, Any]:
+    return trace_store.metrics()
+
+
+@app.get("/api/model_client")
+def model_client_metrics() -> dict[str, Any]:
+    return model_client.metrics()
+
+
+@app.get("/api/lanes")
+def lane_metrics() -> dict[str, Any]:
+    return lane_scheduler.metrics()
+
+
+@app.get("/api/admission")
+def admission_metrics() -> dict[str, Any]:
+    return {admission.name: admission.metrics()}
+
+
+@app.post("/api/business_task", response_model=BusinessTaskResponse)
+async def business_task(
+    req: BusinessTaskRequest,
+    response: Response,
+    session: Session = Depends(get_session),
+    idempotency_key: str | None = Header(default=None),
+    x_priority: str | None = Header(default=None),
+) -> BusinessTaskResponse:
+    try:
+        payload = extract_payload(req)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+
+    with lane(resolve_lane(req.priority, x_priority)):
+        result, replayed = await idempotency.run(
+            "business_task",
+            idempotency_key,
+            req.model_dump(mode="json"),
+            BusinessTaskResponse,
+            lambda: admission.run(process_business_task, req, payload, session),
+        )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+
+@app.get("/api/analytics", response_model=LogAnalytics)
+def action_analytics(
+    task: BusinessTaskType | None = None,
+    window_minutes: int = Query(default=60, ge=1, le=43200),
+    bucket_minutes: int | None = Query(default=None, ge=1),
+    until: datetime | None = None,
+    session: Session = Depends(get_session),
+) -> LogAnalytics:
+    end = until or datetime.utcnow()
+    bucket = bucket_minutes or max(1, window_minutes // 12)
+    try:
+        return log_analytics(
+            session,
+            ActionLog,
+            {"task": task.value if task else None},
+            since=end - timedelta(minutes=window_minutes),
+            until=end,
+            bucket_seconds=bucket * 60,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
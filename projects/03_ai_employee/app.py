@@ -1,23 +1,121 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import logging
 import os
-from datetime import datetime
+import socket
+import sys
+import threading
+from datetime import datetime, timedelta
 from enum import Enum
-from typing import Literal
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Literal
+from uuid import uuid4
 
-from agents import Agent, Runner
-from fastapi import Depends, FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import Index, and_, case, inspect, or_, text, update
 from sqlmodel import Field as SQLField
 from sqlmodel import SQLModel, Session, create_engine, select
 
+from blobs import get_blobs, put_blob
+from dedupe import SimilarityIndex
+from task_events import TERMINAL_STATUSES, TaskEvent, TaskEventBroker, listen_postgres, poll_changes
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from shared.cassette import Cassette
+from shared.db import sync_tables, tune_sqlite
+from shared.idempotency import IdempotencyStore
+from shared.lanes import Lane, LaneScheduler, lane, resolve_lane
+from shared.lazy import Lazy, prewarm
+from shared.loop_monitor import LoopMonitor
+from shared.memory import AllocationSampler, MemoryDiagnostics
+from shared.model_calls import ModelCaller
+from shared.model_client import ModelClient
+from shared.profiling import ProfilerMiddleware
+from shared.prompts import build_input
+from shared.tracing import LocalTraceStore
+
+if TYPE_CHECKING:
+    from agents import Agent
+
 
 class Settings(BaseSettings):
     database_url: str = "sqlite:///./ai_employee.db"
     openai_api_key: str | None = None
     model_name: str = "gpt-4.1"
+    task_lease_seconds: int = 300
+    task_max_attempts: int = 3
+    task_retry_backoff_seconds: float = 5.0
+    worker_concurrency: int = 4
+    worker_poll_interval: float = 1.0
+    run_embedded_worker: bool = False
+    task_events_backend: Literal["auto", "local", "poll", "postgres"] = "auto"
+    task_events_channel: str = "employee_task_events"
+    task_events_poll_interval: float = 1.0
+    task_events_poll_overlap_seconds: float = 5.0
+    task_events_keepalive_seconds: float = 15.0
+    dedupe_enabled: bool = False
+    dedupe_threshold: float = 0.85
+    dedupe_task_types: list[str] = ["write_content", "do_research"]
+    dedupe_default_action: Literal["reuse", "offer"] = "offer"
+    blob_compression: Literal["none", "zlib"] = "zlib"
+    blob_compression_min_bytes: int = 1024
+    idempotency_ttl_seconds: int = 86400
+    idempotency_wait_seconds: float = 60.0
+    idempotency_lease_seconds: float = 30.0
+    model_deadline_seconds: float = 120.0
+    model_attempt_timeout_seconds: float = 60.0
+    model_max_attempts: int = 3
+    model_retry_backoff_seconds: float = 0.5
+    model_retry_backoff_max_seconds: float = 8.0
+    model_hedge_agents: list[str] = []
+    model_hedge_delay_seconds: float = 5.0
+    model_fallback_name: str | None = None
+    circuit_error_rate: float = 0.5
+    circuit_slow_call_seconds: float = 30.0
+    circuit_min_calls: int = 10
+    circuit_open_seconds: float = 30.0
+    model_cassette_mode: Literal["off", "record", "replay"] = "off"
+    model_cassette_path: str = "cassettes/ai_employee.jsonl"
+    model_cassette_latency_scale: float = 1.0
+    lazy_startup: bool = False
+    profile_sample_rate: float = 0.0
+    profile_dir: str = "profiles"
+    profile_interval_ms: float = 5.0
+    profile_min_duration_ms: float = 0.0
+    loop_monitor: bool = True
+    loop_probe_interval_ms: float = 100.0
+    loop_slow_callback_ms: float = 250.0
+    admin_token: str | None = None
+    memory_dir: str = "memory"
+    memory_trace_frames: int = 0
+    memory_sample_rate: float = 0.0
+    trace_store_enabled: bool = True
+    trace_store_path: str = "traces/ai_employee.db"
+    model_base_url: str | None = None
+    model_client_max_connections: int = 100
+    model_client_max_keepalive: int = 20
+    model_client_keepalive_seconds: float = 30.0
+    model_client_connect_timeout_seconds: float = 5.0
+    model_client_http2: bool = True
+    model_client_warmup: bool = True
+    model_client_warmup_url: str | None = None
+    model_client_warmup_connections: int = 2
+    lanes_enabled: bool = True
+    lane_limit: int = 8
+    lane_mode: Literal["weighted", "strict"] = "weighted"
+    lane_weights: dict[str, int] = {"interactive": 4, "batch": 1}
+    lane_reserved_interactive: int = 1
+    lane_max_wait_seconds: float = 30.0
+    sqlite_tuning: bool = True
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 268435456
+    sqlite_cache_size_kib: int = 16384
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
@@ -27,26 +125,162 @@ if settings.openai_api_key and not os.getenv("OPENAI_API_KEY"):
 
 connect_args = {"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
 engine = create_engine(settings.database_url, connect_args=connect_args)
+if settings.sqlite_tuning:
+    tune_sqlite(
+        engine,
+        busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+        synchronous=settings.sqlite_synchronous,
+        mmap_size=settings.sqlite_mmap_size,
+        cache_size_kib=settings.sqlite_cache_size_kib,
+    )
+idempotency = IdempotencyStore(
+    engine,
+    settings.idempotency_ttl_seconds,
+    settings.idempotency_wait_seconds,
+    lease_seconds=settings.idempotency_lease_seconds,
+)
+cassette = (
+    Cassette(settings.model_cassette_path, settings.model_cassette_mode, settings.model_cassette_latency_scale)
+    if settings.model_cassette_mode != "off"
+    else None
+)
+lane_scheduler = LaneScheduler(
+    limit=settings.lane_limit,
+    mode=settings.lane_mode,
+    weights=settings.lane_weights,
+    reserved_interactive=settings.lane_reserved_interactive,
+    max_wait_seconds=settings.lane_max_wait_seconds,
+    enabled=settings.lanes_enabled,
+)
+model_calls = ModelCaller(
+    deadline_seconds=settings.model_deadline_seconds,
+    attempt_timeout_seconds=settings.model_attempt_timeout_seconds,
+    max_attempts=settings.model_max_attempts,
+    backoff_seconds=settings.model_retry_backoff_seconds,
+    backoff_max_seconds=settings.model_retry_backoff_max_seconds,
+    hedge_agents=settings.model_hedge_agents,
+    hedge_delay_seconds=settings.model_hedge_delay_seconds,
+    fallback_model=settings.model_fallback_name,
+    circuit_options={
+        "error_rate": settings.circuit_error_rate,
+        "slow_call_seconds": settings.circuit_slow_call_seconds,
+        "min_calls": settings.circuit_min_calls,
+        "open_seconds": settings.circuit_open_seconds,
+    },
+    cassette=cassette,
+    scheduler=lane_scheduler,
+)
+loop_monitor = LoopMonitor(
+    interval_seconds=settings.loop_probe_interval_ms / 1000,
+    slow_callback_seconds=settings.loop_slow_callback_ms / 1000,
+)
+trace_store = LocalTraceStore(settings.trace_store_path, enabled=settings.trace_store_enabled)
+model_client = ModelClient(
+    base_url=settings.model_base_url,
+    api_key=settings.openai_api_key,
+    max_connections=settings.model_client_max_connections,
+    max_keepalive_connections=settings.model_client_max_keepalive,
+    keepalive_seconds=settings.model_client_keepalive_seconds,
+    connect_timeout_seconds=settings.model_client_connect_timeout_seconds,
+    attempt_timeout_seconds=settings.model_attempt_timeout_seconds,
+    http2=settings.model_client_http2,
+    warmup_url=settings.model_client_warmup_url,
+    warmup_connections=settings.model_client_warmup_connections,
+)
+logger = logging.getLogger("ai_employee")
 
 
 class EmployeeTask(SQLModel, table=True):
     __tablename__ = "employee_tasks"
+    __table_args__ = (
+        Index("ix_employee_tasks_queue", "status", "available_at"),
+        Index("ix_employee_tasks_status_id", "status", "id"),
+        Index("ix_employee_tasks_task_type_id", "task_type", "id"),
+        Index("ix_employee_tasks_created_at", "created_at"),
+        Index("ix_employee_tasks_updated_at", "updated_at"),
+    )
 
     id: int | None = SQLField(default=None, primary_key=True)
     task_type: str
     description: str
     language: str | None = None
     requires_human_approval: bool = False
+    priority: str = "interactive"
     status: str = "created"
-    result: str | None = None
-    documentation: str | None = None
+    # Bodies live in employee_task_blobs (see blobs.py); rows keep only digests.
+    result_digest: str | None = SQLField(default=None, max_length=64)
+    documentation_digest: str | None = SQLField(default=None, max_length=64)
     next_task_suggestion: str | None = None
+    duplicate_of: int | None = None
+    attempts: int = 0
+    last_error: str | None = None
+    available_at: datetime = SQLField(default_factory=datetime.utcnow)
+    lease_owner: str | None = None
+    lease_expires_at: datetime | None = None
     created_at: datetime = SQLField(default_factory=datetime.utcnow)
     updated_at: datetime = SQLField(default_factory=datetime.utcnow)
 
 
+# Defaults for NOT NULL columns added to an existing employee_tasks table.
+UPGRADE_COLUMN_DEFAULTS = {"employee_tasks.attempts": "0", "employee_tasks.priority": "'interactive'"}
+
+
+def upgrade_schema() -> None:
+    """Bring tables created by an older release up to the models.
+
+    ``sync_tables`` adds the missing columns and indexes (queue and lease state,
+    ``duplicate_of``, ``priority``); the API and every worker may run it at once. Rows
+    from before the queue get ``available_at`` from ``created_at`` so queued ones are
+    claimable right away; this also completes an upgrade that stopped between the two.
+    """
+    sync_tables(engine, SQLModel.metadata, UPGRADE_COLUMN_DEFAULTS)
+    table = EmployeeTask.__table__.name
+    with engine.begin() as conn:
+        conn.execute(text(f"UPDATE {table} SET available_at = created_at WHERE available_at IS NULL"))
+
+
+def backfill_blobs(batch_size: int = 500) -> int:
+    """Move bodies left in the legacy ``result``/``documentation`` columns into blobs.
+
+    Each batch stores the bodies with ``put_blob``, sets the digests and clears the
+    legacy columns in one transaction, so an interrupted backfill resumes where it
+    stopped. Returns the number of rows moved.
+    """
+    table = EmployeeTask.__table__.name
+    legacy = {column["name"] for column in inspect(engine).get_columns(table)} & {"result", "documentation"}
+    if legacy != {"result", "documentation"}:
+        return 0
+    pending = text(
+        f"SELECT id, result, documentation FROM {table} "
+        "WHERE id > :after AND (result IS NOT NULL OR documentation IS NOT NULL) ORDER BY id LIMIT :limit"
+    )
+    move = text(
+        f"UPDATE {table} SET result_digest = :result_digest, documentation_digest = :documentation_digest, "
+        "result = NULL, documentation = NULL WHERE id = :id"
+    )
+    moved, after = 0, 0
+    while True:
+        with Session(engine) as session:
+            rows = session.execute(pending, {"after": after, "limit": batch_size}).all()
+            if not rows:
+                return moved
+            for task_id, result, documentation in rows:
+                digests = {
+                    name: put_blob(session, body, settings.blob_compression, settings.blob_compression_min_bytes)
+                    if body is not None
+                    else None
+                    for name, body in (("result_digest", result), ("documentation_digest", documentation))
+                }
+                session.execute(move, {"id": task_id, **digests})
+            session.commit()
+        moved += len(rows)
+        after = rows[-1][0]
+        logger.info("moved %d task bodies to employee_task_blobs", moved)
+
+
 def init_db() -> None:
-    SQLModel.metadata.create_all(engine)
+    upgrade_schema()
+    backfill_blobs()
 
 
 def get_session():
@@ -66,6 +300,8 @@ class EmployeeTaskCreate(BaseModel):
     description: str
     language: str | None = None
     requires_human_approval: bool = False
+    on_duplicate: Literal["reuse", "offer", "run"] | None = None
+    priority: Lane | None = None
 
 
 class EmployeeTaskRead(BaseModel):
@@ -75,6 +311,47 @@ class EmployeeTaskRead(BaseModel):
     result: str | None
     documentation: str | None
     next_task_suggestion: str | None
+    duplicate_of: int | None = None
+    duplicate_result: str | None = None
+    priority: str = "interactive"
+
+
+class EmployeeTaskSummary(BaseModel):
+    id: int
+    task: str
+    status: str
+    next_task_suggestion: str | None
+    created_at: datetime
+    updated_at: datetime
+
+
+class EmployeeTaskPage(BaseModel):
+    items: list[EmployeeTaskRead] | list[EmployeeTaskSummary]
+    next_cursor: int | None = None
+
+
+class BulkApprovalFilter(BaseModel):
+    task_type: EmployeeTaskType | None = None
+    created_after: datetime | None = None
+    created_before: datetime | None = None
+
+
+class BulkApprovalRequest(BaseModel):
+    ids: list[int] | None = None
+    filter: BulkApprovalFilter | None = None
+    limit: int = Field(default=500, ge=1, le=5000)
+
+
+class BulkApprovalItem(BaseModel):
+    id: int
+    approved: bool
+    status: str | None
+
+
+class BulkApprovalResponse(BaseModel):
+    approved: int
+    skipped: int
+    items: list[BulkApprovalItem]
 
 
 class EmployeeOutput(BaseModel):
@@ -84,66 +361,526 @@ class EmployeeOutput(BaseModel):
     next_task_suggestion: str
 
 
-employee_agent = Agent(
-    name="AI Employee",
-    model=settings.model_name,
-    instructions=(
-        "You are an AI Employee in a company. Receive task input, execute it autonomously, "
-        "document your work, and suggest the next task. Notify humans only for approval or errors."
-    ),
-    output_type=EmployeeOutput,
-)
+def build_employee_agent() -> Agent:
+    from agents import Agent
+
+    model_client.install()
+    trace_store.register()
+    return Agent(
+        name="AI Employee",
+        model=settings.model_name,
+        instructions=(
+            "You are an AI Employee in a company. Receive task input, execute it autonomously, "
+            "document your work, and suggest the next task. Notify humans only for approval or errors."
+        ),
+        output_type=EmployeeOutput,
+    )
+
+
+employee_agent = Lazy(build_employee_agent)
 
 
 async def run_employee_task(task_type: str, description: str, language: str | None) -> EmployeeOutput:
-    payload = {"task": task_type, "description": description, "language": language}
-    result = await Runner.run(employee_agent, json.dumps(payload))
+    prompt = build_input({"task": task_type, "language": language}, {"description": description})
+    result = await model_calls.run(employee_agent.get(), prompt)
     return result.final_output
 
 
-def to_read(task: EmployeeTask) -> EmployeeTaskRead:
+def store_body(session: Session, text: str) -> str:
+    return put_blob(session, text, settings.blob_compression, settings.blob_compression_min_bytes)
+
+
+def to_read(task: EmployeeTask, bodies: dict[str, str]) -> EmployeeTaskRead:
     return EmployeeTaskRead(
         id=task.id or 0,
         task=task.task_type,
         status=task.status,
-        result=task.result,
-        documentation=task.documentation,
+        result=bodies.get(task.result_digest or ""),
+        documentation=bodies.get(task.documentation_digest or ""),
         next_task_suggestion=task.next_task_suggestion,
+        duplicate_of=task.duplicate_of,
+        priority=task.priority,
+    )
+
+
+def read_task(session: Session, task: EmployeeTask) -> EmployeeTaskRead:
+    return to_read(task, get_blobs(session, [task.result_digest, task.documentation_digest]))
+
+
+task_events = TaskEventBroker()
+
+
+def task_events_backend() -> str:
+    if settings.task_events_backend != "auto":
+        return settings.task_events_backend
+    return "postgres" if engine.dialect.name == "postgresql" else "poll"
+
+
+def publish_task_event(session: Session, task_id: int, status: str, updated_at: datetime | None = None) -> None:
+    event = TaskEvent(task_id=task_id, status=status, updated_at=updated_at or datetime.utcnow())
+    if task_events_backend() == "postgres":
+        # Delivered to every listening API process, including this one.
+        session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": settings.task_events_channel, "payload": event.to_json()},
+        )
+        session.commit()
+    else:
+        task_events.publish(event)
+
+
+def fetch_task_events(ids: set[int] | None, after: tuple[datetime, int]) -> list[TaskEvent]:
+    since, last_id = after
+    query = select(EmployeeTask.id, EmployeeTask.status, EmployeeTask.updated_at).where(
+        or_(
+            EmployeeTask.updated_at > since,
+            and_(EmployeeTask.updated_at == since, EmployeeTask.id > last_id),
+        )
+    )
+    if ids is not None:
+        query = query.where(EmployeeTask.id.in_(ids))
+    with Session(engine) as session:
+        rows = session.exec(query.order_by(EmployeeTask.updated_at, EmployeeTask.id)).all()
+    return [TaskEvent(task_id=row.id, status=row.status, updated_at=row.updated_at) for row in rows]
+
+
+similar_tasks = SimilarityIndex()
+
+
+def dedupe_kind(task_type: str, language: str | None) -> str:
+    return f"{task_type}:{language or ''}"
+
+
+def load_completed_descriptions(ids: list[int]) -> dict[int, str]:
+    with Session(engine) as session:
+        rows = session.exec(
+            select(EmployeeTask.id, EmployeeTask.description).where(
+                EmployeeTask.id.in_(ids), EmployeeTask.status == "completed"
+            )
+        ).all()
+    return dict(rows)
+
+
+def find_duplicate(req: EmployeeTaskCreate) -> tuple[int, float] | None:
+    return similar_tasks.best_match(
+        req.description,
+        dedupe_kind(req.task.value, req.language),
+        settings.dedupe_threshold,
+        load_completed_descriptions,
+    )
+
+
+def index_completed_tasks(task_ids: list[int] | None = None, batch_size: int = 5000) -> None:
+    """Add completed, non-duplicate tasks to the similarity index.
+
+    Without ``task_ids`` the whole table is indexed in keyset batches.
+    """
+    base = select(EmployeeTask.id, EmployeeTask.description, EmployeeTask.task_type, EmployeeTask.language).where(
+        EmployeeTask.status == "completed",
+        EmployeeTask.duplicate_of.is_(None),
+        EmployeeTask.task_type.in_(settings.dedupe_task_types),
     )
+    if task_ids is not None:
+        base = base.where(EmployeeTask.id.in_(task_ids))
+    after = 0
+    while True:
+        with Session(engine) as session:
+            rows = session.exec(base.where(EmployeeTask.id > after).order_by(EmployeeTask.id).limit(batch_size)).all()
+        similar_tasks.add_many((row.id, row.description, dedupe_kind(row.task_type, row.language)) for row in rows)
+        if len(rows) < batch_size:
+            return
+        after = rows[-1].id
+
 
+async def keep_similarity_index(stop: asyncio.Event) -> None:
+    # Completed tasks are finished by worker processes; their status events are
+    # how this process learns about them.
+    queue = task_events.subscribe()
+    try:
+        await asyncio.to_thread(index_completed_tasks)
+        logger.info("Similarity index loaded with %s tasks", len(similar_tasks))
+        while not stop.is_set():
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=1.0)
+            except asyncio.TimeoutError:
+                continue
+            if event.status == "completed":
+                await asyncio.to_thread(index_completed_tasks, [event.task_id])
+    finally:
+        task_events.unsubscribe(queue)
 
-async def execute_task(task: EmployeeTask, session: Session) -> EmployeeTask:
-    task.status = "in_progress"
-    task.updated_at = datetime.utcnow()
+
+def enqueue_task(task: EmployeeTask, session: Session) -> EmployeeTask:
+    now = datetime.utcnow()
+    task.status = "queued"
+    task.available_at = now
+    task.updated_at = now
     session.add(task)
     session.commit()
     session.refresh(task)
+    publish_task_event(session, task.id or 0, task.status, task.updated_at)
+    return task
+
+
+def approve_pending_tasks(session: Session, req: BulkApprovalRequest) -> list[int]:
+    """Move matching ``pending_approval`` tasks to ``queued`` in one statement.
+
+    Rows locked by a concurrent approval are skipped rather than waited on
+    (``SKIP LOCKED`` on PostgreSQL), and rows that already left ``pending_approval``
+    never match, so they are reported as skipped.
+    """
+    candidates = select(EmployeeTask.id).where(EmployeeTask.status == "pending_approval")
+    if req.ids is not None:
+        candidates = candidates.where(EmployeeTask.id.in_(req.ids))
+    if req.filter is not None:
+        if req.filter.task_type:
+            candidates = candidates.where(EmployeeTask.task_type == req.filter.task_type.value)
+        if req.filter.created_after:
+            candidates = candidates.where(EmployeeTask.created_at >= req.filter.created_after)
+        if req.filter.created_before:
+            candidates = candidates.where(EmployeeTask.created_at < req.filter.created_before)
+    candidates = candidates.order_by(EmployeeTask.id).limit(req.limit).with_for_update(skip_locked=True)
+
+    now = datetime.utcnow()
+    approved = session.execute(
+        update(EmployeeTask)
+        .where(EmployeeTask.id.in_(candidates.scalar_subquery()), EmployeeTask.status == "pending_approval")
+        .values(status="queued", available_at=now, updated_at=now)
+        .returning(EmployeeTask.id)
+    ).scalars().all()
+    session.commit()
+    for task_id in approved:
+        publish_task_event(session, task_id, "queued", now)
+    return sorted(approved)
 
+
+def claimable(now: datetime):
+    # A task is claimable when it is queued and due, or when a worker's lease has
+    # expired (the worker crashed or stalled) and retries remain.
+    return or_(
+        and_(EmployeeTask.status == "queued", EmployeeTask.available_at <= now),
+        and_(
+            EmployeeTask.status == "in_progress",
+            EmployeeTask.lease_expires_at < now,
+            EmployeeTask.attempts < settings.task_max_attempts,
+        ),
+    )
+
+
+def claim_order(now: datetime):
+    # Interactive tasks are claimed first. A batch task that has been due for longer
+    # than LANE_MAX_WAIT_SECONDS ranks with them, so batch work is delayed, not starved.
+    fresh_batch = and_(
+        EmployeeTask.priority == "batch",
+        EmployeeTask.available_at > now - timedelta(seconds=settings.lane_max_wait_seconds),
+    )
+    return case((fresh_batch, 1), else_=0)
+
+
+def claim_task(session: Session, worker_id: str) -> tuple[EmployeeTask, str] | None:
+    """Atomically lease the next due task to ``worker_id``.
+
+    On PostgreSQL the candidate row is selected with ``FOR UPDATE SKIP LOCKED`` so
+    concurrent workers never wait on each other. SQLite ignores the lock clause; there
+    the conditional UPDATE acts as compare-and-set, because SQLite serializes writers.
+    """
+    for _ in range(3):
+        now = datetime.utcnow()
+        task_id = session.exec(
+            select(EmployeeTask.id)
+            .where(claimable(now))
+            .order_by(claim_order(now), EmployeeTask.available_at, EmployeeTask.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).first()
+        if task_id is None:
+            session.commit()
+            return None
+
+        token = f"{worker_id}:{uuid4().hex}"
+        claimed = session.execute(
+            update(EmployeeTask)
+            .where(EmployeeTask.id == task_id, claimable(now))
+            .values(
+                status="in_progress",
+                lease_owner=token,
+                lease_expires_at=now + timedelta(seconds=settings.task_lease_seconds),
+                attempts=EmployeeTask.attempts + 1,
+                updated_at=now,
+            )
+        ).rowcount
+        session.commit()
+        if claimed == 1:
+            publish_task_event(session, task_id, "in_progress", now)
+            task = session.get(EmployeeTask, task_id)
+            if task is not None:
+                return task, token
+    return None
+
+
+def renew_lease(session: Session, task_id: int, token: str) -> bool:
+    now = datetime.utcnow()
+    renewed = session.execute(
+        update(EmployeeTask)
+        .where(EmployeeTask.id == task_id, EmployeeTask.lease_owner == token)
+        .values(lease_expires_at=now + timedelta(seconds=settings.task_lease_seconds))
+    ).rowcount
+    session.commit()
+    return renewed == 1
+
+
+def finish_task(session: Session, task_id: int, token: str, **values) -> bool:
+    # Fenced on the lease token: a worker whose lease expired and was re-claimed
+    # by another worker cannot overwrite the newer attempt.
+    for body in ("result", "documentation"):
+        if body in values:
+            values[f"{body}_digest"] = store_body(session, values.pop(body))
+    now = datetime.utcnow()
+    finished = session.execute(
+        update(EmployeeTask)
+        .where(EmployeeTask.id == task_id, EmployeeTask.lease_owner == token)
+        .values(lease_owner=None, lease_expires_at=None, updated_at=now, **values)
+    ).rowcount
+    session.commit()
+    if finished == 1 and "status" in values:
+        publish_task_event(session, task_id, values["status"], now)
+    return finished == 1
+
+
+def fail_exhausted_tasks(session: Session) -> int:
+    now = datetime.utcnow()
+    exhausted = and_(
+        EmployeeTask.status == "in_progress",
+        EmployeeTask.lease_expires_at < now,
+        EmployeeTask.attempts >= settings.task_max_attempts,
+    )
+    task_ids = session.exec(select(EmployeeTask.id).where(exhausted)).all()
+    if not task_ids:
+        session.commit()
+        return 0
+    failed = session.execute(
+        update(EmployeeTask)
+        .where(EmployeeTask.id.in_(task_ids), exhausted)
+        .values(
+            status="failed",
+            result_digest=store_body(session, "Task failed: worker lease expired on final attempt"),
+            documentation_digest=store_body(session, "Execution error encountered."),
+            next_task_suggestion="Manual intervention required.",
+            lease_owner=None,
+            lease_expires_at=None,
+            updated_at=now,
+        )
+    ).rowcount
+    session.commit()
+    for task_id in task_ids:
+        publish_task_event(session, task_id, "failed", now)
+    return failed
+
+
+async def execute_claimed_task(task: EmployeeTask, token: str) -> None:
+    task_id = task.id or 0
+
+    async def keep_lease() -> None:
+        while True:
+            await asyncio.sleep(settings.task_lease_seconds / 3)
+            with Session(engine) as session:
+                if not renew_lease(session, task_id, token):
+                    logger.warning("Lost lease on task %s", task_id)
+                    return
+
+    heartbeat = asyncio.create_task(keep_lease())
     try:
-        output = await run_employee_task(task.task_type, task.description, task.language)
-        task.status = output.status
-        task.result = output.result
-        task.documentation = output.documentation
-        task.next_task_suggestion = output.next_task_suggestion
+        with lane(task.priority):
+            output = await run_employee_task(task.task_type, task.description, task.language)
     except Exception as exc:
-        task.status = "failed"
-        task.result = f"Task failed: {exc}"
-        task.documentation = "Execution error encountered."
-        task.next_task_suggestion = "Manual intervention required."
+        error = f"Task failed: {exc}"
+        with Session(engine) as session:
+            if task.attempts < settings.task_max_attempts:
+                delay = settings.task_retry_backoff_seconds * 2 ** (task.attempts - 1)
+                finish_task(
+                    session,
+                    task_id,
+                    token,
+                    status="queued",
+                    last_error=error,
+                    available_at=datetime.utcnow() + timedelta(seconds=delay),
+                )
+            else:
+                finish_task(
+                    session,
+                    task_id,
+                    token,
+                    status="failed",
+                    last_error=error,
+                    result=error,
+                    documentation="Execution error encountered.",
+                    next_task_suggestion="Manual intervention required.",
+                )
+        return
+    finally:
+        heartbeat.cancel()
+
+    with Session(engine) as session:
+        finish_task(
+            session,
+            task_id,
+            token,
+            status=output.status,
+            result=output.result,
+            documentation=output.documentation,
+            next_task_suggestion=output.next_task_suggestion,
+        )
+
+
+async def run_worker(
+    worker_id: str | None = None,
+    concurrency: int | None = None,
+    stop: asyncio.Event | None = None,
+) -> None:
+    """Claim and execute queued tasks until ``stop`` is set."""
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    stop = stop or asyncio.Event()
+    slots = asyncio.Semaphore(concurrency or settings.worker_concurrency)
+    running: set[asyncio.Task] = set()
+
+    while not stop.is_set():
+        await slots.acquire()
+        try:
+            with Session(engine) as session:
+                fail_exhausted_tasks(session)
+                claimed = claim_task(session, worker_id)
+        except Exception:
+            logger.exception("Worker %s failed to claim a task", worker_id)
+            claimed = None
+
+        if claimed is None:
+            slots.release()
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.worker_poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        job = asyncio.create_task(execute_claimed_task(*claimed))
+        running.add(job)
+        job.add_done_callback(running.discard)
+        job.add_done_callback(lambda _: slots.release())
+
+    # Leases of unfinished tasks expire and another worker picks them up.
+    for job in running:
+        job.cancel()
+    await asyncio.gather(*running, return_exceptions=True)
+
+
+async def submit_task(req: EmployeeTaskCreate, session: Session, priority: str = "interactive") -> EmployeeTaskRead:
+    task = EmployeeTask(
+        task_type=req.task.value,
+        description=req.description,
+        language=req.language,
+        requires_human_approval=req.requires_human_approval,
+        priority=priority,
+        status="pending_approval" if req.requires_human_approval else "queued",
+    )
+
+    offered_digest = None
+    action = req.on_duplicate or settings.dedupe_default_action
+    if settings.dedupe_enabled and action != "run" and req.task.value in settings.dedupe_task_types:
+        match = await asyncio.to_thread(find_duplicate, req)
+        previous = session.get(EmployeeTask, match[0]) if match else None
+        if previous is not None:
+            task.duplicate_of = previous.id
+            if action == "reuse":
+                task.status = "completed"
+                task.result_digest = previous.result_digest
+                task.documentation_digest = previous.documentation_digest
+                task.next_task_suggestion = previous.next_task_suggestion
+            else:
+                # Held for a human, who gets the previous result to reuse; approving
+                # the task runs it anyway.
+                task.status = "pending_approval"
+                offered_digest = previous.result_digest
 
-    task.updated_at = datetime.utcnow()
     session.add(task)
     session.commit()
     session.refresh(task)
-    return task
+    publish_task_event(session, task.id or 0, task.status, task.updated_at)
+    read = read_task(session, task)
+    if offered_digest is not None:
+        read.duplicate_result = get_blobs(session, [offered_digest]).get(offered_digest)
+    return read
 
 
 app = FastAPI(title="AI Employee API", version="1.0.0")
+if settings.profile_sample_rate > 0:
+    app.add_middleware(
+        ProfilerMiddleware,
+        directory=settings.profile_dir,
+        sample_rate=settings.profile_sample_rate,
+        interval_ms=settings.profile_interval_ms,
+        min_duration_ms=settings.profile_min_duration_ms,
+    )
+memory = MemoryDiagnostics(settings.memory_dir)
+app.include_router(memory.router(settings.admin_token))
+if settings.memory_sample_rate > 0:
+    app.add_middleware(AllocationSampler, diagnostics=memory, sample_rate=settings.memory_sample_rate)
+
+
+background_stop = asyncio.Event()
+listener_stop = threading.Event()
+
+
+def connect_listener():
+    cargs, cparams = engine.dialect.create_connect_args(engine.url)
+    return engine.dialect.connect(*cargs, **cparams)
 
 
 @app.on_event("startup")
 def startup() -> None:
     init_db()
+    idempotency.purge_expired()
+    if settings.lazy_startup:
+        prewarm(employee_agent)
+    else:
+        employee_agent.get()
+    if settings.loop_monitor:
+        loop_monitor.start()
+    if settings.memory_trace_frames > 0:
+        memory.start(settings.memory_trace_frames)
+    if settings.model_client_warmup:
+        model_client.start_warm_up()
+    loop = asyncio.get_running_loop()
+    if settings.run_embedded_worker:
+        loop.create_task(run_worker(stop=background_stop))
+
+    backend = task_events_backend()
+    if backend == "postgres":
+        threading.Thread(
+            target=listen_postgres,
+            args=(connect_listener, settings.task_events_channel, task_events, listener_stop),
+            name="task-events-listener",
+            daemon=True,
+        ).start()
+    elif backend == "poll":
+        loop.create_task(
+            poll_changes(
+                fetch_task_events,
+                task_events,
+                settings.task_events_poll_interval,
+                background_stop,
+                settings.task_events_poll_overlap_seconds,
+            )
+        )
+    if settings.dedupe_enabled:
+        loop.create_task(keep_similarity_index(background_stop))
+
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    loop_monitor.stop()
+    trace_store.force_flush()
+    await model_client.aclose()
+    background_stop.set()
+    listener_stop.set()
 
 
 @app.get("/health")
@@ -151,24 +888,68 @@ def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/api/model_calls")
+def model_call_metrics() -> dict[str, Any]:
+    return model_calls.metrics()
+
+
+@app.get("/api/loop")
+def loop_metrics() -> dict[str, Any]:
+    return {"loop": loop_monitor.metrics(), "model_runs": model_calls.in_flight()}
+
+
+@app.get("/api/traces")
+def trace_store_metrics() -> dict[str, Any]:
+    return trace_store.metrics()
+
+
+@app.get("/api/model_client")
+def model_client_metrics() -> dict[str, Any]:
+    return model_client.metrics()
+
+
+@app.get("/api/lanes")
+def lane_metrics() -> dict[str, Any]:
+    return lane_scheduler.metrics()
+
+
 @app.post("/api/tasks", response_model=EmployeeTaskRead)
-async def create_task(req: EmployeeTaskCreate, session: Session = Depends(get_session)) -> EmployeeTaskRead:
-    task = EmployeeTask(
-        task_type=req.task.value,
-        description=req.description,
-        language=req.language,
-        requires_human_approval=req.requires_human_approval,
-        status="pending_approval" if req.requires_human_approval else "created",
+async def create_task(
+    req: EmployeeTaskCreate,
+    response: Response,
+    session: Session = Depends(get_session),
+    idempotency_key: str | None = Header(default=None),
+    x_priority: str | None = Header(default=None),
+) -> EmployeeTaskRead:
+    priority = resolve_lane(req.priority, x_priority)
+    result, replayed = await idempotency.run(
+        "create_task",
+        idempotency_key,
+        req.model_dump(mode="json"),
+        EmployeeTaskRead,
+        lambda: submit_task(req, session, priority),
     )
-    session.add(task)
-    session.commit()
-    session.refresh(task)
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+
+@app.post("/api/tasks/approve", response_model=BulkApprovalResponse)
+async def approve_tasks(req: BulkApprovalRequest, session: Session = Depends(get_session)) -> BulkApprovalResponse:
+    if req.ids is None and req.filter is None:
+        raise HTTPException(status_code=422, detail="ids or filter is required")
+
+    approved = approve_pending_tasks(session, req)
+    items = [BulkApprovalItem(id=task_id, approved=True, status="queued") for task_id in approved]
 
-    if task.requires_human_approval:
-        return to_read(task)
+    skipped_ids = sorted(set(req.ids or ()) - set(approved))
+    if skipped_ids:
+        current = dict(
+            session.exec(select(EmployeeTask.id, EmployeeTask.status).where(EmployeeTask.id.in_(skipped_ids))).all()
+        )
+        items += [BulkApprovalItem(id=task_id, approved=False, status=current.get(task_id)) for task_id in skipped_ids]
 
-    task = await execute_task(task, session)
-    return to_read(task)
+    return BulkApprovalResponse(approved=len(approved), skipped=len(skipped_ids), items=items)
 
 
 @app.post("/api/tasks/{task_id}/approve", response_model=EmployeeTaskRead)
@@ -179,8 +960,48 @@ async def approve_task(task_id: int, session: Session = Depends(get_session)) ->
     if task.status != "pending_approval":
         raise HTTPException(status_code=400, detail="Task is not pending approval")
 
-    task = await execute_task(task, session)
-    return to_read(task)
+    task = enqueue_task(task, session)
+    return read_task(session, task)
+
+
+@app.get("/api/tasks/events")
+async def stream_task_events(request: Request, ids: list[int] | None = Query(default=None)) -> StreamingResponse:
+    """Server-sent events with status transitions for ``ids`` (or every task).
+
+    The stream starts with the current status of each requested task and ends once
+    all of them reached a terminal status.
+    """
+    wanted = set(ids or ())
+    queue = task_events.subscribe(ids)
+
+    async def events():
+        last_status: dict[int, str] = {}
+
+        def all_finished() -> bool:
+            return bool(wanted) and all(last_status.get(task_id) in TERMINAL_STATUSES for task_id in wanted)
+
+        try:
+            if wanted:
+                snapshot = await asyncio.to_thread(fetch_task_events, wanted, (datetime.min, 0))
+                for event in snapshot:
+                    last_status[event.task_id] = event.status
+                    yield f"event: status\ndata: {event.to_json()}\n\n"
+            while not all_finished():
+                if await request.is_disconnected():
+                    return
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.task_events_keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if last_status.get(event.task_id) == event.status:
+                    continue
+                last_status[event.task_id] = event.status
+                yield f"event: status\ndata: {event.to_json()}\n\n"
+        finally:
+            task_events.unsubscribe(queue, ids)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 
 @app.get("/api/tasks/{task_id}", response_model=EmployeeTaskRead)
@@ -188,11 +1009,63 @@ def get_task(task_id: int, session: Session = Depends(get_session)) -> EmployeeT
     task = session.get(EmployeeTask, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    return to_read(task)
+    return read_task(session, task)
 
 
-@app.get("/api/tasks", response_model=list[EmployeeTaskRead])
-def list_tasks(session: Session = Depends(get_session)) -> list[EmployeeTaskRead]:
-    rows = session.exec(select(EmployeeTask).order_by(EmployeeTask.id.desc())).all()
-    return [to_read(row) for row in rows]
+@app.get("/api/tasks", response_model=EmployeeTaskPage)
+def list_tasks(
+    status: str | None = None,
+    task_type: EmployeeTaskType | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+    cursor: int | None = Query(default=None, description="next_cursor from the previous page"),
+    limit: int = Query(default=50, ge=1, le=500),
+    include_body: bool = False,
+    session: Session = Depends(get_session),
+) -> EmployeeTaskPage:
+    # Keyset pagination on the primary key: every page is an index range scan that
+    # starts where the previous page stopped, regardless of how deep the client is.
+    summary_columns = (
+        EmployeeTask.id,
+        EmployeeTask.task_type,
+        EmployeeTask.status,
+        EmployeeTask.next_task_suggestion,
+        EmployeeTask.created_at,
+        EmployeeTask.updated_at,
+    )
+    query = select(EmployeeTask) if include_body else select(*summary_columns)
+    if status:
+        query = query.where(EmployeeTask.status == status)
+    if task_type:
+        query = query.where(EmployeeTask.task_type == task_type.value)
+    if created_after:
+        query = query.where(EmployeeTask.created_at >= created_after)
+    if created_before:
+        query = query.where(EmployeeTask.created_at < created_before)
+    if cursor is not None:
+        query = query.where(EmployeeTask.id < cursor)
+    rows = session.exec(query.order_by(EmployeeTask.id.desc()).limit(limit + 1)).all()
 
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1].id
+
+    if include_body:
+        digests = [digest for row in rows for digest in (row.result_digest, row.documentation_digest)]
+        bodies = get_blobs(session, digests)
+        return EmployeeTaskPage(items=[to_read(row, bodies) for row in rows], next_cursor=next_cursor)
+    return EmployeeTaskPage(
+        items=[
+            EmployeeTaskSummary(
+                id=row.id,
+                task=row.task_type,
+                status=row.status,
+                next_task_suggestion=row.next_task_suggestion,
+                created_at=row.created_at,
+                updated_at=row.updated_at,
+            )
+            for row in rows
+        ],
+        next_cursor=next_cursor,
+    )
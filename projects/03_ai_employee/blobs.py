@@ -0,0 +1,74 @@
+"""Content-addressed storage for large task outputs.
+
+Model output is stored once per distinct body in ``employee_task_blobs``, keyed by
+its SHA-256 digest. Task rows only keep the digest, so scans of ``employee_tasks``
+stay small and identical outputs (retries, reused duplicates) share one blob.
+"""
+
+from __future__ import annotations
+
+import zlib
+from hashlib import sha256
+from typing import Iterable
+
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Field as SQLField
+from sqlmodel import SQLModel, Session, select
+
+
+class TaskBlob(SQLModel, table=True):
+    __tablename__ = "employee_task_blobs"
+
+    digest: str = SQLField(primary_key=True, max_length=64)
+    encoding: str = "identity"
+    size: int
+    data: bytes
+
+
+def encode(raw: bytes, compression: str, min_bytes: int) -> tuple[str, bytes]:
+    if compression == "zlib" and len(raw) >= min_bytes:
+        packed = zlib.compress(raw, 6)
+        if len(packed) < len(raw):
+            return "zlib", packed
+    return "identity", raw
+
+
+def decode(blob: TaskBlob) -> str:
+    data = zlib.decompress(blob.data) if blob.encoding == "zlib" else blob.data
+    return data.decode("utf-8")
+
+
+def put_blob(session: Session, text: str, compression: str = "zlib", min_bytes: int = 1024) -> str:
+    """Store ``text`` if it is not stored yet and return its digest.
+
+    Runs in the caller's transaction; the caller commits.
+    """
+    raw = text.encode("utf-8")
+    digest = sha256(raw).hexdigest()
+    encoding, data = encode(raw, compression, min_bytes)
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        insert = postgresql_insert
+    elif dialect == "sqlite":
+        insert = sqlite_insert
+    else:
+        if session.get(TaskBlob, digest) is None:
+            session.add(TaskBlob(digest=digest, encoding=encoding, size=len(raw), data=data))
+            session.flush()
+        return digest
+
+    session.execute(
+        insert(TaskBlob)
+        .values(digest=digest, encoding=encoding, size=len(raw), data=data)
+        .on_conflict_do_nothing(index_elements=["digest"])
+    )
+    return digest
+
+
+def get_blobs(session: Session, digests: Iterable[str | None]) -> dict[str, str]:
+    wanted = {digest for digest in digests if digest}
+    if not wanted:
+        return {}
+    rows = session.exec(select(TaskBlob).where(TaskBlob.digest.in_(wanted))).all()
+    return {row.digest: decode(row) for row in rows}
@@ -0,0 +1,117 @@
+"""Near-duplicate lookup for task descriptions.
+
+MinHash signatures over word shingles are split into LSH bands. Texts that share
+any band land in the same bucket, so a lookup only compares against a handful of
+candidates instead of every indexed task. Candidates are then verified with the exact
+Jaccard similarity of their shingle sets.
+
+With ``bands`` x ``rows`` signature values, a pair with Jaccard similarity ``s`` is
+returned as a candidate with probability ``1 - (1 - s**rows) ** bands``. The defaults
+(8 x 4) catch pairs above 0.85 more than 99% of the time.
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import threading
+import zlib
+from collections import Counter, defaultdict
+from typing import Callable, Iterable
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_TOKEN = re.compile(r"\w+")
+
+
+def shingles(text: str) -> set[int]:
+    tokens = _TOKEN.findall(text.lower())
+    if len(tokens) < 2:
+        grams = tokens
+    else:
+        grams = [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return {zlib.crc32(gram.encode("utf-8")) for gram in grams}
+
+
+def jaccard(a: set[int], b: set[int]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class SimilarityIndex:
+    """In-memory MinHash LSH index; safe to update and query from several threads."""
+
+    def __init__(self, bands: int = 8, rows: int = 4, max_candidates: int = 20, seed: int = 1) -> None:
+        self.bands = bands
+        self.rows = rows
+        self.max_candidates = max_candidates
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(bands * rows)
+        ]
+        self._buckets: list[dict[int, list[int]]] = [defaultdict(list) for _ in range(bands)]
+        self._keys: dict[int, list[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _band_keys(self, kind: str, features: set[int]) -> list[int]:
+        if not features:
+            return []
+        signature = [min((a * x + b) % _MERSENNE_PRIME for x in features) for a, b in self._perms]
+        return [
+            hash((kind, band, *signature[band * self.rows : (band + 1) * self.rows])) for band in range(self.bands)
+        ]
+
+    def add(self, doc_id: int, text: str, kind: str = "") -> None:
+        """Index ``text`` under ``doc_id``, replacing what was indexed for it before."""
+        keys = self._band_keys(kind, shingles(text))
+        with self._lock:
+            previous = self._keys.get(doc_id)
+            if previous == keys:
+                return
+            if previous is not None:
+                for bucket, key in zip(self._buckets, previous):
+                    ids = bucket.get(key)
+                    if ids and doc_id in ids:
+                        ids.remove(doc_id)
+                        if not ids:
+                            del bucket[key]
+            for bucket, key in zip(self._buckets, keys):
+                bucket[key].append(doc_id)
+            self._keys[doc_id] = keys
+
+    def add_many(self, docs: Iterable[tuple[int, str, str]]) -> None:
+        for doc_id, text, kind in docs:
+            self.add(doc_id, text, kind)
+
+    def candidates(self, text: str, kind: str = "") -> list[int]:
+        keys = self._band_keys(kind, shingles(text))
+        hits: Counter[int] = Counter()
+        with self._lock:
+            for bucket, key in zip(self._buckets, keys):
+                hits.update(bucket.get(key, ()))
+        return [doc_id for doc_id, _ in hits.most_common(self.max_candidates)]
+
+    def best_match(
+        self,
+        text: str,
+        kind: str,
+        threshold: float,
+        load_texts: Callable[[list[int]], dict[int, str]],
+    ) -> tuple[int, float] | None:
+        """Return ``(doc_id, similarity)`` of the closest indexed text above ``threshold``.
+
+        ``load_texts`` fetches the stored text of candidate ids for exact verification.
+        """
+        candidate_ids = self.candidates(text, kind)
+        if not candidate_ids:
+            return None
+        query = shingles(text)
+        best: tuple[int, float] | None = None
+        for doc_id, other in load_texts(candidate_ids).items():
+            score = jaccard(query, shingles(other))
+            if score >= threshold and (best is None or score > best[1]):
+                best = (doc_id, score)
+        return best
@@ -0,0 +1,177 @@
+"""Task status pub/sub for the AI Employee service.
+
+Status transitions are published to an in-process broker that fans them out to
+streaming clients. Because tasks are executed by separate worker processes, the API
+process also needs a cross-process feed, which is one of:
+
+- ``postgres``: workers ``NOTIFY`` on a channel and the API ``LISTEN``s on it.
+- ``poll``: one shared poller per API process reads recent changes for all watched
+  tasks in a single query, instead of every client polling on its own. It re-reads a
+  short window behind its cursor so changes that commit late are not missed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Iterable
+
+logger = logging.getLogger("ai_employee.events")
+
+TERMINAL_STATUSES = {"completed", "failed"}
+
+
+@dataclass(frozen=True)
+class TaskEvent:
+    task_id: int
+    status: str
+    updated_at: datetime
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["updated_at"] = self.updated_at.isoformat()
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: str) -> TaskEvent:
+        data = json.loads(raw)
+        return cls(
+            task_id=int(data["task_id"]),
+            status=data["status"],
+            updated_at=datetime.fromisoformat(data["updated_at"]),
+        )
+
+
+class TaskEventBroker:
+    """Fan task events out to subscriber queues on the event loop."""
+
+    def __init__(self, queue_size: int = 1000) -> None:
+        self._queue_size = queue_size
+        self._by_task: dict[int, set[asyncio.Queue[TaskEvent]]] = defaultdict(set)
+        self._all: set[asyncio.Queue[TaskEvent]] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, task_ids: Iterable[int] | None = None) -> asyncio.Queue[TaskEvent]:
+        """Subscribe to the given tasks, or to every task when ``task_ids`` is None."""
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[TaskEvent] = asyncio.Queue(maxsize=self._queue_size)
+        with self._lock:
+            if task_ids is None:
+                self._all.add(queue)
+            else:
+                for task_id in task_ids:
+                    self._by_task[task_id].add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue[TaskEvent], task_ids: Iterable[int] | None = None) -> None:
+        with self._lock:
+            if task_ids is None:
+                self._all.discard(queue)
+                return
+            for task_id in task_ids:
+                subscribers = self._by_task.get(task_id)
+                if subscribers is None:
+                    continue
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._by_task[task_id]
+
+    def watched_ids(self) -> set[int]:
+        with self._lock:
+            return set(self._by_task)
+
+    def watching_all(self) -> bool:
+        return bool(self._all)
+
+    def publish(self, event: TaskEvent) -> None:
+        """Deliver ``event`` to its subscribers. Safe to call from any thread."""
+        with self._lock:
+            queues = list(self._all) + list(self._by_task.get(event.task_id, ()))
+        if not queues or self._loop is None or self._loop.is_closed():
+            return
+        for queue in queues:
+            self._loop.call_soon_threadsafe(_offer, queue, event)
+
+
+def _offer(queue: asyncio.Queue[TaskEvent], event: TaskEvent) -> None:
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        logger.warning("Dropping event for task %s: subscriber queue full", event.task_id)
+
+
+def listen_postgres(
+    connect: Callable[[], object],
+    channel: str,
+    broker: TaskEventBroker,
+    stop: threading.Event,
+) -> None:
+    """Blocking LISTEN loop; run it in a daemon thread.
+
+    ``connect`` must return a psycopg 3 connection (for example the driver connection
+    behind a SQLAlchemy engine).
+    """
+    while not stop.is_set():
+        try:
+            conn = connect()
+            conn.autocommit = True
+            conn.execute(f'LISTEN "{channel}"')
+            while not stop.is_set():
+                for notify in conn.notifies(timeout=1.0):
+                    broker.publish(TaskEvent.from_json(notify.payload))
+        except Exception:
+            logger.exception("Task event listener failed; reconnecting")
+            stop.wait(1.0)
+
+
+async def poll_changes(
+    fetch: Callable[[set[int] | None, tuple[datetime, int]], list[TaskEvent]],
+    broker: TaskEventBroker,
+    interval: float,
+    stop: asyncio.Event,
+    overlap: float = 5.0,
+) -> None:
+    """Publish changes found by ``fetch`` for the currently watched tasks.
+
+    ``fetch(ids, after)`` returns events strictly past the ``(updated_at, task_id)``
+    cursor ``after``, in that order; ``ids`` is None when some subscriber watches every
+    task. The id breaks ties between tasks updated at the same instant.
+
+    ``updated_at`` is set before the writing transaction commits, so a change can become
+    visible after the cursor has already moved past its timestamp. Each poll therefore
+    reads ``overlap`` seconds behind the cursor and skips row versions
+    ``(task_id, status, updated_at)`` it has already published; versions older than
+    the window are forgotten.
+    """
+    cursor = (datetime.utcnow(), 0)
+    window = timedelta(seconds=overlap)
+    published: set[tuple[int, str, datetime]] = set()
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+        ids = None if broker.watching_all() else broker.watched_ids()
+        if ids is not None and not ids:
+            cursor = (datetime.utcnow(), 0)
+            continue
+        try:
+            events = await asyncio.to_thread(fetch, ids, (cursor[0] - window, 0))
+        except Exception:
+            logger.exception("Task event poll failed")
+            continue
+        for event in events:
+            cursor = max(cursor, (event.updated_at, event.task_id))
+            version = (event.task_id, event.status, event.updated_at)
+            if version in published:
+                continue
+            published.add(version)
+            broker.publish(event)
+        horizon = cursor[0] - window
+        published = {version for version in published if version[2] >= horizon}
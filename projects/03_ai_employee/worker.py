@@ -0,0 +1,41 @@
+"""Queue worker for the AI Employee service.
+
+Run one or more worker processes next to the API:
+
+    python worker.py --concurrency 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import signal
+
+from app import init_db, run_worker, settings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Execute queued AI Employee tasks.")
+    parser.add_argument("--concurrency", type=int, default=settings.worker_concurrency)
+    parser.add_argument("--worker-id", default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+
+    async def serve() -> None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:
+                pass
+        await run_worker(worker_id=args.worker_id, concurrency=args.concurrency, stop=stop)
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,128 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import logging
 import os
-from datetime import datetime
-from typing import Any, Literal
-
-from agents import Agent, Runner
-from fastapi import Depends, FastAPI
+import re
+import sys
+import time
+from datetime import date, datetime, timedelta
+from hashlib import sha256
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Literal
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Response
 from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import Index, case, func, text, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlmodel import Field as SQLField
-from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from cron import CronSchedule
+from fair_share import ClientQueueFull, FairShareLimiter
+from scheduler import Scheduler
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from shared.admission import AdmissionLimiter
+from shared.analytics import LogAnalytics, log_analytics
+from shared.cassette import Cassette
+from shared.db import SingleWriter, sync_tables, tune_sqlite
+from shared.idempotency import IdempotencyStore
+from shared.lanes import Lane, LaneScheduler, lane, resolve_lane
+from shared.lazy import Lazy, prewarm
+from shared.loop_monitor import LoopMonitor
+from shared.memory import AllocationSampler, MemoryDiagnostics
+from shared.model_calls import ModelCaller
+from shared.model_client import ModelClient
+from shared.profiling import ProfilerMiddleware
+from shared.prompts import build_input
+from shared.tracing import LocalTraceStore
+
+if TYPE_CHECKING:
+    from agents import Agent
 
 
 class Settings(BaseSettings):
     database_url: str = "sqlite:///./ai_automation_agency.db"
     openai_api_key: str | None = None
     model_name: str = "gpt-4.1"
+    scheduler_enabled: bool = True
+    scheduler_concurrency: int = 4
+    scheduler_queue_size: int = 1000
+    scheduler_run_missed: bool = True
+    scheduler_misfire_grace_seconds: int = 60
+    scheduler_resync_seconds: float = 60.0
+    fair_share_total_concurrency: int = 16
+    fair_share_client_concurrency: int = 4
+    fair_share_client_queue_limit: int = 100
+    fair_share_weights: dict[str, int] = {}
+    fair_share_max_tracked_clients: int = 1024
+    plan_cache_enabled: bool = True
+    idempotency_ttl_seconds: int = 86400
+    idempotency_wait_seconds: float = 60.0
+    idempotency_lease_seconds: float = 30.0
+    model_deadline_seconds: float = 120.0
+    model_attempt_timeout_seconds: float = 60.0
+    model_max_attempts: int = 3
+    model_retry_backoff_seconds: float = 0.5
+    model_retry_backoff_max_seconds: float = 8.0
+    model_hedge_agents: list[str] = []
+    model_hedge_delay_seconds: float = 5.0
+    model_fallback_name: str | None = None
+    circuit_error_rate: float = 0.5
+    circuit_slow_call_seconds: float = 30.0
+    circuit_min_calls: int = 10
+    circuit_open_seconds: float = 30.0
+    model_cassette_mode: Literal["off", "record", "replay"] = "off"
+    model_cassette_path: str = "cassettes/ai_automation_agency.jsonl"
+    model_cassette_latency_scale: float = 1.0
+    lazy_startup: bool = False
+    profile_sample_rate: float = 0.0
+    profile_dir: str = "profiles"
+    profile_interval_ms: float = 5.0
+    profile_min_duration_ms: float = 0.0
+    loop_monitor: bool = True
+    loop_probe_interval_ms: float = 100.0
+    loop_slow_callback_ms: float = 250.0
+    admin_token: str | None = None
+    memory_dir: str = "memory"
+    memory_trace_frames: int = 0
+    memory_sample_rate: float = 0.0
+    trace_store_enabled: bool = True
+    trace_store_path: str = "traces/ai_automation_agency.db"
+    model_base_url: str | None = None
+    model_client_max_connections: int = 100
+    model_client_max_keepalive: int = 20
+    model_client_keepalive_seconds: float = 30.0
+    model_client_connect_timeout_seconds: float = 5.0
+    model_client_http2: bool = True
+    model_client_warmup: bool = True
+    model_client_warmup_url: str | None = None
+    model_client_warmup_connections: int = 2
+    lanes_enabled: bool = True
+    lane_limit: int = 8
+    lane_mode: Literal["weighted", "strict"] = "weighted"
+    lane_weights: dict[str, int] = {"interactive": 4, "batch": 1}
+    lane_reserved_interactive: int = 1
+    lane_max_wait_seconds: float = 30.0
+    sqlite_tuning: bool = True
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 268435456
+    sqlite_cache_size_kib: int = 16384
+    db_single_writer: bool = False
+    db_writer_batch_size: int = 64
+    admission_limit: int = 8
+    admission_queue_size: int = 16
+    admission_queue_timeout_seconds: float = 10.0
+    admission_adaptive: bool = True
+    admission_min_limit: int = 1
+    admission_max_limit: int = 32
+    admission_latency_target_ms: float = 30000.0
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
@@ -26,10 +132,90 @@ if settings.openai_api_key and not os.getenv("OPENAI_API_KEY"):
 
 connect_args = {"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
 engine = create_engine(settings.database_url, connect_args=connect_args)
+if settings.sqlite_tuning:
+    tune_sqlite(
+        engine,
+        busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+        synchronous=settings.sqlite_synchronous,
+        mmap_size=settings.sqlite_mmap_size,
+        cache_size_kib=settings.sqlite_cache_size_kib,
+    )
+db_writer = SingleWriter(engine, enabled=settings.db_single_writer, batch_size=settings.db_writer_batch_size)
+idempotency = IdempotencyStore(
+    engine,
+    settings.idempotency_ttl_seconds,
+    settings.idempotency_wait_seconds,
+    lease_seconds=settings.idempotency_lease_seconds,
+)
+cassette = (
+    Cassette(settings.model_cassette_path, settings.model_cassette_mode, settings.model_cassette_latency_scale)
+    if settings.model_cassette_mode != "off"
+    else None
+)
+lane_scheduler = LaneScheduler(
+    limit=settings.lane_limit,
+    mode=settings.lane_mode,
+    weights=settings.lane_weights,
+    reserved_interactive=settings.lane_reserved_interactive,
+    max_wait_seconds=settings.lane_max_wait_seconds,
+    enabled=settings.lanes_enabled,
+)
+model_calls = ModelCaller(
+    deadline_seconds=settings.model_deadline_seconds,
+    attempt_timeout_seconds=settings.model_attempt_timeout_seconds,
+    max_attempts=settings.model_max_attempts,
+    backoff_seconds=settings.model_retry_backoff_seconds,
+    backoff_max_seconds=settings.model_retry_backoff_max_seconds,
+    hedge_agents=settings.model_hedge_agents,
+    hedge_delay_seconds=settings.model_hedge_delay_seconds,
+    fallback_model=settings.model_fallback_name,
+    circuit_options={
+        "error_rate": settings.circuit_error_rate,
+        "slow_call_seconds": settings.circuit_slow_call_seconds,
+        "min_calls": settings.circuit_min_calls,
+        "open_seconds": settings.circuit_open_seconds,
+    },
+    cassette=cassette,
+    scheduler=lane_scheduler,
+)
+loop_monitor = LoopMonitor(
+    interval_seconds=settings.loop_probe_interval_ms / 1000,
+    slow_callback_seconds=settings.loop_slow_callback_ms / 1000,
+)
+trace_store = LocalTraceStore(settings.trace_store_path, enabled=settings.trace_store_enabled)
+model_client = ModelClient(
+    base_url=settings.model_base_url,
+    api_key=settings.openai_api_key,
+    max_connections=settings.model_client_max_connections,
+    max_keepalive_connections=settings.model_client_max_keepalive,
+    keepalive_seconds=settings.model_client_keepalive_seconds,
+    connect_timeout_seconds=settings.model_client_connect_timeout_seconds,
+    attempt_timeout_seconds=settings.model_attempt_timeout_seconds,
+    http2=settings.model_client_http2,
+    warmup_url=settings.model_client_warmup_url,
+    warmup_connections=settings.model_client_warmup_connections,
+)
+admission = AdmissionLimiter(
+    "automation_request",
+    limit=settings.admission_limit,
+    queue_size=settings.admission_queue_size,
+    queue_timeout=settings.admission_queue_timeout_seconds,
+    adaptive=settings.admission_adaptive,
+    min_limit=settings.admission_min_limit,
+    max_limit=settings.admission_max_limit,
+    latency_target_ms=settings.admission_latency_target_ms,
+)
+logger = logging.getLogger("ai_automation_agency")
 
 
 class AutomationLog(SQLModel, table=True):
     __tablename__ = "automation_logs"
+    # Covering indexes for the analytics window queries (see shared/analytics.py).
+    __table_args__ = (
+        Index("ix_automation_logs_client_created", "client_name", "platform", "created_at", "status", "latency_ms"),
+        Index("ix_automation_logs_platform_created", "platform", "created_at", "status", "latency_ms"),
+        Index("ix_automation_logs_created", "created_at", "status", "latency_ms"),
+    )
 
     id: int | None = SQLField(default=None, primary_key=True)
     client_name: str
@@ -37,11 +223,56 @@ class AutomationLog(SQLModel, table=True):
     request_json: str
     response_json: str
     status: str
+    latency_ms: int | None = None
+    created_at: datetime = SQLField(default_factory=datetime.utcnow)
+
+
+class AutomationRollup(SQLModel, table=True):
+    """Daily per-client, per-platform counters, maintained as logs are written."""
+
+    __tablename__ = "automation_daily_rollups"
+
+    client_name: str = SQLField(primary_key=True)
+    platform: str = SQLField(primary_key=True)
+    bucket_date: date = SQLField(primary_key=True)
+    total: int = 0
+    success: int = 0
+    error: int = 0
+    latency_ms_sum: int = 0
+    latency_ms_max: int = 0
+
+
+class AutomationPlan(SQLModel, table=True):
+    """Last successful plan per (client, normalized request, platform)."""
+
+    __tablename__ = "automation_plans"
+
+    cache_key: str = SQLField(primary_key=True, max_length=64)
+    client_name: str
+    platform: str
+    inputs_json: str
+    plan_json: str
+    updated_at: datetime = SQLField(default_factory=datetime.utcnow)
+
+
+class AutomationSchedule(SQLModel, table=True):
+    __tablename__ = "automation_schedules"
+
+    id: int | None = SQLField(default=None, primary_key=True)
+    client_name: str = SQLField(index=True)
+    platform: str
+    automation_request: str
+    metadata_json: str = "{}"
+    schedule: str
+    enabled: bool = True
+    next_run_at: datetime = SQLField(index=True)
+    last_run_at: datetime | None = None
     created_at: datetime = SQLField(default_factory=datetime.utcnow)
 
 
 def init_db() -> None:
-    SQLModel.metadata.create_all(engine)
+    sync_tables(engine, SQLModel.metadata)
+    backfill_rollups()
 
 
 def get_session():
@@ -55,6 +286,8 @@ class AutomationRequest(BaseModel):
     platform: str
     schedule: str | None = None
     metadata: dict[str, Any] = Field(default_factory=dict)
+    replan: bool = False
+    priority: Lane | None = None
 
 
 class AutomationResponse(BaseModel):
@@ -64,6 +297,43 @@ class AutomationResponse(BaseModel):
     report_summary: str
     next_suggestion: str
     platform: str
+    schedule_id: int | None = None
+    next_run_at: datetime | None = None
+    plan_source: Literal["agent", "delta", "cache"] = "agent"
+
+
+class AutomationScheduleRead(BaseModel):
+    id: int
+    client_name: str
+    platform: str
+    automation_request: str
+    schedule: str
+    enabled: bool
+    next_run_at: datetime
+    last_run_at: datetime | None
+
+
+class ReportDay(BaseModel):
+    date: date
+    platform: str
+    total: int
+    success: int
+    error: int
+    avg_latency_ms: float
+    max_latency_ms: int
+
+
+class ClientReport(BaseModel):
+    client_name: str
+    start: date
+    end: date
+    total: int
+    success: int
+    error: int
+    error_rate: float
+    avg_latency_ms: float
+    max_latency_ms: int
+    days: list[ReportDay] = Field(default_factory=list)
 
 
 class AutomationAgentOutput(BaseModel):
@@ -75,43 +345,270 @@ class AutomationAgentOutput(BaseModel):
     platform: str
 
 
-automation_agent = Agent(
-    name="AI Automation Agency Agent",
-    model=settings.model_name,
-    instructions=(
-        "You are an AI Automation Agency agent. "
-        "Plan automations for clients, produce client-friendly reports, optimize workflows, "
-        "and suggest new opportunities."
-    ),
-    output_type=AutomationAgentOutput,
-)
+def build_automation_agent() -> Agent:
+    from agents import Agent
+
+    model_client.install()
+    trace_store.register()
+    return Agent(
+        name="AI Automation Agency Agent",
+        model=settings.model_name,
+        instructions=(
+            "You are an AI Automation Agency agent. "
+            "Plan automations for clients, produce client-friendly reports, optimize workflows, "
+            "and suggest new opportunities."
+        ),
+        output_type=AutomationAgentOutput,
+    )
+
 
+automation_agent = Lazy(build_automation_agent)
 
-async def run_automation(payload: dict[str, Any]) -> AutomationAgentOutput:
-    result = await Runner.run(automation_agent, json.dumps(payload))
+
+class AutomationPlanDelta(BaseModel):
+    status: Literal["success", "error"] = "success"
+    workflow_plan: list[str] | None = None
+    report_summary: str | None = None
+    next_suggestion: str | None = None
+
+
+def build_plan_delta_agent() -> Agent:
+    from agents import Agent
+
+    model_client.install()
+    trace_store.register()
+    return Agent(
+        name="AI Automation Plan Updater",
+        model=settings.model_name,
+        instructions=(
+            "You update an existing automation plan for a client. You receive the current plan and "
+            "only the request fields that changed since it was made. Return only the plan fields that "
+            "must change because of those changes; leave every other field null."
+        ),
+        output_type=AutomationPlanDelta,
+    )
+
+
+plan_delta_agent = Lazy(build_plan_delta_agent)
+
+
+async def run_automation(req: AutomationRequest) -> AutomationAgentOutput:
+    prompt = build_input(
+        {"client_name": req.client_name, "platform": req.platform, "schedule": req.schedule},
+        {"automation_request": req.automation_request, "metadata": req.metadata},
+    )
+    result = await model_calls.run(automation_agent.get(), prompt)
     return result.final_output
 
 
-app = FastAPI(title="AI Automation Agency API", version="1.0.0")
+async def run_plan_delta(plan: AutomationAgentOutput, changes: dict[str, Any]) -> AutomationAgentOutput:
+    prompt = build_input({"current_plan": plan.model_dump()}, {"changes": changes})
+    result = await model_calls.run(plan_delta_agent.get(), prompt)
+    delta: AutomationPlanDelta = result.final_output
+    return plan.model_copy(update=delta.model_dump(exclude_none=True))
+
+
+# Added by the scheduler to every run; they are kept out of the cached plan inputs so a
+# scheduled run does not turn the next API submission into a delta.
+VOLATILE_METADATA_KEYS = {"schedule_id", "scheduled_for"}
+
+
+def plan_cache_key(req: AutomationRequest) -> str:
+    normalized = " ".join(re.findall(r"\w+", req.automation_request.lower()))
+    raw = json.dumps([req.client_name, normalized, req.platform.lower()], ensure_ascii=False)
+    return sha256(raw.encode("utf-8")).hexdigest()
+
+
+def plan_inputs(req: AutomationRequest) -> dict[str, Any]:
+    metadata = {k: v for k, v in req.metadata.items() if k not in VOLATILE_METADATA_KEYS}
+    return {"schedule": req.schedule, "metadata": metadata}
+
+
+def diff_plan_inputs(previous: dict[str, Any], current: dict[str, Any]) -> dict[str, Any]:
+    changes: dict[str, Any] = {}
+    if previous["schedule"] != current["schedule"]:
+        changes["schedule"] = {"previous": previous["schedule"], "current": current["schedule"]}
+    old, new = previous["metadata"], current["metadata"]
+    changed = {k: v for k, v in new.items() if old.get(k) != v}
+    removed = sorted(k for k in old if k not in new)
+    if changed or removed:
+        changes["metadata"] = {"changed": changed, "removed": removed}
+    return changes
+
+
+def dialect_insert(session: Session):
+    """The dialect's INSERT construct with ON CONFLICT support, or None."""
+    return {"postgresql": postgresql_insert, "sqlite": sqlite_insert}.get(session.get_bind().dialect.name)
+
+
+def store_plan(session: Session, key: str, req: AutomationRequest, plan: AutomationAgentOutput) -> None:
+    values = {
+        "cache_key": key,
+        "client_name": req.client_name,
+        "platform": req.platform,
+        "inputs_json": json.dumps(plan_inputs(req), ensure_ascii=False, sort_keys=True),
+        "plan_json": plan.model_dump_json(),
+        "updated_at": datetime.utcnow(),
+    }
+    insert = dialect_insert(session)
+    if insert is None:
+        session.merge(AutomationPlan(**values))
+        return
+    session.execute(
+        insert(AutomationPlan)
+        .values(**values)
+        .on_conflict_do_update(
+            index_elements=["cache_key"],
+            set_={k: values[k] for k in ("inputs_json", "plan_json", "updated_at")},
+        )
+    )
 
 
-@app.on_event("startup")
-def startup() -> None:
-    init_db()
+async def in_slots(req: AutomationRequest, admit: bool, handler: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+    """Run ``handler(*args)`` in the client's fair-share slot, then in an admission slot.
+
+    Admission comes second so a burst from one client waits in its own fair-share queue
+    instead of filling the shared admission queue and shedding everyone else.
+    """
+    async with client_slots.slot(req.client_name):
+        if not admit:
+            return await handler(*args)
+        return await admission.run(handler, *args)
+
+
+async def produce_plan(
+    req: AutomationRequest, session: Session, admit: bool = True
+) -> tuple[AutomationAgentOutput, str]:
+    """Plan ``req`` from the cache, as a delta of a cached plan, or from scratch."""
+    if not settings.plan_cache_enabled:
+        return await in_slots(req, admit, run_automation, req), "agent"
+
+    key = plan_cache_key(req)
+    cached = None if req.replan else session.get(AutomationPlan, key)
+    if cached is not None:
+        plan = AutomationAgentOutput.model_validate_json(cached.plan_json)
+        changes = diff_plan_inputs(json.loads(cached.inputs_json), plan_inputs(req))
+        if not changes:
+            return plan, "cache"
+        output, source = await in_slots(req, admit, run_plan_delta, plan, changes), "delta"
+    else:
+        output, source = await in_slots(req, admit, run_automation, req), "agent"
+
+    if output.status == "success":
+        await db_writer.run(lambda db: store_plan(db, key, req, output), session)
+    return output, source
+
+
+def record_rollup(session: Session, log: AutomationLog) -> None:
+    """Add ``log`` to its daily rollup row in the caller's transaction."""
+    latency = log.latency_ms or 0
+    success = 1 if log.status == "success" else 0
+    values = {
+        "client_name": log.client_name,
+        "platform": log.platform,
+        "bucket_date": log.created_at.date(),
+        "total": 1,
+        "success": success,
+        "error": 1 - success,
+        "latency_ms_sum": latency,
+        "latency_ms_max": latency,
+    }
+    increments = {
+        "total": AutomationRollup.total + 1,
+        "success": AutomationRollup.success + success,
+        "error": AutomationRollup.error + 1 - success,
+        "latency_ms_sum": AutomationRollup.latency_ms_sum + latency,
+        "latency_ms_max": case(
+            (AutomationRollup.latency_ms_max < latency, latency), else_=AutomationRollup.latency_ms_max
+        ),
+    }
+
+    insert = dialect_insert(session)
+    if insert is not None:
+        session.execute(
+            insert(AutomationRollup)
+            .values(**values)
+            .on_conflict_do_update(index_elements=["client_name", "platform", "bucket_date"], set_=increments)
+        )
+        return
+
+    key = (values["client_name"], values["platform"], values["bucket_date"])
+    if session.get(AutomationRollup, key) is None:
+        session.add(AutomationRollup(**values))
+        session.flush()
+    else:
+        session.execute(
+            update(AutomationRollup)
+            .where(
+                AutomationRollup.client_name == key[0],
+                AutomationRollup.platform == key[1],
+                AutomationRollup.bucket_date == key[2],
+            )
+            .values(**increments)
+        )
 
 
-@app.get("/health")
-def health() -> dict[str, str]:
-    return {"status": "ok"}
+def rebuild_rollups() -> None:
+    """Recompute all rollups from automation_logs, e.g. after importing old logs."""
+    day = func.date(AutomationLog.created_at)
+    with Session(engine) as session:
+        if session.get_bind().dialect.name == "postgresql":
+            # Log writes upsert their rollup row in the same transaction, so they wait
+            # here and then add to the rebuilt rows instead of being counted twice.
+            session.execute(text(f"LOCK TABLE {AutomationRollup.__tablename__} IN EXCLUSIVE MODE"))
+        session.execute(AutomationRollup.__table__.delete())
+        rows = session.exec(
+            select(
+                AutomationLog.client_name,
+                AutomationLog.platform,
+                day,
+                func.count(),
+                func.sum(case((AutomationLog.status == "success", 1), else_=0)),
+                func.sum(func.coalesce(AutomationLog.latency_ms, 0)),
+                func.max(func.coalesce(AutomationLog.latency_ms, 0)),
+            ).group_by(AutomationLog.client_name, AutomationLog.platform, day)
+        ).all()
+        for client_name, platform, bucket_date, total, success, latency_sum, latency_max in rows:
+            if isinstance(bucket_date, str):
+                bucket_date = date.fromisoformat(bucket_date)
+            session.add(
+                AutomationRollup(
+                    client_name=client_name,
+                    platform=platform,
+                    bucket_date=bucket_date,
+                    total=total,
+                    success=success,
+                    error=total - success,
+                    latency_ms_sum=latency_sum,
+                    latency_ms_max=latency_max,
+                )
+            )
+        session.commit()
+
+
+def backfill_rollups() -> None:
+    """Roll up existing logs on the first start after upgrading to rollup-based reports."""
+    with Session(engine) as session:
+        has_logs = session.exec(select(AutomationLog.id).limit(1)).first() is not None
+        has_rollups = session.exec(select(AutomationRollup.client_name).limit(1)).first() is not None
+    if has_logs and not has_rollups:
+        rebuild_rollups()
+        logger.info("rebuilt automation_daily_rollups from existing automation_logs")
+
+
+client_slots = FairShareLimiter(
+    total_concurrency=settings.fair_share_total_concurrency,
+    client_concurrency=settings.fair_share_client_concurrency,
+    client_queue_limit=settings.fair_share_client_queue_limit,
+    weights=settings.fair_share_weights,
+    max_tracked_clients=settings.fair_share_max_tracked_clients,
+)
 
 
-@app.post("/api/automation/request", response_model=AutomationResponse)
-async def automation_request(
-    req: AutomationRequest,
-    session: Session = Depends(get_session),
-) -> AutomationResponse:
+async def plan_automation(req: AutomationRequest, session: Session, admit: bool = True) -> AutomationResponse:
+    started = time.perf_counter()
     try:
-        output = await run_automation(req.model_dump())
+        output, plan_source = await produce_plan(req, session, admit)
         response = AutomationResponse(
             status=output.status,
             automation_created=output.automation_created,
@@ -119,8 +616,11 @@ async def automation_request(
             report_summary=output.report_summary,
             next_suggestion=output.next_suggestion,
             platform=output.platform,
+            plan_source=plan_source,
         )
         status = "success"
+    except (ClientQueueFull, HTTPException):
+        raise
     except Exception as exc:
         response = AutomationResponse(
             status="error",
@@ -132,15 +632,346 @@ async def automation_request(
         )
         status = "error"
 
-    session.add(
-        AutomationLog(
-            client_name=req.client_name,
-            platform=req.platform,
-            request_json=json.dumps(req.model_dump(), ensure_ascii=False),
-            response_json=json.dumps(response.model_dump(), ensure_ascii=False),
-            status=status,
+    log = AutomationLog(
+        client_name=req.client_name,
+        platform=req.platform,
+        request_json=json.dumps(req.model_dump(), ensure_ascii=False),
+        response_json=json.dumps(response.model_dump(), ensure_ascii=False),
+        status=status,
+        latency_ms=int((time.perf_counter() - started) * 1000),
+    )
+
+    def write_log(db: Session) -> None:
+        db.add(log)
+        record_rollup(db, log)
+
+    await db_writer.run(write_log, session)
+    return response
+
+
+def claim_schedule(schedule_id: int, run_at: datetime) -> tuple[AutomationRequest | None, datetime | None]:
+    """Advance a due schedule to its next run and return the request to execute.
+
+    The conditional UPDATE on ``next_run_at`` makes sure only one process runs a given
+    occurrence when several app workers share the database. Occurrences missed while the
+    service was down are coalesced into a single catch-up run.
+    """
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        row = session.get(AutomationSchedule, schedule_id)
+        if row is None or not row.enabled:
+            return None, None
+        if row.next_run_at != run_at:
+            return None, row.next_run_at
+
+        missed = run_at < now - timedelta(seconds=settings.scheduler_misfire_grace_seconds)
+        should_run = settings.scheduler_run_missed or not missed
+        next_run_at = CronSchedule(row.schedule).next_after(max(now, run_at))
+        claimed = session.execute(
+            update(AutomationSchedule)
+            .where(AutomationSchedule.id == schedule_id, AutomationSchedule.next_run_at == run_at)
+            .values(next_run_at=next_run_at, last_run_at=now if should_run else row.last_run_at)
+        ).rowcount
+        session.commit()
+        if claimed != 1:
+            session.refresh(row)
+            return None, row.next_run_at if row.enabled else None
+        if not should_run:
+            return None, next_run_at
+
+        metadata = {**json.loads(row.metadata_json), "schedule_id": row.id, "scheduled_for": run_at.isoformat()}
+        job = AutomationRequest(
+            client_name=row.client_name,
+            automation_request=row.automation_request,
+            platform=row.platform,
+            schedule=row.schedule,
+            metadata=metadata,
+            # A scheduled run exists to produce fresh output, so it skips the cache
+            # lookup; the new plan still replaces the cached one.
+            replan=True,
         )
+        return job, next_run_at
+
+
+async def run_scheduled_automation(req: AutomationRequest) -> None:
+    # Nobody is waiting on a scheduled run, so it always takes the batch lane.
+    with lane("batch"), Session(engine) as session:
+        await plan_automation(req, session, admit=False)
+
+
+def load_schedules(after_id: int) -> list[tuple[int, datetime]]:
+    with Session(engine) as session:
+        rows = session.exec(
+            select(AutomationSchedule.id, AutomationSchedule.next_run_at)
+            .where(AutomationSchedule.enabled, AutomationSchedule.id > after_id)
+            .order_by(AutomationSchedule.id)
+        ).all()
+    return [(row.id, row.next_run_at) for row in rows]
+
+
+scheduler = Scheduler(
+    claim_schedule,
+    run_scheduled_automation,
+    concurrency=settings.scheduler_concurrency,
+    queue_size=settings.scheduler_queue_size,
+)
+scheduler_stop = asyncio.Event()
+
+
+async def sync_schedules(stop: asyncio.Event) -> None:
+    # The first pass loads every schedule (including ones that came due while the
+    # service was down); later passes pick up schedules created by other app processes.
+    last_id = 0
+    while not stop.is_set():
+        for schedule_id, next_run_at in await asyncio.to_thread(load_schedules, last_id):
+            scheduler.add(schedule_id, next_run_at)
+            last_id = max(last_id, schedule_id)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.scheduler_resync_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def create_automation(req: AutomationRequest, cron: CronSchedule | None, session: Session) -> AutomationResponse:
+    try:
+        response = await plan_automation(req, session)
+    except ClientQueueFull as exc:
+        raise HTTPException(status_code=429, detail=str(exc), headers={"Retry-After": "1"}) from exc
+    if cron is None or not response.automation_created:
+        return response
+
+    schedule = AutomationSchedule(
+        client_name=req.client_name,
+        platform=req.platform,
+        automation_request=req.automation_request,
+        metadata_json=json.dumps(req.metadata, ensure_ascii=False),
+        schedule=cron.expression,
+        next_run_at=cron.next_after(datetime.utcnow()),
     )
+    session.add(schedule)
     session.commit()
+    session.refresh(schedule)
+    scheduler.add(schedule.id, schedule.next_run_at)
+    response.schedule_id = schedule.id
+    response.next_run_at = schedule.next_run_at
     return response
 
+
+app = FastAPI(title="AI Automation Agency API", version="1.0.0")
+if settings.profile_sample_rate > 0:
+    app.add_middleware(
+        ProfilerMiddleware,
+        directory=settings.profile_dir,
+        sample_rate=settings.profile_sample_rate,
+        interval_ms=settings.profile_interval_ms,
+        min_duration_ms=settings.profile_min_duration_ms,
+    )
+memory = MemoryDiagnostics(settings.memory_dir)
+app.include_router(memory.router(settings.admin_token))
+if settings.memory_sample_rate > 0:
+    app.add_middleware(AllocationSampler, diagnostics=memory, sample_rate=settings.memory_sample_rate)
+
+
+@app.on_event("startup")
+def startup() -> None:
+    init_db()
+    idempotency.purge_expired()
+    if settings.lazy_startup:
+        prewarm(automation_agent, plan_delta_agent)
+    else:
+        automation_agent.get()
+        plan_delta_agent.get()
+    if settings.loop_monitor:
+        loop_monitor.start()
+    if settings.memory_trace_frames > 0:
+        memory.start(settings.memory_trace_frames)
+    if settings.model_client_warmup:
+        model_client.start_warm_up()
+    if settings.scheduler_enabled:
+        loop = asyncio.get_running_loop()
+        loop.create_task(sync_schedules(scheduler_stop))
+        loop.create_task(scheduler.serve(scheduler_stop))
+
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    loop_monitor.stop()
+    trace_store.force_flush()
+    await model_client.aclose()
+    scheduler_stop.set()
+    await db_writer.close()
+
+
+@app.get("/health")
+def health() -> dict[str, str]:
+    return {"status": "ok"}
+
+
+@app.get("/api/model_calls")
+def model_call_metrics() -> dict[str, Any]:
+    return model_calls.metrics()
+
+
+@app.get("/api/loop")
+def loop_metrics() -> dict[str, Any]:
+    return {"loop": loop_monitor.metrics(), "model_runs": model_calls.in_flight()}
+
+
+@app.get("/api/traces")
+def trace_store_metrics() -> dict[str, Any]:
+    return trace_store.metrics()
+
+
+@app.get("/api/model_client")
+def model_client_metrics() -> dict[str, Any]:
+    return model_client.metrics()
+
+
+@app.get("/api/lanes")
+def lane_metrics() -> dict[str, Any]:
+    return lane_scheduler.metrics()
+
+
+@app.get("/api/admission")
+def admission_metrics() -> dict[str, Any]:
+    return {admission.name: admission.metrics()}
+
+
+@app.post("/api/automation/request", response_model=AutomationResponse)
+async def automation_request(
+    req: AutomationRequest,
+    response: Response,
+    session: Session = Depends(get_session),
+    idempotency_key: str | None = Header(default=None),
+    x_priority: str | None = Header(default=None),
+) -> AutomationResponse:
+    cron = None
+    if req.schedule:
+        try:
+            cron = CronSchedule(req.schedule)
+            # Expressions such as "0 0 30 2 *" parse but never fire; reject them before
+            # any model work rather than after planning.
+            cron.next_after(datetime.utcnow())
+        except ValueError as exc:
+            raise HTTPException(status_code=422, detail=f"invalid schedule: {exc}") from exc
+
+    with lane(resolve_lane(req.priority, x_priority)):
+        result, replayed = await idempotency.run(
+            "automation_request",
+            idempotency_key,
+            req.model_dump(mode="json"),
+            AutomationResponse,
+            lambda: create_automation(req, cron, session),
+        )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+
+@app.get("/api/automation/fair_share")
+def fair_share_metrics() -> dict[str, Any]:
+    return client_slots.metrics()
+
+
+@app.get("/api/automation/reports/{client_name}", response_model=ClientReport)
+def client_report(
+    client_name: str,
+    start: date | None = None,
+    end: date | None = None,
+    platform: str | None = None,
+    session: Session = Depends(get_session),
+) -> ClientReport:
+    # Reads only automation_daily_rollups: cost depends on the number of days and
+    # platforms in range, not on how many automation logs were written.
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    query = select(AutomationRollup).where(
+        AutomationRollup.client_name == client_name,
+        AutomationRollup.bucket_date >= start,
+        AutomationRollup.bucket_date <= end,
+    )
+    if platform:
+        query = query.where(AutomationRollup.platform == platform)
+    rows = session.exec(query.order_by(AutomationRollup.bucket_date, AutomationRollup.platform)).all()
+
+    total = sum(row.total for row in rows)
+    latency_sum = sum(row.latency_ms_sum for row in rows)
+    error = sum(row.error for row in rows)
+    return ClientReport(
+        client_name=client_name,
+        start=start,
+        end=end,
+        total=total,
+        success=total - error,
+        error=error,
+        error_rate=round(error / total, 4) if total else 0.0,
+        avg_latency_ms=round(latency_sum / total, 1) if total else 0.0,
+        max_latency_ms=max((row.latency_ms_max for row in rows), default=0),
+        days=[
+            ReportDay(
+                date=row.bucket_date,
+                platform=row.platform,
+                total=row.total,
+                success=row.success,
+                error=row.error,
+                avg_latency_ms=round(row.latency_ms_sum / row.total, 1) if row.total else 0.0,
+                max_latency_ms=row.latency_ms_max,
+            )
+            for row in rows
+        ],
+    )
+
+
+@app.get("/api/automation/analytics", response_model=LogAnalytics)
+def automation_analytics(
+    client_name: str | None = None,
+    platform: str | None = None,
+    window_minutes: int = Query(default=60, ge=1, le=43200),
+    bucket_minutes: int | None = Query(default=None, ge=1),
+    until: datetime | None = None,
+    session: Session = Depends(get_session),
+) -> LogAnalytics:
+    # Unlike the daily rollup reports, this reads raw logs through the covering indexes,
+    # so it supports minute-level buckets and latency percentiles over short windows.
+    end = until or datetime.utcnow()
+    bucket = bucket_minutes or max(1, window_minutes // 12)
+    try:
+        return log_analytics(
+            session,
+            AutomationLog,
+            {"client_name": client_name, "platform": platform},
+            since=end - timedelta(minutes=window_minutes),
+            until=end,
+            bucket_seconds=bucket * 60,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+
+
+@app.get("/api/automation/schedules", response_model=list[AutomationScheduleRead])
+def list_schedules(
+    client_name: str | None = None,
+    cursor: int | None = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+    session: Session = Depends(get_session),
+) -> list[AutomationScheduleRead]:
+    query = select(AutomationSchedule).where(AutomationSchedule.enabled)
+    if client_name:
+        query = query.where(AutomationSchedule.client_name == client_name)
+    if cursor is not None:
+        query = query.where(AutomationSchedule.id < cursor)
+    rows = session.exec(query.order_by(AutomationSchedule.id.desc()).limit(limit)).all()
+    return [AutomationScheduleRead.model_validate(row, from_attributes=True) for row in rows]
+
+
+@app.delete("/api/automation/schedules/{schedule_id}", response_model=AutomationScheduleRead)
+def disable_schedule(schedule_id: int, session: Session = Depends(get_session)) -> AutomationScheduleRead:
+    schedule = session.get(AutomationSchedule, schedule_id)
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    schedule.enabled = False
+    session.add(schedule)
+    session.commit()
+    session.refresh(schedule)
+    scheduler.discard(schedule_id)
+    return AutomationScheduleRead.model_validate(schedule, from_attributes=True)
@@ -0,0 +1,106 @@
+"""Minimal cron expression parser.
+
+Supports the standard five fields (minute, hour, day of month, month, day of week)
+with ``*``, lists, ranges, steps, month/day names and the ``@hourly``, ``@daily``,
+``@weekly``, ``@monthly`` and ``@yearly`` aliases. Times are naive UTC.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+ALIASES = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+MONTH_NAMES = {
+    name: i for i, name in enumerate("jan feb mar apr may jun jul aug sep oct nov dec".split(), start=1)
+}
+DAY_NAMES = {name: i for i, name in enumerate("sun mon tue wed thu fri sat".split())}
+
+
+def _parse_value(token: str, names: dict[str, int]) -> int:
+    token = token.lower()
+    if token in names:
+        return names[token]
+    if not token.isdigit():
+        raise ValueError(f"invalid cron value: {token!r}")
+    return int(token)
+
+
+def _parse_field(field: str, low: int, high: int, names: dict[str, int] | None = None) -> frozenset[int]:
+    names = names or {}
+    values: set[int] = set()
+    for part in field.split(","):
+        if not part:
+            raise ValueError(f"invalid cron field: {field!r}")
+        base, _, step_text = part.partition("/")
+        step = int(step_text) if step_text else 1
+        if step < 1:
+            raise ValueError(f"invalid cron step: {part!r}")
+        if base == "*":
+            start, end = low, high
+        elif "-" in base:
+            start_text, end_text = base.split("-", 1)
+            start, end = _parse_value(start_text, names), _parse_value(end_text, names)
+        else:
+            start = _parse_value(base, names)
+            end = high if step_text else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"cron field {part!r} out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronSchedule:
+    """Parsed cron expression; ``next_after`` finds the next matching minute."""
+
+    def __init__(self, expression: str) -> None:
+        self.expression = expression.strip()
+        fields = ALIASES.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression must have 5 fields: {expression!r}")
+        minute, hour, day, month, weekday = fields
+        self.minutes = sorted(_parse_field(minute, 0, 59))
+        self.hours = _parse_field(hour, 0, 23)
+        self.days = _parse_field(day, 1, 31)
+        self.months = _parse_field(month, 1, 12, MONTH_NAMES)
+        # 7 is an alias for Sunday.
+        self.weekdays = frozenset(d % 7 for d in _parse_field(weekday, 0, 7, DAY_NAMES))
+        # As in Vixie cron, a field starting with "*" (including "*/2") is unrestricted
+        # for the day-of-month/day-of-week "either may match" rule.
+        self._any_day = day.startswith("*")
+        self._any_weekday = weekday.startswith("*")
+
+    def _day_matches(self, t: datetime) -> bool:
+        day_ok = t.day in self.days
+        weekday_ok = (t.weekday() + 1) % 7 in self.weekdays
+        # Classic cron semantics: when both day fields are restricted, either may match.
+        if not self._any_day and not self._any_weekday:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, after: datetime) -> datetime:
+        t = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        horizon = t.year + 5
+        while t.year <= horizon:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+            if not self._day_matches(t):
+                t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if t.hour not in self.hours:
+                t = (t + timedelta(hours=1)).replace(minute=0)
+                continue
+            minute = next((m for m in self.minutes if m >= t.minute), None)
+            if minute is None:
+                t = (t + timedelta(hours=1)).replace(minute=0)
+                continue
+            return t.replace(minute=minute)
+        raise ValueError(f"cron expression never matches: {self.expression!r}")
@@ -0,0 +1,170 @@
+"""Per-client fair-share admission for agent runs.
+
+Requests beyond the global concurrency limit wait in one FIFO queue per client. When
+a slot frees up, the next client is picked by deficit round-robin: each client earns
+``weight`` credits per turn and spends one per admitted request. A client that bursts
+hundreds of requests therefore only delays its own queue, and small clients keep being
+served on every round.
+
+Per-client wait statistics are kept for the ``max_tracked_clients`` most recently seen
+clients; the least recently seen idle clients are dropped beyond that, so a stream of
+one-off client names cannot grow memory without bound.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+
+class ClientQueueFull(Exception):
+    """Raised when a client's wait queue is at its limit."""
+
+
+@dataclass
+class ClientStats:
+    admitted: int = 0
+    rejected: int = 0
+    waits: deque[float] = field(default_factory=lambda: deque(maxlen=1024))
+
+    def snapshot(self) -> dict[str, float | int]:
+        ordered = sorted(self.waits)
+
+        def pct(q: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 4) if ordered else 0.0
+
+        return {
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_p50_seconds": pct(0.50),
+            "wait_p99_seconds": pct(0.99),
+            "wait_max_seconds": round(ordered[-1], 4) if ordered else 0.0,
+        }
+
+
+class FairShareLimiter:
+    def __init__(
+        self,
+        total_concurrency: int,
+        client_concurrency: int,
+        client_queue_limit: int,
+        weights: dict[str, int] | None = None,
+        max_tracked_clients: int = 1024,
+    ) -> None:
+        self.total_concurrency = total_concurrency
+        self.client_concurrency = client_concurrency
+        self.client_queue_limit = client_queue_limit
+        self.weights = weights or {}
+        self.max_tracked_clients = max_tracked_clients
+        self._active: dict[str, int] = {}
+        self._running = 0
+        self._queues: dict[str, deque[asyncio.Future[None]]] = {}
+        self._ring: deque[str] = deque()
+        self._deficit: dict[str, int] = {}
+        self._stats: OrderedDict[str, ClientStats] = OrderedDict()
+
+    def _track(self, client: str) -> ClientStats:
+        stats = self._stats.get(client)
+        if stats is None:
+            stats = self._stats[client] = ClientStats()
+            if len(self._stats) > self.max_tracked_clients:
+                self._evict()
+        else:
+            self._stats.move_to_end(client)
+        return stats
+
+    def _evict(self) -> None:
+        """Drop the least recently seen clients that have no running or queued requests."""
+        excess = len(self._stats) - self.max_tracked_clients
+        idle = [client for client in self._stats if client not in self._active and client not in self._queues]
+        for client in idle[:excess]:
+            del self._stats[client]
+
+    def _can_run(self, client: str) -> bool:
+        return self._active.get(client, 0) < self.client_concurrency
+
+    def _grant(self, client: str) -> None:
+        self._running += 1
+        self._active[client] = self._active.get(client, 0) + 1
+
+    def _dispatch(self) -> None:
+        skipped = 0
+        while self._running < self.total_concurrency and self._ring and skipped < len(self._ring):
+            client = self._ring[0]
+            queue = self._queues[client]
+            while queue and queue[0].done():
+                queue.popleft()
+            if not queue:
+                self._ring.popleft()
+                del self._queues[client]
+                self._deficit.pop(client, None)
+                continue
+            if not self._can_run(client):
+                self._ring.rotate(-1)
+                skipped += 1
+                continue
+            skipped = 0
+            if self._deficit.get(client, 0) <= 0:
+                self._deficit[client] = self._deficit.get(client, 0) + self.weights.get(client, 1)
+            self._deficit[client] -= 1
+            self._grant(client)
+            queue.popleft().set_result(None)
+            if self._deficit[client] <= 0:
+                self._ring.rotate(-1)
+
+    @asynccontextmanager
+    async def slot(self, client: str) -> AsyncIterator[None]:
+        """Hold one run slot for ``client``; raises ``ClientQueueFull`` when over limit."""
+        stats = self._track(client)
+        started = time.perf_counter()
+        if not self._ring and self._running < self.total_concurrency and self._can_run(client):
+            self._grant(client)
+        else:
+            queue = self._queues.get(client)
+            if queue is None:
+                queue = self._queues[client] = deque()
+                self._ring.append(client)
+            if len(queue) >= self.client_queue_limit:
+                stats.rejected += 1
+                raise ClientQueueFull(f"too many queued requests for client {client!r}")
+            waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+            queue.append(waiter)
+            self._dispatch()
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._release(client)
+                raise
+
+        stats.admitted += 1
+        stats.waits.append(time.perf_counter() - started)
+        try:
+            yield
+        finally:
+            self._release(client)
+
+    def _release(self, client: str) -> None:
+        self._running -= 1
+        self._active[client] -= 1
+        if not self._active[client]:
+            del self._active[client]
+        self._dispatch()
+
+    def metrics(self) -> dict[str, object]:
+        return {
+            "running": self._running,
+            "total_concurrency": self.total_concurrency,
+            "clients": {
+                client: {
+                    "active": self._active.get(client, 0),
+                    "queued": len(self._queues.get(client, ())),
+                    **stats.snapshot(),
+                }
+                for client, stats in self._stats.items()
+            },
+        }
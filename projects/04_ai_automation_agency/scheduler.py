@@ -0,0 +1,110 @@
+"""In-process scheduler for recurring automations.
+
+Upcoming runs sit in a min-heap of ``(run_at, schedule_id)``, so the next due job is
+found in O(log n) and the loop sleeps until exactly that time instead of waking up
+per job. Due runs are claimed through a callback (which also persists the following
+run time) and handed to a fixed pool of worker coroutines through a bounded queue.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger("ai_automation_agency.scheduler")
+
+# claim(schedule_id, run_at) -> (job or None, next run time or None). A None job means
+# the run was taken by another process or the schedule changed; a None next run time
+# drops the schedule from the heap.
+ClaimFn = Callable[[int, datetime], tuple[Any | None, datetime | None]]
+RunFn = Callable[[Any], Awaitable[None]]
+
+
+class Scheduler:
+    def __init__(self, claim: ClaimFn, run: RunFn, concurrency: int = 4, queue_size: int = 1000) -> None:
+        self._claim = claim
+        self._run = run
+        self._concurrency = concurrency
+        self._heap: list[tuple[datetime, int]] = []
+        # Latest run time per schedule; heap entries that disagree are stale and skipped.
+        self._next: dict[int, datetime] = {}
+        self._jobs: asyncio.Queue[Any] = asyncio.Queue(maxsize=queue_size)
+        self._wake = asyncio.Event()
+        self.dispatched = 0
+
+    def __len__(self) -> int:
+        return len(self._next)
+
+    def add(self, schedule_id: int, run_at: datetime) -> None:
+        if self._next.get(schedule_id) == run_at:
+            return
+        self._next[schedule_id] = run_at
+        earliest = self._heap[0][0] if self._heap else None
+        heapq.heappush(self._heap, (run_at, schedule_id))
+        if earliest is None or run_at < earliest:
+            self._wake.set()
+
+    def discard(self, schedule_id: int) -> None:
+        self._next.pop(schedule_id, None)
+
+    def queue_depth(self) -> int:
+        return self._jobs.qsize()
+
+    async def _sleep(self, stop: asyncio.Event, timeout: float | None) -> None:
+        self._wake.clear()
+        waiters = [asyncio.ensure_future(self._wake.wait()), asyncio.ensure_future(stop.wait())]
+        try:
+            await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._jobs.get()
+            try:
+                await self._run(job)
+            except Exception:
+                logger.exception("Scheduled automation failed")
+            finally:
+                self._jobs.task_done()
+
+    async def serve(self, stop: asyncio.Event) -> None:
+        workers = [asyncio.create_task(self._worker()) for _ in range(self._concurrency)]
+        try:
+            while not stop.is_set():
+                if not self._heap:
+                    await self._sleep(stop, None)
+                    continue
+                run_at, schedule_id = self._heap[0]
+                delay = (run_at - datetime.utcnow()).total_seconds()
+                if delay > 0:
+                    await self._sleep(stop, delay)
+                    continue
+
+                heapq.heappop(self._heap)
+                if self._next.get(schedule_id) != run_at:
+                    continue
+                try:
+                    job, next_run_at = await asyncio.to_thread(self._claim, schedule_id, run_at)
+                except Exception:
+                    logger.exception("Failed to claim schedule %s", schedule_id)
+                    heapq.heappush(self._heap, (run_at, schedule_id))
+                    await self._sleep(stop, 5.0)
+                    continue
+                if next_run_at is None:
+                    del self._next[schedule_id]
+                else:
+                    self._next[schedule_id] = next_run_at
+                    heapq.heappush(self._heap, (next_run_at, schedule_id))
+                if job is not None:
+                    # Blocks when the pool is saturated, which delays rather than drops runs.
+                    await self._jobs.put(job)
+                    self.dispatched += 1
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
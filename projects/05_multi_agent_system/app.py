@@ -2,21 +2,105 @@ from __future__ import annotations
 
 import json
 import os
-from datetime import datetime
-from typing import Any
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Literal
 
-from agents import Agent, Runner
-from fastapi import Depends, FastAPI
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Response
 from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import Index
 from sqlmodel import Field as SQLField
 from sqlmodel import SQLModel, Session, create_engine
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from shared.admission import AdmissionLimiter
+from shared.analytics import LogAnalytics, log_analytics
+from shared.cassette import Cassette
+from shared.db import SingleWriter, sync_tables, tune_sqlite
+from shared.idempotency import IdempotencyStore
+from shared.lanes import Lane, LaneScheduler, lane, resolve_lane
+from shared.lazy import Lazy, prewarm
+from shared.loop_monitor import LoopMonitor
+from shared.memory import AllocationSampler, MemoryDiagnostics
+from shared.model_calls import ModelCaller
+from shared.model_client import ModelClient
+from shared.profiling import ProfilerMiddleware
+from shared.prompts import build_input
+from shared.tracing import LocalTraceStore
+
+if TYPE_CHECKING:
+    from agents import Agent
+
 
 class Settings(BaseSettings):
     database_url: str = "sqlite:///./multi_agent_system.db"
     openai_api_key: str | None = None
     model_name: str = "gpt-4.1"
+    idempotency_ttl_seconds: int = 86400
+    idempotency_wait_seconds: float = 60.0
+    idempotency_lease_seconds: float = 30.0
+    model_deadline_seconds: float = 120.0
+    model_attempt_timeout_seconds: float = 60.0
+    model_max_attempts: int = 3
+    model_retry_backoff_seconds: float = 0.5
+    model_retry_backoff_max_seconds: float = 8.0
+    model_hedge_agents: list[str] = []
+    model_hedge_delay_seconds: float = 5.0
+    model_fallback_name: str | None = None
+    circuit_error_rate: float = 0.5
+    circuit_slow_call_seconds: float = 30.0
+    circuit_min_calls: int = 10
+    circuit_open_seconds: float = 30.0
+    model_cassette_mode: Literal["off", "record", "replay"] = "off"
+    model_cassette_path: str = "cassettes/multi_agent_system.jsonl"
+    model_cassette_latency_scale: float = 1.0
+    lazy_startup: bool = False
+    profile_sample_rate: float = 0.0
+    profile_dir: str = "profiles"
+    profile_interval_ms: float = 5.0
+    profile_min_duration_ms: float = 0.0
+    loop_monitor: bool = True
+    loop_probe_interval_ms: float = 100.0
+    loop_slow_callback_ms: float = 250.0
+    admin_token: str | None = None
+    memory_dir: str = "memory"
+    memory_trace_frames: int = 0
+    memory_sample_rate: float = 0.0
+    trace_store_enabled: bool = True
+    trace_store_path: str = "traces/multi_agent_system.db"
+    model_base_url: str | None = None
+    model_client_max_connections: int = 100
+    model_client_max_keepalive: int = 20
+    model_client_keepalive_seconds: float = 30.0
+    model_client_connect_timeout_seconds: float = 5.0
+    model_client_http2: bool = True
+    model_client_warmup: bool = True
+    model_client_warmup_url: str | None = None
+    model_client_warmup_connections: int = 2
+    lanes_enabled: bool = True
+    lane_limit: int = 8
+    lane_mode: Literal["weighted", "strict"] = "weighted"
+    lane_weights: dict[str, int] = {"interactive": 4, "batch": 1}
+    lane_reserved_interactive: int = 1
+    lane_max_wait_seconds: float = 30.0
+    sqlite_tuning: bool = True
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 268435456
+    sqlite_cache_size_kib: int = 16384
+    db_single_writer: bool = False
+    db_writer_batch_size: int = 64
+    admission_limit: int = 8
+    admission_queue_size: int = 16
+    admission_queue_timeout_seconds: float = 10.0
+    admission_adaptive: bool = True
+    admission_min_limit: int = 1
+    admission_max_limit: int = 32
+    admission_latency_target_ms: float = 30000.0
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
@@ -26,21 +110,100 @@ if settings.openai_api_key and not os.getenv("OPENAI_API_KEY"):
 
 connect_args = {"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
 engine = create_engine(settings.database_url, connect_args=connect_args)
+if settings.sqlite_tuning:
+    tune_sqlite(
+        engine,
+        busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+        synchronous=settings.sqlite_synchronous,
+        mmap_size=settings.sqlite_mmap_size,
+        cache_size_kib=settings.sqlite_cache_size_kib,
+    )
+db_writer = SingleWriter(engine, enabled=settings.db_single_writer, batch_size=settings.db_writer_batch_size)
+idempotency = IdempotencyStore(
+    engine,
+    settings.idempotency_ttl_seconds,
+    settings.idempotency_wait_seconds,
+    lease_seconds=settings.idempotency_lease_seconds,
+)
+cassette = (
+    Cassette(settings.model_cassette_path, settings.model_cassette_mode, settings.model_cassette_latency_scale)
+    if settings.model_cassette_mode != "off"
+    else None
+)
+lane_scheduler = LaneScheduler(
+    limit=settings.lane_limit,
+    mode=settings.lane_mode,
+    weights=settings.lane_weights,
+    reserved_interactive=settings.lane_reserved_interactive,
+    max_wait_seconds=settings.lane_max_wait_seconds,
+    enabled=settings.lanes_enabled,
+)
+model_calls = ModelCaller(
+    deadline_seconds=settings.model_deadline_seconds,
+    attempt_timeout_seconds=settings.model_attempt_timeout_seconds,
+    max_attempts=settings.model_max_attempts,
+    backoff_seconds=settings.model_retry_backoff_seconds,
+    backoff_max_seconds=settings.model_retry_backoff_max_seconds,
+    hedge_agents=settings.model_hedge_agents,
+    hedge_delay_seconds=settings.model_hedge_delay_seconds,
+    fallback_model=settings.model_fallback_name,
+    circuit_options={
+        "error_rate": settings.circuit_error_rate,
+        "slow_call_seconds": settings.circuit_slow_call_seconds,
+        "min_calls": settings.circuit_min_calls,
+        "open_seconds": settings.circuit_open_seconds,
+    },
+    cassette=cassette,
+    scheduler=lane_scheduler,
+)
+loop_monitor = LoopMonitor(
+    interval_seconds=settings.loop_probe_interval_ms / 1000,
+    slow_callback_seconds=settings.loop_slow_callback_ms / 1000,
+)
+trace_store = LocalTraceStore(settings.trace_store_path, enabled=settings.trace_store_enabled)
+model_client = ModelClient(
+    base_url=settings.model_base_url,
+    api_key=settings.openai_api_key,
+    max_connections=settings.model_client_max_connections,
+    max_keepalive_connections=settings.model_client_max_keepalive,
+    keepalive_seconds=settings.model_client_keepalive_seconds,
+    connect_timeout_seconds=settings.model_client_connect_timeout_seconds,
+    attempt_timeout_seconds=settings.model_attempt_timeout_seconds,
+    http2=settings.model_client_http2,
+    warmup_url=settings.model_client_warmup_url,
+    warmup_connections=settings.model_client_warmup_connections,
+)
+admission = AdmissionLimiter(
+    "run_project",
+    limit=settings.admission_limit,
+    queue_size=settings.admission_queue_size,
+    queue_timeout=settings.admission_queue_timeout_seconds,
+    adaptive=settings.admission_adaptive,
+    min_limit=settings.admission_min_limit,
+    max_limit=settings.admission_max_limit,
+    latency_target_ms=settings.admission_latency_target_ms,
+)
 
 
 class ProjectRunLog(SQLModel, table=True):
     __tablename__ = "project_run_logs"
+    # Covering indexes for the analytics window queries (see shared/analytics.py).
+    __table_args__ = (
+        Index("ix_project_run_logs_project_name_created", "project_name", "created_at", "status", "latency_ms"),
+        Index("ix_project_run_logs_created", "created_at", "status", "latency_ms"),
+    )
 
     id: int | None = SQLField(default=None, primary_key=True)
     project_name: str
     request_json: str
     response_json: str
     status: str
+    latency_ms: int | None = None
     created_at: datetime = SQLField(default_factory=datetime.utcnow)
 
 
 def init_db() -> None:
-    SQLModel.metadata.create_all(engine)
+    sync_tables(engine, SQLModel.metadata)
 
 
 def get_session():
@@ -52,6 +215,7 @@ class ProjectRunRequest(BaseModel):
     project: str
     deadline: str
     topics: list[str]
+    priority: Lane | None = None
 
 
 class TopicResult(BaseModel):
@@ -92,61 +256,99 @@ class PMOutput(BaseModel):
     manager_notes: str
 
 
-research_agent = Agent(
-    name="Research Agent",
-    model=settings.model_name,
-    instructions="Gather focused research findings for the topic and deadline.",
-    output_type=ResearchOutput,
-)
-writing_agent = Agent(
-    name="Writing Agent",
-    model=settings.model_name,
-    instructions="Draft clear content from research summary and key points.",
-    output_type=WritingOutput,
-)
-analysis_agent = Agent(
-    name="Analysis Agent",
-    model=settings.model_name,
-    instructions="Evaluate draft quality and return practical improvement notes with score 1-100.",
-    output_type=AnalysisOutput,
-)
-pm_agent = Agent(
-    name="Project Manager Agent",
-    model=settings.model_name,
-    instructions=(
-        "Coordinate multi-agent outputs, report status, and provide prioritized next actions "
-        "until human approval."
-    ),
-    output_type=PMOutput,
-)
+def build_research_agent() -> Agent:
+    from agents import Agent
+
+    model_client.install()
+    trace_store.register()
+    return Agent(
+        name="Research Agent",
+        model=settings.model_name,
+        instructions="Gather focused research findings for the topic and deadline.",
+        output_type=ResearchOutput,
+    )
+
+
+research_agent = Lazy(build_research_agent)
+
+
+def build_writing_agent() -> Agent:
+    from agents import Agent
+
+    model_client.install()
+    trace_store.register()
+    return Agent(
+        name="Writing Agent",
+        model=settings.model_name,
+        instructions="Draft clear content from research summary and key points.",
+        output_type=WritingOutput,
+    )
+
+
+writing_agent = Lazy(build_writing_agent)
+
+
+def build_analysis_agent() -> Agent:
+    from agents import Agent
+
+    model_client.install()
+    trace_store.register()
+    return Agent(
+        name="Analysis Agent",
+        model=settings.model_name,
+        instructions="Evaluate draft quality and return practical improvement notes with score 1-100.",
+        output_type=AnalysisOutput,
+    )
+
+
+analysis_agent = Lazy(build_analysis_agent)
+
+
+def build_pm_agent() -> Agent:
+    from agents import Agent
+
+    model_client.install()
+    trace_store.register()
+    return Agent(
+        name="Project Manager Agent",
+        model=settings.model_name,
+        instructions=(
+            "Coordinate multi-agent outputs, report status, and provide prioritized next actions "
+            "until human approval."
+        ),
+        output_type=PMOutput,
+    )
+
+
+pm_agent = Lazy(build_pm_agent)
 
 
 async def run_pipeline(req: ProjectRunRequest) -> tuple[list[TopicResult], PMOutput]:
     topic_results: list[TopicResult] = []
 
     for topic in req.topics:
-        research = await Runner.run(
-            research_agent,
-            json.dumps({"project": req.project, "topic": topic, "deadline": req.deadline}),
+        research = await model_calls.run(
+            research_agent.get(),
+            build_input({"project": req.project, "deadline": req.deadline}, {"topic": topic}),
         )
         research_out = research.final_output
 
-        writing = await Runner.run(
-            writing_agent,
-            json.dumps(
+        writing = await model_calls.run(
+            writing_agent.get(),
+            build_input(
+                {"project": req.project},
                 {
-                    "project": req.project,
                     "topic": topic,
                     "research_summary": research_out.summary,
                     "key_points": research_out.key_points,
-                }
+                },
             ),
         )
         writing_out = writing.final_output
 
-        analysis = await Runner.run(
-            analysis_agent,
-            json.dumps({"project": req.project, "topic": topic, "draft": writing_out.draft}),
+        analysis = await model_calls.run(
+            analysis_agent.get(),
+            build_input({"project": req.project}, {"topic": topic, "draft": writing_out.draft}),
         )
         analysis_out = analysis.final_output
 
@@ -160,34 +362,18 @@ async def run_pipeline(req: ProjectRunRequest) -> tuple[list[TopicResult], PMOut
             )
         )
 
-    pm = await Runner.run(
-        pm_agent,
-        json.dumps(
-            {
-                "project": req.project,
-                "deadline": req.deadline,
-                "topic_results": [x.model_dump() for x in topic_results],
-            }
+    pm = await model_calls.run(
+        pm_agent.get(),
+        build_input(
+            {"project": req.project, "deadline": req.deadline},
+            {"topic_results": [x.model_dump() for x in topic_results]},
         ),
     )
     return topic_results, pm.final_output
 
 
-app = FastAPI(title="Multi-Agent System API", version="1.0.0")
-
-
-@app.on_event("startup")
-def startup() -> None:
-    init_db()
-
-
-@app.get("/health")
-def health() -> dict[str, str]:
-    return {"status": "ok"}
-
-
-@app.post("/api/projects/run", response_model=ProjectRunResponse)
-async def run_project(req: ProjectRunRequest, session: Session = Depends(get_session)) -> ProjectRunResponse:
+async def process_project_run(req: ProjectRunRequest, session: Session) -> ProjectRunResponse:
+    started = time.perf_counter()
     try:
         topic_results, pm_output = await run_pipeline(req)
         response = ProjectRunResponse(
@@ -210,14 +396,133 @@ async def run_project(req: ProjectRunRequest, session: Session = Depends(get_ses
         )
         status = "error"
 
-    session.add(
-        ProjectRunLog(
-            project_name=req.project,
-            request_json=json.dumps(req.model_dump(), ensure_ascii=False),
-            response_json=json.dumps(response.model_dump(), ensure_ascii=False),
-            status=status,
-        )
+    log = ProjectRunLog(
+        project_name=req.project,
+        request_json=json.dumps(req.model_dump(), ensure_ascii=False),
+        response_json=json.dumps(response.model_dump(), ensure_ascii=False),
+        status=status,
+        latency_ms=int((time.perf_counter() - started) * 1000),
     )
-    session.commit()
+    await db_writer.run(lambda db: db.add(log), session)
     return response
 
+
+app = FastAPI(title="Multi-Agent System API", version="1.0.0")
+if settings.profile_sample_rate > 0:
+    app.add_middleware(
+        ProfilerMiddleware,
+        directory=settings.profile_dir,
+        sample_rate=settings.profile_sample_rate,
+        interval_ms=settings.profile_interval_ms,
+        min_duration_ms=settings.profile_min_duration_ms,
+    )
+memory = MemoryDiagnostics(settings.memory_dir)
+app.include_router(memory.router(settings.admin_token))
+if settings.memory_sample_rate > 0:
+    app.add_middleware(AllocationSampler, diagnostics=memory, sample_rate=settings.memory_sample_rate)
+
+
+@app.on_event("startup")
+def startup() -> None:
+    init_db()
+    idempotency.purge_expired()
+    if settings.lazy_startup:
+        prewarm(research_agent, writing_agent, analysis_agent, pm_agent)
+    else:
+        research_agent.get()
+        writing_agent.get()
+        analysis_agent.get()
+        pm_agent.get()
+    if settings.loop_monitor:
+        loop_monitor.start()
+    if settings.memory_trace_frames > 0:
+        memory.start(settings.memory_trace_frames)
+    if settings.model_client_warmup:
+        model_client.start_warm_up()
+
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    loop_monitor.stop()
+    trace_store.force_flush()
+    await model_client.aclose()
+    await db_writer.close()
+
+
+@app.get("/health")
+def health() -> dict[str, str]:
+    return {"status": "ok"}
+
+
+@app.get("/api/model_calls")
+def model_call_metrics() -> dict[str, Any]:
+    return model_calls.metrics()
+
+
+@app.get("/api/loop")
+def loop_metrics() -> dict[str, Any]:
+    return {"loop": loop_monitor.metrics(), "model_runs": model_calls.in_flight()}
+
+
+@app.get("/api/traces")
+def trace_store_metrics() -> dict[str, Any]:
+    return trace_store.metrics()
+
+
+@app.get("/api/model_client")
+def model_client_metrics() -> dict[str, Any]:
+    return model_client.metrics()
+
+
+@app.get("/api/lanes")
+def lane_metrics() -> dict[str, Any]:
+    return lane_scheduler.metrics()
+
+
+@app.get("/api/admission")
+def admission_metrics() -> dict[str, Any]:
+    return {admission.name: admission.metrics()}
+
+
+@app.post("/api/projects/run", response_model=ProjectRunResponse)
+async def run_project(
+    req: ProjectRunRequest,
+    response: Response,
+    session: Session = Depends(get_session),
+    idempotency_key: str | None = Header(default=None),
+    x_priority: str | None = Header(default=None),
+) -> ProjectRunResponse:
+    with lane(resolve_lane(req.priority, x_priority)):
+        result, replayed = await idempotency.run(
+            "run_project",
+            idempotency_key,
+            req.model_dump(mode="json"),
+            ProjectRunResponse,
+            lambda: admission.run(process_project_run, req, session),
+        )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+
+@app.get("/api/analytics", response_model=LogAnalytics)
+def project_run_analytics(
+    project: str | None = None,
+    window_minutes: int = Query(default=60, ge=1, le=43200),
+    bucket_minutes: int | None = Query(default=None, ge=1),
+    until: datetime | None = None,
+    session: Session = Depends(get_session),
+) -> LogAnalytics:
+    end = until or datetime.utcnow()
+    bucket = bucket_minutes or max(1, window_minutes // 12)
+    try:
+        return log_analytics(
+            session,
+            ProjectRunLog,
+            {"project_name": project},
+            since=end - timedelta(minutes=window_minutes),
+            until=end,
+            bucket_seconds=bucket * 60,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
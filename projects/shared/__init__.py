@@ -0,0 +1,5 @@
+"""Building blocks shared by the project apps.
+
+Each app adds the ``projects`` directory to ``sys.path`` so ``shared`` imports work
+when it is started from its own folder with ``uvicorn app:app``.
+"""
@@ -0,0 +1,193 @@
+"""Admission control and load shedding for agent endpoints.
+
+Each limiter allows ``limit`` runs in flight and parks up to ``queue_size`` more in a
+FIFO queue for at most ``queue_timeout`` seconds. Anything beyond that is shed with
+``429`` and a ``Retry-After`` estimate instead of piling up until the process or the
+provider quota falls over.
+
+With ``adaptive`` on, the limit follows AIMD on observed run latency: every run that
+finishes under ``latency_target_ms`` while the limiter is saturated adds ``1/limit``
+(about one slot per full window), and a run that is slower than the target or fails
+multiplies the limit by ``backoff``. Only runs that started after the previous
+decrease can trigger another one, so a slow burst shrinks the limit once rather than
+once per request.
+
+Waiters are queued per priority lane (see ``lanes.py``): a free slot goes to an
+``interactive`` waiter before a ``batch`` one, and each lane has its own
+``queue_size``, so a bulk job can fill its own queue but never the interactive one.
+Batch waiters still leave the queue after ``queue_timeout``, so under sustained
+interactive load batch traffic is shed first.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, TypeVar
+
+from fastapi import HTTPException
+
+from .lanes import LANES, current_lane
+
+T = TypeVar("T")
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted; carries a Retry-After hint in seconds."""
+
+    def __init__(self, reason: str, retry_after: int) -> None:
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    def __init__(
+        self,
+        name: str,
+        limit: int = 8,
+        queue_size: int = 16,
+        queue_timeout: float = 10.0,
+        adaptive: bool = True,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        latency_target_ms: float = 30000.0,
+        backoff: float = 0.75,
+    ) -> None:
+        self.name = name
+        self.limit = float(limit)
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.adaptive = adaptive
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, limit)
+        self.latency_target_ms = latency_target_ms
+        self.backoff = backoff
+        self._in_flight = 0
+        self._waiters: dict[str, deque[asyncio.Future[None]]] = {name: deque() for name in LANES}
+        self._last_decrease = 0.0
+        self._latencies: deque[float] = deque(maxlen=1024)
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.increases = 0
+        self.decreases = 0
+
+    @property
+    def current_limit(self) -> int:
+        return max(1, int(self.limit))
+
+    @property
+    def queued(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    def _dispatch(self) -> None:
+        for waiters in self._waiters.values():
+            while waiters and self._in_flight < self.current_limit:
+                waiter = waiters.popleft()
+                self._in_flight += 1
+                waiter.set_result(None)
+
+    def retry_after(self) -> int:
+        """Rough time until a queued request would be admitted, from median run latency."""
+        if not self._latencies:
+            return 1
+        median = sorted(self._latencies)[len(self._latencies) // 2]
+        rounds = (self.queued + 1) / self.current_limit
+        return min(60, max(1, math.ceil(median * rounds)))
+
+    async def _acquire(self) -> None:
+        if not self.queued and self._in_flight < self.current_limit:
+            self._in_flight += 1
+            return
+        waiters = self._waiters[current_lane()]
+        if len(waiters) >= self.queue_size:
+            self.shed_queue_full += 1
+            raise Overloaded(f"{self.name} is at capacity", self.retry_after())
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                return
+            waiter.cancel()
+            waiters.remove(waiter)
+            self.shed_timeout += 1
+            raise Overloaded(f"{self.name} queue wait timed out", self.retry_after()) from None
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            else:
+                waiter.cancel()
+                waiters.remove(waiter)
+            raise
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _observe(self, started: float, elapsed: float, failed: bool) -> None:
+        self._latencies.append(elapsed)
+        if not self.adaptive:
+            return
+        if failed or elapsed * 1000 > self.latency_target_ms:
+            if started >= self._last_decrease:
+                self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                self._last_decrease = time.monotonic()
+                self.decreases += 1
+        elif self.queued or self._in_flight >= self.current_limit:
+            # Only grow while the limit is what is holding requests back.
+            before = self.current_limit
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            if self.current_limit > before:
+                self.increases += 1
+
+    async def run(self, handler: Callable[..., Awaitable[T]], *args: Any) -> T:
+        """Run ``handler(*args)`` in a slot; sheds with ``HTTPException(429)`` when full."""
+        try:
+            await self._acquire()
+        except Overloaded as exc:
+            raise HTTPException(
+                status_code=429, detail=str(exc), headers={"Retry-After": str(exc.retry_after)}
+            ) from exc
+
+        self.admitted += 1
+        started = time.monotonic()
+        failed = False
+        try:
+            return await handler(*args)
+        except HTTPException as exc:
+            failed = exc.status_code >= 500
+            raise
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._observe(started, time.monotonic() - started, failed)
+            self._release()
+
+    def metrics(self) -> dict[str, Any]:
+        ordered = sorted(self._latencies)
+
+        def pct(q: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1) if ordered else 0.0
+
+        return {
+            "limit": self.current_limit,
+            "limit_exact": round(self.limit, 3),
+            "adaptive": self.adaptive,
+            "in_flight": self._in_flight,
+            "queued": self.queued,
+            "queued_by_lane": {name: len(waiters) for name, waiters in self._waiters.items()},
+            "queue_size": self.queue_size,
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+            "limit_increases": self.increases,
+            "limit_decreases": self.decreases,
+            "latency_p50_ms": pct(0.50),
+            "latency_p95_ms": pct(0.95),
+        }
@@ -0,0 +1,151 @@
+"""Windowed counts, error rates and latency percentiles over a log table.
+
+The log tables carry covering indexes that lead with the filter column (task, client,
+platform, project) or with ``created_at`` and include ``status`` and ``latency_ms``.
+A window query is therefore one index range scan that never touches the table rows,
+and its cost depends on how many rows fall inside the window, not on the table size.
+
+Everything is aggregated in the database. Counts and errors come from one ``GROUP BY``
+over the time bucket. Latency percentiles use ``percentile_disc`` on PostgreSQL. SQLite
+has no percentile function, so there the query returns a ``(bucket, latency_ms, count)``
+histogram and the nearest-rank percentiles are read off it; its size depends on the
+number of distinct latencies, not on the number of rows.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from pydantic import BaseModel
+from sqlalchemy import Integer, case, cast, func
+from sqlmodel import Session, select
+
+MAX_BUCKETS = 1440
+PERCENTILES = (0.50, 0.95, 0.99)
+
+
+class WindowStats(BaseModel):
+    start: datetime
+    total: int = 0
+    errors: int = 0
+    error_rate: float = 0.0
+    latency_p50_ms: int | None = None
+    latency_p95_ms: int | None = None
+    latency_p99_ms: int | None = None
+
+
+class LogAnalytics(BaseModel):
+    since: datetime
+    until: datetime
+    bucket_seconds: int
+    filters: dict[str, str]
+    summary: WindowStats
+    buckets: list[WindowStats]
+
+
+def naive_utc(value: datetime) -> datetime:
+    """Log rows store naive UTC; convert aware inputs such as ``...Z`` to match."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _histogram_percentiles(histogram: dict[int, int]) -> list[int | None]:
+    total = sum(histogram.values())
+    if not total:
+        return [None] * len(PERCENTILES)
+    ordered = sorted(histogram.items())
+    result = []
+    for q in PERCENTILES:
+        rank = min(total - 1, int(q * total))
+        seen = 0
+        for latency, count in ordered:
+            seen += count
+            if seen > rank:
+                result.append(latency)
+                break
+    return result
+
+
+def _stats(start: datetime, total: int, errors: int, percentiles: list[int | None]) -> WindowStats:
+    p50, p95, p99 = percentiles
+    return WindowStats(
+        start=start,
+        total=total,
+        errors=errors,
+        error_rate=round(errors / total, 4) if total else 0.0,
+        latency_p50_ms=p50,
+        latency_p95_ms=p95,
+        latency_p99_ms=p99,
+    )
+
+
+def log_analytics(
+    session: Session,
+    model: Any,
+    filters: dict[str, str | None],
+    since: datetime,
+    until: datetime,
+    bucket_seconds: int,
+) -> LogAnalytics:
+    """Summarize ``model`` rows with ``since <= created_at < until`` matching ``filters``.
+
+    Raises ``ValueError`` when the window needs more than ``MAX_BUCKETS`` buckets.
+    """
+    since, until = naive_utc(since), naive_utc(until)
+    if since >= until:
+        raise ValueError("since must be before until")
+    step = timedelta(seconds=bucket_seconds)
+    count = max(1, -(-int((until - since).total_seconds()) // bucket_seconds))
+    if count > MAX_BUCKETS:
+        raise ValueError(f"window splits into more than {MAX_BUCKETS} buckets; use a larger bucket")
+
+    active = {name: value for name, value in filters.items() if value is not None}
+    conditions = [model.created_at >= since, model.created_at < until]
+    conditions += [getattr(model, name) == value for name, value in active.items()]
+    postgres = session.get_bind().dialect.name == "postgresql"
+    if postgres:
+        bucket = cast(func.floor(func.extract("epoch", model.created_at - since) / bucket_seconds), Integer)
+    else:
+        bucket = cast((func.julianday(model.created_at) - func.julianday(since)) * 86400 / bucket_seconds, Integer)
+    bucket = bucket.label("bucket")
+
+    totals = [0] * count
+    errors = [0] * count
+    counts = select(bucket, func.count(), func.sum(case((model.status == "error", 1), else_=0)))
+    for index, total, failed in session.exec(counts.where(*conditions).group_by(bucket)).all():
+        index = min(count - 1, max(0, int(index)))
+        totals[index] += total
+        errors[index] += failed or 0
+
+    with_latency = [*conditions, model.latency_ms.is_not(None)]
+    percentiles: list[list[int | None]] = [[None] * len(PERCENTILES) for _ in range(count)]
+    if postgres:
+        columns = [func.percentile_disc(q).within_group(model.latency_ms) for q in PERCENTILES]
+        for index, *values in session.exec(select(bucket, *columns).where(*with_latency).group_by(bucket)).all():
+            percentiles[min(count - 1, max(0, int(index)))] = values
+        summary_percentiles = list(session.exec(select(*columns).where(*with_latency)).one())
+    else:
+        histograms: list[dict[int, int]] = [{} for _ in range(count)]
+        overall: dict[int, int] = {}
+        rows = session.exec(
+            select(bucket, model.latency_ms, func.count()).where(*with_latency).group_by(bucket, model.latency_ms)
+        ).all()
+        for index, latency, hits in rows:
+            histogram = histograms[min(count - 1, max(0, int(index)))]
+            histogram[latency] = histogram.get(latency, 0) + hits
+            overall[latency] = overall.get(latency, 0) + hits
+        percentiles = [_histogram_percentiles(histogram) for histogram in histograms]
+        summary_percentiles = _histogram_percentiles(overall)
+
+    return LogAnalytics(
+        since=since,
+        until=until,
+        bucket_seconds=bucket_seconds,
+        filters=active,
+        summary=_stats(since, sum(totals), sum(errors), summary_percentiles),
+        buckets=[
+            _stats(since + i * step, totals[i], errors[i], percentiles[i]) for i in range(count)
+        ],
+    )
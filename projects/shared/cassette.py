@@ -0,0 +1,151 @@
+"""Record/replay cassettes for agent runs.
+
+In ``record`` mode every successful ``ModelCaller.run`` appends one JSON line to the
+cassette: the canonical request hash, the agent's final output, token usage and the
+observed latency. In ``replay`` mode the file is loaded into memory once and matching
+runs are answered from it without calling the model, optionally sleeping for the
+recorded latency times ``latency_scale`` (``0`` answers immediately). A request that
+was never recorded raises ``CassetteMiss`` so load tests cannot silently hit the API.
+
+The hash covers the agent name, model, instructions, output type and input, so
+changing a prompt invalidates its recordings. When one request was recorded several
+times, replay cycles through the recordings to keep their latency spread.
+
+Recordings are taken at the ``ModelCaller.run`` level, not the HTTP level: a line holds
+the run's result, not the model requests and responses behind it (tool calls,
+handoffs and retries are not replayed individually). Replayed runs still take a lane
+slot and show up in ``ModelCaller.in_flight()``, so a load test sees the same queueing
+as a live run.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from dataclasses import dataclass
+from hashlib import sha256
+from itertools import count
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from agents import Agent
+    from agents.run_context import RunContextWrapper
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode for a request that is not in the cassette."""
+
+
+@dataclass
+class ReplayedRun:
+    """The parts of ``RunResult`` the apps read, rebuilt from a recording."""
+
+    final_output: Any
+    context_wrapper: RunContextWrapper[Any]
+
+
+def request_key(agent: Agent[Any], input: Any) -> str:
+    output_type = getattr(agent.output_type, "__name__", None) if agent.output_type else None
+    document = {
+        "agent": agent.name,
+        "model": str(agent.model),
+        "instructions": agent.instructions if isinstance(agent.instructions, str) else None,
+        "output_type": output_type,
+        "input": input,
+    }
+    return sha256(json.dumps(document, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    def __init__(self, path: str | os.PathLike[str], mode: str = "replay", latency_scale: float = 1.0) -> None:
+        if mode not in ("record", "replay"):
+            raise ValueError(f"unknown cassette mode: {mode!r}")
+        self.path = Path(path)
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._entries: dict[str, list[dict[str, Any]]] = {}
+        self._turns: dict[str, count[int]] = {}
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        if mode == "replay":
+            self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            raise FileNotFoundError(f"cassette not found: {self.path}")
+        with self.path.open(encoding="utf-8") as handle:
+            for line in handle:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def record(self, agent: Agent[Any], input: Any, result: Any, latency: float) -> None:
+        output = result.final_output
+        usage = result.context_wrapper.usage
+        entry = {
+            "key": request_key(agent, input),
+            "agent": agent.name,
+            "latency": round(latency, 4),
+            "output": output.model_dump(mode="json") if isinstance(output, BaseModel) else output,
+            "usage": [
+                usage.requests,
+                usage.input_tokens,
+                usage.input_tokens_details.cached_tokens or 0,
+                usage.output_tokens,
+            ],
+        }
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        # File I/O off the event loop, so a slow disk does not stall other requests.
+        await asyncio.to_thread(self._append, line)
+        self.recorded += 1
+
+    def _append(self, line: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # One short append per line; O_APPEND keeps lines whole across worker processes.
+        with self.path.open("a", encoding="utf-8") as handle:
+            handle.write(line)
+
+    async def replay(self, agent: Agent[Any], input: Any) -> ReplayedRun:
+        from agents.run_context import RunContextWrapper
+        from agents.usage import InputTokensDetails, Usage
+
+        key = request_key(agent, input)
+        entries = self._entries.get(key)
+        if not entries:
+            self.misses += 1
+            raise CassetteMiss(f"no recording for {agent.name} request {key[:12]}")
+        entry = entries[next(self._turns.setdefault(key, count())) % len(entries)]
+        if self.latency_scale > 0:
+            await asyncio.sleep(entry["latency"] * self.latency_scale)
+
+        output = entry["output"]
+        if isinstance(agent.output_type, type) and issubclass(agent.output_type, BaseModel):
+            output = agent.output_type.model_validate(output)
+        requests, input_tokens, cached_tokens, output_tokens = entry["usage"]
+        usage = Usage(
+            requests=requests,
+            input_tokens=input_tokens,
+            input_tokens_details=InputTokensDetails(cached_tokens=cached_tokens, cache_write_tokens=0),
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+        )
+        self.replayed += 1
+        return ReplayedRun(final_output=output, context_wrapper=RunContextWrapper(context=None, usage=usage))
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "path": str(self.path),
+            "requests": len(self._entries),
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+        }
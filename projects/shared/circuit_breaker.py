@@ -0,0 +1,124 @@
+"""Per-model circuit breaker.
+
+A breaker watches the last ``window`` calls to one model. Once at least ``min_calls``
+are recorded and either the error rate or the share of calls slower than
+``slow_call_seconds`` reaches its threshold, the circuit opens: callers stop sending
+traffic to that model (``ModelCaller`` switches to the fallback model) instead of
+waiting out timeouts. After ``open_seconds`` the circuit goes half-open and lets
+``half_open_probes`` trial calls through; if they all succeed it closes again, and any
+failure reopens it.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import deque
+from typing import Any
+
+logger = logging.getLogger("shared.circuit_breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised when a model's circuit is open and no fallback model is configured."""
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 10,
+        error_rate: float = 0.5,
+        slow_call_seconds: float = 30.0,
+        slow_rate: float = 0.5,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 2,
+    ) -> None:
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self._results: deque[tuple[bool, bool]] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.transitions: dict[str, int] = {}
+        self.rejected = 0
+
+    def _transition(self, state: str, reason: str) -> None:
+        logger.warning("Circuit for model %s: %s -> %s (%s)", self.name, self.state, state, reason)
+        key = f"{self.state}->{state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        self.state = state
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        elif state == CLOSED:
+            self._results.clear()
+
+    def allow(self) -> bool:
+        """Whether a call may go to this model now; counts it as a probe when half-open."""
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN, f"{self.open_seconds:g}s elapsed")
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and self._probes_in_flight + self._probe_successes < self.half_open_probes:
+            self._probes_in_flight += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def _rates(self) -> tuple[float, float]:
+        if not self._results:
+            return 0.0, 0.0
+        errors = sum(1 for ok, _ in self._results if not ok)
+        slow = sum(1 for _, is_slow in self._results if is_slow)
+        return errors / len(self._results), slow / len(self._results)
+
+    def record(self, ok: bool | None, elapsed: float) -> None:
+        """Record a finished call; ``ok=None`` (e.g. a cancelled hedge) only frees its probe slot."""
+        slow = elapsed >= self.slow_call_seconds
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if ok is None:
+                return
+            if not ok or slow:
+                self._transition(OPEN, "probe failed" if not ok else f"probe took {elapsed:.1f}s")
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_probes:
+                self._transition(CLOSED, f"{self._probe_successes} probes succeeded")
+            return
+        if ok is None or self.state != CLOSED:
+            return
+
+        self._results.append((ok, slow))
+        if len(self._results) < self.min_calls:
+            return
+        errors, slow_share = self._rates()
+        if errors >= self.error_rate:
+            self._transition(OPEN, f"error rate {errors:.0%} over last {len(self._results)} calls")
+        elif slow_share >= self.slow_rate:
+            reason = f"{slow_share:.0%} of last {len(self._results)} calls took {self.slow_call_seconds:g}s or more"
+            self._transition(OPEN, reason)
+
+    def metrics(self) -> dict[str, Any]:
+        errors, slow_share = self._rates()
+        return {
+            "state": self.state,
+            "window_calls": len(self._results),
+            "error_rate": round(errors, 3),
+            "slow_rate": round(slow_share, 3),
+            "rejected": self.rejected,
+            "transitions": dict(self.transitions),
+        }
@@ -0,0 +1,199 @@
+"""SQLite connection tuning and a per-process single-writer queue.
+
+``tune_sqlite`` sets pragmas on every new SQLite connection:
+
+- WAL journal, so readers never wait for a writer and a writer never waits for readers.
+- ``synchronous=NORMAL``, which cannot corrupt a WAL database and fsyncs only at
+  checkpoints; a power loss can drop the last few commits.
+- ``busy_timeout``, so a writer waits for the lock instead of failing straight away
+  with ``database is locked``.
+- A memory-mapped region and a larger page cache.
+
+It does nothing for other databases.
+
+``SingleWriter`` funnels write callbacks from every coroutine of a process into one
+consumer, which applies them in batches on a worker thread: one transaction and one
+commit per batch instead of one per request. If a batch fails, its callbacks are
+retried one by one so a bad row only fails its own caller.
+
+``sync_tables`` replaces ``create_all`` at startup. ``create_all`` creates missing
+tables but never alters existing ones, so columns and indexes added to a model later
+never reach databases created by an older release; ``sync_tables`` adds them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Callable, TypeVar
+
+from sqlalchemy import Index, MetaData, event, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import Session
+
+T = TypeVar("T")
+WriteFn = Callable[[Session], Any]
+logger = logging.getLogger("shared.db")
+
+
+def tune_sqlite(
+    engine: Engine,
+    busy_timeout_ms: int = 5000,
+    synchronous: str = "NORMAL",
+    mmap_size: int = 256 * 1024 * 1024,
+    cache_size_kib: int = 16 * 1024,
+) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+    if synchronous.upper() not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+        raise ValueError(f"invalid synchronous mode: {synchronous!r}")
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={synchronous.upper()}",
+        f"PRAGMA busy_timeout={int(busy_timeout_ms)}",
+        f"PRAGMA mmap_size={int(mmap_size)}",
+        # Negative values are KiB rather than pages.
+        f"PRAGMA cache_size={-int(cache_size_kib)}",
+    ]
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection: Any, _record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def sync_tables(engine: Engine, metadata: MetaData, defaults: dict[str, str] | None = None) -> list[str]:
+    """Create missing tables, and add the columns and indexes existing tables lack.
+
+    Added columns are nullable, except those named in ``defaults``, which maps
+    ``"table.column"`` to a SQL literal and adds the column as ``NOT NULL DEFAULT``.
+    The API and worker processes may run this at the same time: a table, column or
+    index that another process created first is skipped rather than failing startup.
+    Returns the added columns as ``"table.column"``.
+    """
+    defaults = defaults or {}
+    added = []
+    existing_tables = set(inspect(engine).get_table_names())
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            try:
+                table.create(engine, checkfirst=True)
+            except DBAPIError:
+                if table.name not in inspect(engine).get_table_names():
+                    raise
+            for index in table.indexes:
+                _create_index(engine, index)
+            continue
+        present = {column["name"] for column in inspect(engine).get_columns(table.name)}
+        for column in table.columns:
+            if column.name in present:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+            default = defaults.get(f"{table.name}.{column.name}")
+            if default is not None:
+                ddl += f" NOT NULL DEFAULT {default}"
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(ddl))
+            except DBAPIError:
+                if column.name not in {c["name"] for c in inspect(engine).get_columns(table.name)}:
+                    raise
+                continue
+            added.append(f"{table.name}.{column.name}")
+        for index in table.indexes:
+            _create_index(engine, index)
+    if added:
+        logger.info("added columns: %s", ", ".join(added))
+    return added
+
+
+def _create_index(engine: Engine, index: Index) -> None:
+    try:
+        index.create(engine, checkfirst=True)
+    except DBAPIError:
+        if index.name not in {i["name"] for i in inspect(engine).get_indexes(index.table.name)}:
+            raise
+
+
+class SingleWriter:
+    def __init__(self, engine: Engine, enabled: bool = True, batch_size: int = 64) -> None:
+        self.engine = engine
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self._queue: asyncio.Queue[tuple[WriteFn, asyncio.Future[Any]]] | None = None
+        self._consumer: asyncio.Task[None] | None = None
+
+    def _write_one(self, fn: WriteFn) -> tuple[bool, Any]:
+        with Session(self.engine, expire_on_commit=False) as session:
+            try:
+                result = fn(session)
+                session.commit()
+                return True, result
+            except Exception as exc:
+                session.rollback()
+                return False, exc
+
+    def _write_batch(self, fns: list[WriteFn]) -> list[tuple[bool, Any]]:
+        if len(fns) == 1:
+            return [self._write_one(fns[0])]
+        with Session(self.engine, expire_on_commit=False) as session:
+            try:
+                results = [fn(session) for fn in fns]
+                session.commit()
+                return [(True, result) for result in results]
+            except Exception:
+                session.rollback()
+        return [self._write_one(fn) for fn in fns]
+
+    async def _consume(self, queue: asyncio.Queue[tuple[WriteFn, asyncio.Future[Any]]]) -> None:
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                outcomes = await asyncio.to_thread(self._write_batch, [fn for fn, _ in batch])
+            except Exception as exc:
+                outcomes = [(False, exc)] * len(batch)
+            for (_, future), (ok, value) in zip(batch, outcomes):
+                if not future.done():
+                    if ok:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(value)
+                queue.task_done()
+
+    async def run(self, fn: Callable[[Session], T], session: Session | None = None) -> T:
+        """Apply ``fn(session)`` in a committed transaction and return its result.
+
+        When the writer is disabled, ``fn`` runs inline on ``session`` (or a new one).
+        """
+        if not self.enabled:
+            if session is None:
+                ok, value = self._write_one(fn)
+                if not ok:
+                    raise value
+                return value
+            result = fn(session)
+            session.commit()
+            return result
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._consumer is None or self._consumer.done():
+            self._queue = asyncio.Queue()
+            self._consumer = loop.create_task(self._consume(self._queue))
+        future: asyncio.Future[T] = loop.create_future()
+        await self._queue.put((fn, future))
+        return await future
+
+    async def close(self) -> None:
+        """Wait for queued writes to finish and stop the consumer."""
+        if self._consumer is None:
+            return
+        if self._queue is not None and not self._consumer.done():
+            await self._queue.join()
+        self._consumer.cancel()
+        self._consumer = None
@@ -0,0 +1,119 @@
+"""Local stand-in for the OpenAI Responses API.
+
+Start it, then point an app at it::
+
+    python ../shared/fake_model_server.py --port 8010 --latency-ms 300
+    MODEL_BASE_URL=http://127.0.0.1:8010/v1 uvicorn app:app
+
+``POST /v1/responses`` waits ``--latency-ms`` and then answers with one assistant
+message. When the request asks for structured output, the message is the smallest JSON
+value that fits the schema: the first enum value, ``"stub"`` for strings, ``0``,
+``false`` and empty lists. ``GET /v1/models`` answers the client warm-up. ``GET /stats``
+counts requests and the distinct TCP connections they came from, so pooling and
+keep-alive can be checked from outside.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Any
+
+from fastapi import FastAPI, Request
+
+app = FastAPI(title="Fake model server")
+app.state.latency_seconds = 0.0
+stats: dict[str, Any] = {"responses": 0, "models": 0, "connections": set()}
+
+
+def sample(schema: dict[str, Any], defs: dict[str, Any]) -> Any:
+    if "$ref" in schema:
+        return sample(defs[schema["$ref"].rsplit("/", 1)[-1]], defs)
+    if "const" in schema:
+        return schema["const"]
+    if "enum" in schema:
+        return schema["enum"][0]
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [option for option in schema[key] if option.get("type") != "null"] or schema[key]
+            return sample(options[0], defs)
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((item for item in kind if item != "null"), "null")
+    if kind == "object":
+        return {name: sample(prop, defs) for name, prop in schema.get("properties", {}).items()}
+    return {"array": [], "string": "stub", "integer": 0, "number": 0, "boolean": False}.get(kind)
+
+
+def output_text(body: dict[str, Any]) -> str:
+    text_format = (body.get("text") or {}).get("format") or {}
+    schema = text_format.get("schema")
+    if text_format.get("type") != "json_schema" or not schema:
+        return "stub"
+    return json.dumps(sample(schema, schema.get("$defs", {})))
+
+
+@app.get("/v1/models")
+async def list_models(request: Request) -> dict[str, Any]:
+    stats["models"] += 1
+    stats["connections"].add(request.client.port if request.client else None)
+    return {"object": "list", "data": [{"id": "stub-model", "object": "model", "created": 0, "owned_by": "local"}]}
+
+
+@app.post("/v1/responses")
+async def create_response(request: Request) -> dict[str, Any]:
+    body = await request.json()
+    stats["responses"] += 1
+    stats["connections"].add(request.client.port if request.client else None)
+    if app.state.latency_seconds:
+        await asyncio.sleep(app.state.latency_seconds)
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": body.get("model", "stub-model"),
+        "status": "completed",
+        "output": [
+            {
+                "type": "message",
+                "id": f"msg_{uuid.uuid4().hex}",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": output_text(body), "annotations": []}],
+            }
+        ],
+        "parallel_tool_calls": False,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": 10,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": 5,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": 15,
+        },
+    }
+
+
+@app.get("/stats")
+async def get_stats() -> dict[str, Any]:
+    return {"responses": stats["responses"], "models": stats["models"], "connections": len(stats["connections"])}
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    app.state.latency_seconds = args.latency_ms / 1000
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Idempotency-Key support for expensive POST endpoints.
+
+The first request with a given key inserts an ``in_progress`` row keyed by
+``(scope, key)`` and runs the handler; its response is stored on the row. A repeat
+with the same key and request body gets the stored response back, and a repeat that
+arrives while the first one is still running waits for it instead of starting a second
+agent run. Rows expire after a configurable window.
+
+While the handler runs, ``expires_at`` is a short lease that the owner renews every
+third of ``lease_seconds``. If the process dies mid-request the lease lapses, and the
+next request with the key (or one already waiting on it) takes the row over instead of
+getting ``409`` until the full window has passed. Completion extends ``expires_at`` to
+the full window.
+
+Each claim writes a fresh ``owner`` token, and renewal, completion and release only
+touch the row while it still carries that token. An owner whose lease was taken over
+therefore cannot delete or overwrite the new owner's row: it stops renewing, and its
+response goes back to its own caller without being stored.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from hashlib import sha256
+from typing import Any, Awaitable, Callable, TypeVar
+from uuid import uuid4
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import delete, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Field as SQLField
+from sqlmodel import SQLModel, Session
+
+ResponseT = TypeVar("ResponseT", bound=BaseModel)
+logger = logging.getLogger("shared.idempotency")
+
+
+class IdempotencyRecord(SQLModel, table=True):
+    __tablename__ = "idempotency_keys"
+
+    scope: str = SQLField(primary_key=True)
+    key: str = SQLField(primary_key=True, max_length=255)
+    request_hash: str = SQLField(max_length=64)
+    status: str = "in_progress"
+    owner: str | None = SQLField(default=None, max_length=32)
+    response_json: str | None = None
+    created_at: datetime = SQLField(default_factory=datetime.utcnow)
+    expires_at: datetime = SQLField(index=True)
+
+
+def request_hash(body: Any) -> str:
+    return sha256(json.dumps(body, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(
+        self, engine: Engine, ttl_seconds: int = 86400, wait_seconds: float = 60.0, lease_seconds: float = 30.0
+    ) -> None:
+        self.engine = engine
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.wait_seconds = wait_seconds
+        self.lease = timedelta(seconds=lease_seconds)
+        self._local: dict[tuple[str, str], asyncio.Event] = {}
+
+    def _claim(self, scope: str, key: str, digest: str) -> tuple[str | None, IdempotencyRecord | None]:
+        """Insert an in-progress row owned by a new token.
+
+        Returns ``(token, None)`` when the key was claimed and ``(None, row)`` when a live
+        row exists. Expired rows, including in-progress rows whose lease lapsed, are
+        replaced.
+        """
+        now = datetime.utcnow()
+        token = uuid4().hex
+        with Session(self.engine) as session:
+            session.execute(
+                delete(IdempotencyRecord).where(
+                    IdempotencyRecord.scope == scope,
+                    IdempotencyRecord.key == key,
+                    IdempotencyRecord.expires_at <= now,
+                )
+            )
+            session.add(
+                IdempotencyRecord(scope=scope, key=key, request_hash=digest, owner=token, expires_at=now + self.lease)
+            )
+            try:
+                session.commit()
+                return token, None
+            except IntegrityError:
+                session.rollback()
+            existing = session.get(IdempotencyRecord, (scope, key))
+            if existing is None:
+                # Finished and expired between our insert and read; treat as a fresh claim.
+                return self._claim(scope, key, digest)
+            return None, existing
+
+    @staticmethod
+    def _owned(scope: str, key: str, token: str) -> tuple[Any, ...]:
+        return (
+            IdempotencyRecord.scope == scope,
+            IdempotencyRecord.key == key,
+            IdempotencyRecord.owner == token,
+            IdempotencyRecord.status == "in_progress",
+        )
+
+    def _complete(self, scope: str, key: str, token: str, response_json: str) -> bool:
+        """Store the response; False when the row is no longer ours."""
+        with Session(self.engine) as session:
+            stored = session.execute(
+                update(IdempotencyRecord)
+                .where(*self._owned(scope, key, token))
+                .values(status="completed", response_json=response_json, expires_at=datetime.utcnow() + self.ttl)
+            ).rowcount
+            session.commit()
+        return stored == 1
+
+    def _renew(self, scope: str, key: str, token: str) -> bool:
+        """Extend the lease; False when the row is no longer ours."""
+        with Session(self.engine) as session:
+            renewed = session.execute(
+                update(IdempotencyRecord)
+                .where(*self._owned(scope, key, token))
+                .values(expires_at=datetime.utcnow() + self.lease)
+            ).rowcount
+            session.commit()
+        return renewed == 1
+
+    async def _heartbeat(self, scope: str, key: str, token: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease.total_seconds() / 3)
+            try:
+                if not await asyncio.to_thread(self._renew, scope, key, token):
+                    logger.warning("lost the idempotency lease for %s/%s", scope, key)
+                    return
+            except Exception:
+                # A missed renewal only shortens the lease; the next one may succeed.
+                continue
+
+    def _release(self, scope: str, key: str, token: str) -> None:
+        with Session(self.engine) as session:
+            session.execute(delete(IdempotencyRecord).where(*self._owned(scope, key, token)))
+            session.commit()
+
+    def _get(self, scope: str, key: str) -> IdempotencyRecord | None:
+        with Session(self.engine) as session:
+            return session.get(IdempotencyRecord, (scope, key))
+
+    def purge_expired(self) -> int:
+        with Session(self.engine) as session:
+            purged = session.execute(
+                delete(IdempotencyRecord).where(IdempotencyRecord.expires_at <= datetime.utcnow())
+            ).rowcount
+            session.commit()
+        return purged
+
+    async def _wait_for(self, scope: str, key: str) -> IdempotencyRecord | None:
+        deadline = asyncio.get_running_loop().time() + self.wait_seconds
+        while asyncio.get_running_loop().time() < deadline:
+            local = self._local.get((scope, key))
+            if local is not None:
+                try:
+                    await asyncio.wait_for(local.wait(), timeout=deadline - asyncio.get_running_loop().time())
+                except asyncio.TimeoutError:
+                    break
+            else:
+                # The first request runs in another process; poll its row.
+                await asyncio.sleep(0.1)
+            record = await asyncio.to_thread(self._get, scope, key)
+            if record is None or record.status == "completed":
+                return record
+            if record.expires_at <= datetime.utcnow():
+                # The owner stopped renewing its lease; let the caller reclaim the key.
+                return None
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+
+    async def run(
+        self,
+        scope: str,
+        key: str | None,
+        body: Any,
+        response_model: type[ResponseT],
+        handler: Callable[[], Awaitable[ResponseT]],
+    ) -> tuple[ResponseT, bool]:
+        """Run ``handler`` once per ``(scope, key)``; returns ``(response, replayed)``."""
+        if not key:
+            return await handler(), False
+        if len(key) > 255:
+            raise HTTPException(status_code=400, detail="Idempotency-Key must be at most 255 characters")
+
+        digest = request_hash(body)
+        while True:
+            token, existing = await asyncio.to_thread(self._claim, scope, key, digest)
+            if existing is None:
+                break
+            if existing.request_hash != digest:
+                raise HTTPException(
+                    status_code=422, detail="Idempotency-Key was already used with a different request"
+                )
+            if existing.status == "in_progress":
+                existing = await self._wait_for(scope, key)
+                if existing is None:
+                    # The first request failed, released the key or lost its lease; try
+                    # to take it over.
+                    continue
+            return response_model.model_validate_json(existing.response_json or "{}"), True
+
+        done = self._local[(scope, key)] = asyncio.Event()
+        heartbeat = asyncio.create_task(self._heartbeat(scope, key, token))
+        try:
+            response = await handler()
+        except BaseException:
+            await asyncio.to_thread(self._release, scope, key, token)
+            raise
+        else:
+            if not await asyncio.to_thread(self._complete, scope, key, token, response.model_dump_json()):
+                # Another request took the key over after our lease lapsed; its row wins.
+                logger.warning("idempotency lease for %s/%s was taken over; response not stored", scope, key)
+            return response, False
+        finally:
+            heartbeat.cancel()
+            done.set()
+            if self._local.get((scope, key)) is done:
+                del self._local[(scope, key)]
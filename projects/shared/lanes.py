@@ -0,0 +1,229 @@
+"""Priority lanes for interactive and batch agent runs.
+
+Interactive requests and bulk jobs share the same endpoints and the same upstream
+model concurrency. ``LaneScheduler`` sits in front of the agent runners:
+``ModelCaller.run`` takes one of ``limit`` slots per run. When all slots are busy,
+runs wait in a FIFO queue per lane, and a freed slot goes to:
+
+1. the lane whose oldest waiter has waited longer than ``max_wait_seconds``
+   (starvation protection: the waiter is promoted regardless of mode and reserve);
+2. otherwise, with ``mode="strict"``, the first lane in ``LANES`` with waiters;
+3. otherwise, with ``mode="weighted"``, a lane picked by smooth weighted round-robin
+   over the lanes with waiters (``weights``, default interactive 4 : batch 1).
+
+``batch`` never holds more than ``limit - reserved_interactive`` slots, so an
+interactive run arriving while a batch job saturates the limit usually finds a free
+slot and does not wait for a long batch run to finish.
+
+The lane of the current request lives in a context variable: endpoints wrap their
+work in ``with lane(resolve_lane(req.priority, x_priority)):``, and background jobs use
+``with lane("batch"):``. Runs outside any ``lane`` block count as interactive.
+``metrics()`` reports queue wait, run time and total latency percentiles per lane.
+With ``enabled=False`` runs are never queued, but latencies are still recorded.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Iterator, Literal
+
+from fastapi import HTTPException
+
+Lane = Literal["interactive", "batch"]
+LANES: tuple[str, ...] = ("interactive", "batch")
+
+_current_lane: ContextVar[str] = ContextVar("priority_lane", default="interactive")
+
+
+class LaneWaitTimeout(TimeoutError):
+    """Raised when a run waited for a slot longer than its timeout."""
+
+
+def resolve_lane(field: str | None, header: str | None, default: str = "interactive") -> str:
+    """Lane from the request body field, else the ``X-Priority`` header, else ``default``."""
+    value = (field or header or default).strip().lower()
+    if value not in LANES:
+        raise HTTPException(status_code=422, detail=f"priority must be one of {', '.join(LANES)}")
+    return value
+
+
+def current_lane() -> str:
+    return _current_lane.get()
+
+
+@contextmanager
+def lane(name: str) -> Iterator[None]:
+    token = _current_lane.set(name)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+class LaneStats:
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.admitted = 0
+        self.promoted = 0
+        self.timeouts = 0
+        self.waits: deque[float] = deque(maxlen=1024)
+        self.runs: deque[float] = deque(maxlen=1024)
+        self.totals: deque[float] = deque(maxlen=1024)
+
+
+def percentiles(samples: deque[float], prefix: str) -> dict[str, float]:
+    ordered = sorted(samples)
+
+    def pct(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1) if ordered else 0.0
+
+    return {f"{prefix}_p50_ms": pct(0.50), f"{prefix}_p95_ms": pct(0.95), f"{prefix}_p99_ms": pct(0.99)}
+
+
+class LaneScheduler:
+    def __init__(
+        self,
+        limit: int = 8,
+        mode: Literal["weighted", "strict"] = "weighted",
+        weights: dict[str, int] | None = None,
+        reserved_interactive: int = 1,
+        max_wait_seconds: float = 30.0,
+        enabled: bool = True,
+    ) -> None:
+        self.limit = limit
+        self.mode = mode
+        self.weights = {name: 1 for name in LANES} | {"interactive": 4} | (weights or {})
+        self.reserved_interactive = min(reserved_interactive, limit - 1)
+        self.max_wait_seconds = max_wait_seconds
+        self.enabled = enabled
+        self._in_flight = 0
+        self._waiters: dict[str, deque[tuple[asyncio.Future[None], float]]] = {name: deque() for name in LANES}
+        self._credits = {name: 0 for name in LANES}
+        self._stats = {name: LaneStats() for name in LANES}
+
+    def _allowed(self, name: str) -> bool:
+        if name == "interactive":
+            return True
+        return self._stats[name].in_flight < self.limit - self.reserved_interactive
+
+    def _pick(self) -> str | None:
+        now = time.monotonic()
+        heads = {name: waiters[0][1] for name, waiters in self._waiters.items() if waiters}
+        starved = [name for name, since in heads.items() if now - since >= self.max_wait_seconds]
+        if starved:
+            name = min(starved, key=heads.__getitem__)
+            self._stats[name].promoted += 1
+            return name
+        ready = [name for name in heads if self._allowed(name)]
+        if not ready:
+            return None
+        if self.mode == "strict":
+            return ready[0]
+        # Smooth weighted round-robin: every ready lane earns its weight, the richest
+        # lane wins and pays back the total.
+        for name in ready:
+            self._credits[name] += self.weights[name]
+        chosen = max(ready, key=self._credits.__getitem__)
+        self._credits[chosen] -= sum(self.weights[name] for name in ready)
+        return chosen
+
+    def _dispatch(self) -> None:
+        while self._in_flight < self.limit:
+            name = self._pick()
+            if name is None:
+                return
+            waiter, _ = self._waiters[name].popleft()
+            self._grant(name)
+            waiter.set_result(None)
+
+    def _grant(self, name: str) -> None:
+        self._in_flight += 1
+        self._stats[name].in_flight += 1
+        self._stats[name].admitted += 1
+
+    def _release(self, name: str) -> None:
+        self._in_flight -= 1
+        self._stats[name].in_flight -= 1
+        self._dispatch()
+
+    async def _acquire(self, name: str) -> None:
+        if not self.enabled:
+            self._stats[name].in_flight += 1
+            self._stats[name].admitted += 1
+            return
+        # Free slots only coexist with waiters that the batch cap holds back, so an
+        # allowed run never jumps ahead of its own lane.
+        if self._in_flight < self.limit and self._allowed(name) and not self._waiters[name]:
+            self._grant(name)
+            return
+        loop = asyncio.get_running_loop()
+        waiter: asyncio.Future[None] = loop.create_future()
+        entry = (waiter, time.monotonic())
+        self._waiters[name].append(entry)
+        # A waiter held back by the batch cap while slots are free would otherwise
+        # wait for the next release before its promotion is noticed.
+        loop.call_later(self.max_wait_seconds + 0.01, self._dispatch)
+        try:
+            await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release(name)
+            else:
+                waiter.cancel()
+                self._waiters[name].remove(entry)
+            raise
+
+    @asynccontextmanager
+    async def slot(self, name: str | None = None, timeout: float | None = None) -> AsyncIterator[None]:
+        """Hold one upstream slot in lane ``name`` (default: the current lane).
+
+        Raises ``LaneWaitTimeout`` when no slot was granted within ``timeout`` seconds.
+        """
+        name = name or current_lane()
+        stats = self._stats[name]
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(self._acquire(name), timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            raise LaneWaitTimeout(f"no {name} slot within {timeout:.3g}s") from None
+        started = time.monotonic()
+        stats.waits.append(started - queued_at)
+        try:
+            yield
+        finally:
+            finished = time.monotonic()
+            stats.runs.append(finished - started)
+            stats.totals.append(finished - queued_at)
+            if self.enabled:
+                self._release(name)
+            else:
+                stats.in_flight -= 1
+
+    def metrics(self) -> dict[str, Any]:
+        lanes = {}
+        for name, stats in self._stats.items():
+            lanes[name] = {
+                "weight": self.weights[name],
+                "in_flight": stats.in_flight,
+                "queued": len(self._waiters[name]),
+                "admitted": stats.admitted,
+                "promoted": stats.promoted,
+                "timeouts": stats.timeouts,
+                **percentiles(stats.waits, "wait"),
+                **percentiles(stats.runs, "run"),
+                **percentiles(stats.totals, "total"),
+            }
+        return {
+            "enabled": self.enabled,
+            "mode": self.mode,
+            "limit": self.limit,
+            "reserved_interactive": self.reserved_interactive,
+            "max_wait_seconds": self.max_wait_seconds,
+            "in_flight": self._in_flight,
+            "lanes": lanes,
+        }
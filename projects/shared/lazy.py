@@ -0,0 +1,53 @@
+"""Deferred construction for fast cold starts.
+
+Importing ``agents`` (and ``openai`` with it) takes most of an app's import time. The
+apps therefore do not build agents at import time. Each agent is wrapped in ``Lazy``,
+and its factory imports the SDK and builds the agent on the first ``get()``.
+
+``prewarm`` builds a set of ``Lazy`` values on a daemon thread. With
+``LAZY_STARTUP=true`` the apps call it after startup, so ``/health`` answers at once
+and the SDK is usually loaded before the first agent request. Without it, startup
+builds everything before the app accepts traffic. A ``get()`` that arrives while the
+prewarm thread is still building waits for it instead of building twice.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    def __init__(self, factory: Callable[[], T]) -> None:
+        self.factory = factory
+        self.build_seconds: float | None = None
+        self._value: T | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.build_seconds is not None
+
+    def get(self) -> T:
+        if self.build_seconds is None:
+            with self._lock:
+                if self.build_seconds is None:
+                    started = time.perf_counter()
+                    self._value = self.factory()
+                    self.build_seconds = time.perf_counter() - started
+        return self._value  # type: ignore[return-value]
+
+
+def prewarm(*values: Lazy[Any]) -> threading.Thread:
+    """Build ``values`` on a background thread and return the thread."""
+
+    def build() -> None:
+        for value in values:
+            value.get()
+
+    thread = threading.Thread(target=build, name="prewarm", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,96 @@
+"""In-process load test for a project app, usually against a replay cassette.
+
+Run from a project folder, e.g.::
+
+    python ../shared/load_test.py --path /api/saas_task --body bodies.jsonl \\
+        --cassette cassettes/ai_saas_agent.jsonl --latency-scale 0 --requests 5000 --concurrency 200
+
+``--body`` is a JSON object or a JSONL file of request bodies (cycled in order). With
+``--cassette`` the app is imported in replay mode, so no model is called; record the
+cassette first by running the app with ``MODEL_CASSETTE_MODE=record``. Requests go
+through ``httpx.ASGITransport``, so the numbers measure the app itself, not a network.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import sys
+import time
+from collections import Counter
+from itertools import cycle
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+
+def load_bodies(path: Path) -> list[dict[str, Any]]:
+    text = path.read_text(encoding="utf-8").strip()
+    if text.startswith("{") and "\n{" not in text:
+        return [json.loads(text)]
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+async def drive(app: Any, args: argparse.Namespace, bodies: list[dict[str, Any]]) -> None:
+    headers = dict(header.split(":", 1) for header in args.header)
+    feed = cycle(bodies)
+    remaining = args.requests
+    latencies: list[float] = []
+    statuses: Counter[int] = Counter()
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            response = await client.post(args.path, json=next(feed), headers=headers)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=None) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(client) for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"requests     {len(latencies)} in {elapsed:.2f}s ({len(latencies) / elapsed:.0f} req/s)")
+    print(f"status       {dict(sorted(statuses.items()))}")
+    for label, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+        print(f"latency {label}  {percentile(latencies, q) * 1000:.1f} ms")
+    print(f"latency max  {latencies[-1] * 1000:.1f} ms" if latencies else "latency max  -")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--app", default="app:app", help="module:attribute of the FastAPI app")
+    parser.add_argument("--path", required=True, help="POST endpoint to call")
+    parser.add_argument("--body", type=Path, required=True, help="JSON or JSONL file of request bodies")
+    parser.add_argument("--header", action="append", default=[], help="extra header as Name:value")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--cassette", help="replay this cassette instead of calling the model")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiply recorded latencies")
+    args = parser.parse_args()
+
+    if args.cassette:
+        os.environ["MODEL_CASSETTE_MODE"] = "replay"
+        os.environ["MODEL_CASSETTE_PATH"] = args.cassette
+        os.environ["MODEL_CASSETTE_LATENCY_SCALE"] = str(args.latency_scale)
+    sys.path.insert(0, os.getcwd())
+    module_name, _, attribute = args.app.partition(":")
+    app = getattr(importlib.import_module(module_name), attribute or "app")
+    asyncio.run(drive(app, args, load_bodies(args.body)))
+
+
+if __name__ == "__main__":
+    main()
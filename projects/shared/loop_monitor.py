@@ -0,0 +1,129 @@
+"""Event-loop lag and blocking-call monitor.
+
+The apps run every request on one event loop, so one blocking call (a sync DB commit,
+file I/O, heavy JSON) stalls all concurrent requests. ``LoopMonitor`` makes that visible
+in two ways:
+
+- A probe coroutine sleeps for ``interval_seconds`` in a loop. The lag is how much
+  later than requested it wakes up, which is how long other callbacks held the loop.
+  Recent lags are kept for percentiles.
+- A watchdog thread checks the probe's heartbeat. When the loop has not come back for
+  ``slow_callback_seconds``, the watchdog takes the loop thread's stack while the call
+  is still blocking. It logs the stack and keeps it in ``recent_stalls``, so the
+  offending line is visible without debug mode.
+
+In-flight ``Runner.run`` calls are tracked by ``ModelCaller`` (see ``model_calls.py``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Any
+
+logger = logging.getLogger("shared.loop_monitor")
+
+
+class LoopMonitor:
+    def __init__(
+        self,
+        interval_seconds: float = 0.1,
+        slow_callback_seconds: float = 0.25,
+        window: int = 600,
+        keep_stalls: int = 20,
+    ) -> None:
+        self.interval_seconds = interval_seconds
+        self.slow_callback_seconds = slow_callback_seconds
+        self._lags: deque[float] = deque(maxlen=window)
+        self._stalls: deque[dict[str, Any]] = deque(maxlen=keep_stalls)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = time.monotonic()
+        self._open_stall: dict[str, Any] | None = None
+        self._probe: asyncio.Task[None] | None = None
+        self._watchdog: threading.Thread | None = None
+        self._loop_thread: int | None = None
+        self.stall_count = 0
+        self.max_lag = 0.0
+
+    def start(self) -> None:
+        """Start the probe on the running loop and the watchdog thread."""
+        if self._probe is not None:
+            return
+        self._stop = threading.Event()
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._probe = asyncio.get_running_loop().create_task(self._run_probe())
+        self._watchdog = threading.Thread(target=self._watch, args=(self._stop,), name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._probe is not None:
+            self._probe.cancel()
+            self._probe = None
+        self._watchdog = None
+
+    async def _run_probe(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            before = loop.time()
+            self._heartbeat = time.monotonic()
+            await asyncio.sleep(self.interval_seconds)
+            lag = max(0.0, loop.time() - before - self.interval_seconds)
+            self._lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            with self._lock:
+                if self._open_stall is not None:
+                    self._open_stall["blocked_ms"] = round(lag * 1000, 1)
+                    self._open_stall = None
+
+    def _watch(self, stop: threading.Event) -> None:
+        reported = None
+        while not stop.wait(self.slow_callback_seconds / 2):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval_seconds
+            if blocked < self.slow_callback_seconds or heartbeat == reported:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            reported = heartbeat
+            stack = "".join(traceback.format_stack(frame))
+            stall = {
+                "at": datetime.utcnow().isoformat(),
+                "blocked_ms": round(blocked * 1000, 1),
+                "stack": stack,
+            }
+            with self._lock:
+                self.stall_count += 1
+                self._stalls.append(stall)
+                self._open_stall = stall
+            logger.warning("Event loop blocked for %.0f ms at:\n%s", blocked * 1000, stack)
+
+    def metrics(self) -> dict[str, Any]:
+        ordered = sorted(self._lags)
+
+        def pct(q: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1) if ordered else 0.0
+
+        with self._lock:
+            stalls = list(self._stalls)
+        return {
+            "running": self._probe is not None and not self._probe.done(),
+            "interval_ms": round(self.interval_seconds * 1000, 1),
+            "slow_callback_ms": round(self.slow_callback_seconds * 1000, 1),
+            "samples": len(ordered),
+            "lag_last_ms": round(self._lags[-1] * 1000, 1) if self._lags else 0.0,
+            "lag_p50_ms": pct(0.50),
+            "lag_p99_ms": pct(0.99),
+            "lag_max_ms": round(self.max_lag * 1000, 1),
+            "stalls": self.stall_count,
+            "recent_stalls": stalls,
+        }
@@ -0,0 +1,260 @@
+"""Admin-only memory diagnostics built on ``tracemalloc``.
+
+``MemoryDiagnostics.router(admin_token)`` returns the ``/admin/memory`` endpoints. Every
+call needs an ``X-Admin-Token`` header equal to ``admin_token``; without a configured
+token the endpoints answer 404. The endpoints can:
+
+- start and stop tracing (tracing costs CPU and memory, so it is off until asked for);
+- take snapshots, keeping the last ``keep_snapshots`` in memory and as
+  ``Snapshot.dump`` files that can be downloaded and read offline with
+  ``tracemalloc.Snapshot.load``;
+- list the top allocation sites of a snapshot and diff two snapshots;
+- report per-endpoint allocation peaks.
+
+``AllocationSampler`` records those peaks. For a sampled request it resets the traced
+peak, runs the request and records the peak and the retained growth under the route
+template. Peaks are process-wide, so only one request is sampled at a time; allocations
+made by concurrent requests during that window are still included.
+"""
+
+from __future__ import annotations
+
+import hmac
+import os
+import random
+import threading
+import tracemalloc
+from collections import OrderedDict
+from datetime import datetime
+from itertools import count
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse
+
+Scope = dict[str, Any]
+Receive = Callable[[], Awaitable[dict[str, Any]]]
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+GroupBy = Literal["lineno", "filename", "traceback"]
+
+NOISE = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def rss_kib() -> int | None:
+    """Current resident set size from /proc, where available."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as handle:
+            resident_pages = int(handle.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def site(traceback: tracemalloc.Traceback, group_by: str) -> str | list[str]:
+    if group_by == "traceback":
+        return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
+    frame = traceback[0]
+    return frame.filename if group_by == "filename" else f"{frame.filename}:{frame.lineno}"
+
+
+class MemoryDiagnostics:
+    def __init__(self, directory: str | Path = "memory", keep_snapshots: int = 10) -> None:
+        self.directory = Path(directory)
+        self.keep_snapshots = keep_snapshots
+        self._snapshots: OrderedDict[int, tuple[datetime, tracemalloc.Snapshot]] = OrderedDict()
+        self._ids = count(1)
+        self._lock = threading.Lock()
+        self._endpoints: dict[str, dict[str, float]] = {}
+
+    def start(self, frames: int = 1) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        with self._lock:
+            self._endpoints.clear()
+
+    def status(self) -> dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "frames": tracemalloc.get_traceback_limit(),
+            "traced_kib": current // 1024,
+            "traced_peak_kib": peak // 1024,
+            "tracemalloc_overhead_kib": tracemalloc.get_tracemalloc_memory() // 1024,
+            "rss_kib": rss_kib(),
+            "snapshots": [self._describe(snapshot_id) for snapshot_id in self._snapshots],
+        }
+
+    def path(self, snapshot_id: int) -> Path:
+        return self.directory / f"snapshot-{snapshot_id}.tracemalloc"
+
+    def _describe(self, snapshot_id: int) -> dict[str, Any]:
+        taken_at, snapshot = self._snapshots[snapshot_id]
+        return {
+            "id": snapshot_id,
+            "taken_at": taken_at.isoformat(),
+            "traced_kib": sum(trace.size for trace in snapshot.traces) // 1024,
+            "download": f"/admin/memory/snapshots/{snapshot_id}/download",
+        }
+
+    def take_snapshot(self) -> dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            raise ValueError("tracemalloc is not tracing; start it first")
+        snapshot = tracemalloc.take_snapshot().filter_traces(NOISE)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            snapshot_id = next(self._ids)
+            self._snapshots[snapshot_id] = (datetime.utcnow(), snapshot)
+            while len(self._snapshots) > self.keep_snapshots:
+                evicted, _ = self._snapshots.popitem(last=False)
+                self.path(evicted).unlink(missing_ok=True)
+        snapshot.dump(str(self.path(snapshot_id)))
+        return self._describe(snapshot_id)
+
+    def _get(self, snapshot_id: int) -> tracemalloc.Snapshot:
+        if snapshot_id not in self._snapshots:
+            raise KeyError(snapshot_id)
+        return self._snapshots[snapshot_id][1]
+
+    def top(self, snapshot_id: int, group_by: GroupBy = "lineno", limit: int = 20) -> list[dict[str, Any]]:
+        stats = self._get(snapshot_id).statistics(group_by)
+        return [
+            {
+                "site": site(stat.traceback, group_by),
+                "size_kib": round(stat.size / 1024, 1),
+                "count": stat.count,
+                "avg_bytes": stat.size // stat.count if stat.count else 0,
+            }
+            for stat in stats[:limit]
+        ]
+
+    def diff(self, base_id: int, target_id: int, group_by: GroupBy = "lineno", limit: int = 20) -> list[dict[str, Any]]:
+        stats = self._get(target_id).compare_to(self._get(base_id), group_by)
+        return [
+            {
+                "site": site(stat.traceback, group_by),
+                "size_diff_kib": round(stat.size_diff / 1024, 1),
+                "size_kib": round(stat.size / 1024, 1),
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+            }
+            for stat in stats[:limit]
+        ]
+
+    def record_request(self, route: str, peak: int, retained: int) -> None:
+        with self._lock:
+            stats = self._endpoints.setdefault(route, {"samples": 0, "peak_sum": 0, "peak_max": 0, "retained_sum": 0})
+            stats["samples"] += 1
+            stats["peak_sum"] += peak
+            stats["peak_max"] = max(stats["peak_max"], peak)
+            stats["retained_sum"] += retained
+
+    def endpoint_stats(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {
+                route: {
+                    "samples": stats["samples"],
+                    "peak_kib_avg": round(stats["peak_sum"] / stats["samples"] / 1024, 1),
+                    "peak_kib_max": round(stats["peak_max"] / 1024, 1),
+                    "retained_kib_avg": round(stats["retained_sum"] / stats["samples"] / 1024, 1),
+                }
+                for route, stats in sorted(self._endpoints.items())
+            }
+
+    def router(self, admin_token: str | None) -> APIRouter:
+        def require_admin(x_admin_token: str | None = Header(default=None)) -> None:
+            if not admin_token:
+                raise HTTPException(status_code=404, detail="Not Found")
+            if not x_admin_token or not hmac.compare_digest(x_admin_token, admin_token):
+                raise HTTPException(status_code=403, detail="Admin token required")
+
+        router = APIRouter(prefix="/admin/memory", tags=["admin"], dependencies=[Depends(require_admin)])
+
+        def snapshot_or_404(snapshot_id: int) -> int:
+            if snapshot_id not in self._snapshots:
+                raise HTTPException(status_code=404, detail=f"Snapshot {snapshot_id} not found")
+            return snapshot_id
+
+        @router.get("")
+        def memory_status() -> dict[str, Any]:
+            return self.status()
+
+        @router.post("/start")
+        def start_tracing(frames: int = Query(default=1, ge=1, le=100)) -> dict[str, Any]:
+            self.start(frames)
+            return self.status()
+
+        @router.post("/stop")
+        def stop_tracing() -> dict[str, Any]:
+            self.stop()
+            return self.status()
+
+        @router.post("/snapshots")
+        def take_snapshot() -> dict[str, Any]:
+            try:
+                return self.take_snapshot()
+            except ValueError as exc:
+                raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+        @router.get("/snapshots/{snapshot_id}/top")
+        def top_sites(
+            snapshot_id: int, group_by: GroupBy = "lineno", limit: int = Query(default=20, ge=1, le=500)
+        ) -> list[dict[str, Any]]:
+            return self.top(snapshot_or_404(snapshot_id), group_by, limit)
+
+        @router.get("/snapshots/{snapshot_id}/download")
+        def download_snapshot(snapshot_id: int) -> FileResponse:
+            path = self.path(snapshot_or_404(snapshot_id))
+            return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+
+        @router.get("/diff")
+        def diff_snapshots(
+            base: int, target: int, group_by: GroupBy = "lineno", limit: int = Query(default=20, ge=1, le=500)
+        ) -> list[dict[str, Any]]:
+            return self.diff(snapshot_or_404(base), snapshot_or_404(target), group_by, limit)
+
+        @router.get("/endpoints")
+        def endpoint_peaks() -> dict[str, dict[str, float]]:
+            return self.endpoint_stats()
+
+        return router
+
+
+class AllocationSampler:
+    def __init__(self, app: ASGIApp, diagnostics: MemoryDiagnostics, sample_rate: float = 0.01) -> None:
+        self.app = app
+        self.diagnostics = diagnostics
+        self.sample_rate = sample_rate
+        self._busy = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["path"].startswith("/admin/")
+            or self._busy
+            or not tracemalloc.is_tracing()
+            or random.random() >= self.sample_rate
+        ):
+            await self.app(scope, receive, send)
+            return
+        self._busy = True
+        try:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            await self.app(scope, receive, send)
+            after, peak = tracemalloc.get_traced_memory()
+        finally:
+            self._busy = False
+        route = scope.get("route")
+        self.diagnostics.record_request(
+            f"{scope['method']} {getattr(route, 'path', scope['path'])}", max(0, peak - before), after - before
+        )
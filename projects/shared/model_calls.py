@@ -0,0 +1,307 @@
+"""Deadlines, retries and hedging around ``Runner.run``.
+
+``ModelCaller.run`` is a drop-in for ``Runner.run(agent, input)``:
+
+- Every call has an overall deadline. Each attempt gets whatever time is left, capped
+  by ``attempt_timeout_seconds`` so a stalled request is abandoned and retried.
+- Attempts that time out or fail with a retryable provider error (connection errors,
+  408/409/429 and 5xx) are retried with full-jitter exponential backoff while the
+  deadline allows.
+- Agents listed in ``hedge_agents`` are hedged. If an attempt has not finished after
+  the agent's observed p95 latency, a second identical request is fired; the first
+  success wins and the other one is cancelled.
+- Each model has a circuit breaker (see ``circuit_breaker.py``). While a model's
+  circuit is open, attempts go to ``fallback_model`` instead, or fail fast with
+  ``CircuitOpen`` when no fallback is configured.
+- Token usage of successful runs is summed per agent, split into cached and uncached
+  input tokens, so the effect of prompt prefix caching (see ``prompts.py``) is visible.
+- With a ``Cassette`` (see ``cassette.py``) successful runs are recorded, or served
+  from the recording without calling the model. Replayed runs take the same lane slot,
+  deadline and in-flight tracking as live ones.
+- With a ``LaneScheduler`` (see ``lanes.py``) each run first takes an upstream slot in
+  the current priority lane; waiting for it counts against the deadline.
+- Every ``Runner.run`` in progress is tracked with its agent and start time, so
+  ``in_flight()`` reports how many runs are open and how old the oldest one is.
+
+``agents`` and ``openai`` take most of an app's import time, so they are imported on
+the first call rather than with this module.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections import Counter, deque
+from contextlib import nullcontext
+from itertools import count
+from typing import TYPE_CHECKING, Any, Iterable
+
+from .cassette import Cassette
+from .circuit_breaker import CircuitBreaker, CircuitOpen
+from .lanes import LaneScheduler, LaneWaitTimeout
+
+if TYPE_CHECKING:
+    from agents import Agent
+    from agents.result import RunResult
+
+logger = logging.getLogger("shared.model_calls")
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class ModelDeadlineExceeded(TimeoutError):
+    """Raised when a model call did not succeed before its deadline."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    import openai
+
+    if isinstance(exc, (asyncio.TimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code in RETRYABLE_STATUS or exc.status_code >= 500
+    return False
+
+
+class ModelCaller:
+    def __init__(
+        self,
+        deadline_seconds: float = 120.0,
+        attempt_timeout_seconds: float | None = None,
+        max_attempts: int = 3,
+        backoff_seconds: float = 0.5,
+        backoff_max_seconds: float = 8.0,
+        hedge_agents: Iterable[str] = (),
+        hedge_delay_seconds: float = 5.0,
+        hedge_min_samples: int = 20,
+        fallback_model: str | None = None,
+        circuit_options: dict[str, Any] | None = None,
+        cassette: Cassette | None = None,
+        scheduler: LaneScheduler | None = None,
+    ) -> None:
+        self.deadline_seconds = deadline_seconds
+        self.attempt_timeout_seconds = attempt_timeout_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.hedge_agents = set(hedge_agents)
+        self.hedge_delay_seconds = hedge_delay_seconds
+        self.hedge_min_samples = hedge_min_samples
+        self.fallback_model = fallback_model
+        self.circuit_options = circuit_options or {}
+        self.cassette = cassette
+        self.scheduler = scheduler
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._fallback_agents: dict[int, Agent[Any]] = {}
+        self._latencies: dict[str, deque[float]] = {}
+        self._tokens: dict[str, dict[str, int]] = {}
+        self._in_flight: dict[int, tuple[str, float]] = {}
+        self._run_ids = count()
+        self.counters = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "failures": 0,
+            "hedges_fired": 0,
+            "hedges_won": 0,
+            "fallback_calls": 0,
+            "circuit_rejections": 0,
+        }
+
+    def hedge_delay(self, agent_name: str) -> float:
+        """p95 of recent successful attempts, or the configured delay until enough samples exist."""
+        samples = self._latencies.get(agent_name)
+        if not samples or len(samples) < self.hedge_min_samples:
+            return self.hedge_delay_seconds
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        if model not in self._breakers:
+            self._breakers[model] = CircuitBreaker(model, **self.circuit_options)
+        return self._breakers[model]
+
+    def _route(self, agent: Agent[Any]) -> tuple[Agent[Any], CircuitBreaker | None]:
+        """Pick the agent to call: the original, or a fallback-model clone while its circuit is open."""
+        if not isinstance(agent.model, str):
+            return agent, None
+        breaker = self.breaker(agent.model)
+        if breaker.allow():
+            return agent, breaker
+        if not self.fallback_model or self.fallback_model == agent.model:
+            self.counters["circuit_rejections"] += 1
+            raise CircuitOpen(f"circuit for model {agent.model} is open")
+        self.counters["fallback_calls"] += 1
+        if id(agent) not in self._fallback_agents:
+            self._fallback_agents[id(agent)] = agent.clone(model=self.fallback_model)
+        return self._fallback_agents[id(agent)], None
+
+    async def _attempt(self, agent: Agent[Any], input: Any, kwargs: dict[str, Any]) -> RunResult:
+        target, breaker = self._route(agent)
+        self.counters["attempts"] += 1
+        from agents import Runner
+
+        started = time.monotonic()
+        run_id = next(self._run_ids)
+        self._in_flight[run_id] = (agent.name, started)
+        try:
+            result = await Runner.run(target, input, **kwargs)
+        except asyncio.CancelledError:
+            # Cut off by the attempt timeout counts as slow; a cancelled hedge loser does not count.
+            if breaker is not None:
+                elapsed = time.monotonic() - started
+                breaker.record(False if elapsed >= breaker.slow_call_seconds else None, elapsed)
+            raise
+        except Exception as exc:
+            # Only provider-side failures say something about the model's health.
+            if breaker is not None:
+                breaker.record(False if is_retryable(exc) else None, time.monotonic() - started)
+            raise
+        finally:
+            del self._in_flight[run_id]
+        elapsed = time.monotonic() - started
+        if breaker is not None:
+            breaker.record(True, elapsed)
+        self._latencies.setdefault(agent.name, deque(maxlen=512)).append(elapsed)
+        self._record_usage(agent.name, result)
+        return result
+
+    def _record_usage(self, agent_name: str, result: RunResult) -> None:
+        usage = result.context_wrapper.usage
+        tokens = self._tokens.setdefault(
+            agent_name, {"requests": 0, "input_tokens": 0, "cached_input_tokens": 0, "output_tokens": 0}
+        )
+        tokens["requests"] += usage.requests
+        tokens["input_tokens"] += usage.input_tokens
+        tokens["cached_input_tokens"] += usage.input_tokens_details.cached_tokens or 0
+        tokens["output_tokens"] += usage.output_tokens
+
+    async def _hedged(self, agent: Agent[Any], input: Any, kwargs: dict[str, Any]) -> RunResult:
+        primary = asyncio.ensure_future(self._attempt(agent, input, kwargs))
+        pending: set[asyncio.Future[RunResult]] = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_delay(agent.name))
+            if primary in done:
+                return primary.result()
+
+            self.counters["hedges_fired"] += 1
+            hedge = asyncio.ensure_future(self._attempt(agent, input, kwargs))
+            pending.add(hedge)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.counters["hedges_won"] += 1
+                        return task.result()
+                if not pending:
+                    # Both attempts failed; surface the most recent error to the retry loop.
+                    raise done.pop().exception()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def run(
+        self, agent: Agent[Any], input: Any, deadline_seconds: float | None = None, **kwargs: Any
+    ) -> RunResult:
+        self.counters["calls"] += 1
+        started = time.monotonic()
+        deadline = started + (deadline_seconds or self.deadline_seconds)
+        slot = self.scheduler.slot(timeout=deadline - started) if self.scheduler is not None else nullcontext()
+        try:
+            async with slot:
+                if self.cassette is not None and self.cassette.mode == "replay":
+                    return await self._replay(self.cassette, agent, input, deadline)
+                return await self._run(agent, input, kwargs, deadline)
+        except LaneWaitTimeout as exc:
+            self.counters["failures"] += 1
+            raise ModelDeadlineExceeded(f"{agent.name} got no model slot within the deadline") from exc
+
+    async def _replay(self, cassette: Cassette, agent: Agent[Any], input: Any, deadline: float) -> RunResult:
+        run_id = next(self._run_ids)
+        self._in_flight[run_id] = (agent.name, time.monotonic())
+        try:
+            replayed = await asyncio.wait_for(cassette.replay(agent, input), timeout=deadline - time.monotonic())
+        except asyncio.TimeoutError as exc:
+            self.counters["timeouts"] += 1
+            self.counters["failures"] += 1
+            raise ModelDeadlineExceeded(f"{agent.name} did not answer within the deadline") from exc
+        finally:
+            del self._in_flight[run_id]
+        self._record_usage(agent.name, replayed)
+        return replayed
+
+    async def _run(self, agent: Agent[Any], input: Any, kwargs: dict[str, Any], deadline: float) -> RunResult:
+        # Recorded latencies exclude the wait for a lane slot.
+        started = time.monotonic()
+        hedged = agent.name in self.hedge_agents
+        attempt = 0
+        while True:
+            attempt += 1
+            remaining = deadline - time.monotonic()
+            if self.attempt_timeout_seconds:
+                remaining = min(remaining, self.attempt_timeout_seconds)
+            try:
+                call = self._hedged(agent, input, kwargs) if hedged else self._attempt(agent, input, kwargs)
+                result = await asyncio.wait_for(call, timeout=remaining)
+            except Exception as exc:
+                if isinstance(exc, asyncio.TimeoutError):
+                    self.counters["timeouts"] += 1
+                if not is_retryable(exc):
+                    self.counters["failures"] += 1
+                    raise
+                delay = random.uniform(0, min(self.backoff_max_seconds, self.backoff_seconds * 2 ** (attempt - 1)))
+                if attempt >= self.max_attempts or time.monotonic() + delay >= deadline:
+                    self.counters["failures"] += 1
+                    if isinstance(exc, asyncio.TimeoutError):
+                        raise ModelDeadlineExceeded(f"{agent.name} did not answer within the deadline") from exc
+                    raise
+                self.counters["retries"] += 1
+                logger.warning("Retrying %s after %s (attempt %d): %r", agent.name, type(exc).__name__, attempt, exc)
+                await asyncio.sleep(delay)
+            else:
+                if self.cassette is not None:
+                    await self.cassette.record(agent, input, result, time.monotonic() - started)
+                return result
+
+    def in_flight(self) -> dict[str, Any]:
+        """Open ``Runner.run`` attempts (hedges count separately): count, oldest age and count per agent."""
+        now = time.monotonic()
+        runs = list(self._in_flight.values())
+        return {
+            "count": len(runs),
+            "oldest_seconds": round(max((now - started for _, started in runs), default=0.0), 3),
+            "by_agent": dict(Counter(name for name, _ in runs)),
+        }
+
+    def metrics(self) -> dict[str, Any]:
+        agents = {}
+        for name, samples in self._latencies.items():
+            ordered = sorted(samples)
+            tokens = self._tokens.get(name, {})
+            input_tokens = tokens.get("input_tokens", 0)
+            cached = tokens.get("cached_input_tokens", 0)
+            agents[name] = {
+                "hedged": name in self.hedge_agents,
+                "samples": len(ordered),
+                "latency_p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+                "latency_p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000, 1),
+                "hedge_delay_ms": round(self.hedge_delay(name) * 1000, 1),
+                "input_tokens": input_tokens,
+                "cached_input_tokens": cached,
+                "uncached_input_tokens": input_tokens - cached,
+                "cached_input_ratio": round(cached / input_tokens, 3) if input_tokens else 0.0,
+                "output_tokens": tokens.get("output_tokens", 0),
+            }
+        circuits = {model: breaker.metrics() for model, breaker in self._breakers.items()}
+        return {
+            **self.counters,
+            "fallback_model": self.fallback_model,
+            "agents": agents,
+            "circuits": circuits,
+            "in_flight": self.in_flight(),
+            "cassette": self.cassette.metrics() if self.cassette is not None else None,
+        }
@@ -0,0 +1,176 @@
+"""One shared, tuned and pre-warmed ``AsyncOpenAI`` client per app.
+
+Without it, every agent uses the SDK's default client with default pool and timeout
+settings, and the first requests after a start or an idle period pay for TCP and TLS
+setup. ``ModelClient`` builds one client with:
+
+- an explicit connection pool (``max_connections``, ``max_keepalive_connections``);
+- a longer keep-alive (``keepalive_seconds``), so pooled connections survive gaps
+  between bursts;
+- timeouts derived from ``ModelCaller``'s per-attempt timeout: reads may take up to
+  ``attempt_timeout_seconds`` and connects up to ``connect_timeout_seconds`` (capped at
+  the attempt timeout), so neither outlives the attempt that issued them;
+- no SDK-level retries (``max_retries=0``): ``ModelCaller`` owns retries, backoff and
+  the per-request deadline, and SDK retries inside each attempt would multiply them;
+- HTTP/2 when the ``h2`` package is installed; otherwise it logs and uses HTTP/1.1.
+
+``install()`` makes that client the SDK default for every agent in the process. It is
+idempotent, and the apps call it before building their first agent. ``start_warm_up()``
+opens ``warmup_connections`` pooled connections in the background with cheap requests
+to ``warmup_url`` (default ``<base_url>/models``). Any HTTP status counts: the point is
+the established connection.
+
+Without an API key (neither ``api_key`` nor ``OPENAI_API_KEY``) ``install()`` leaves
+the SDK default alone, so the app still starts and serves everything that does not call
+the model. When ``base_url`` is set, a placeholder key is used instead.
+
+Set ``base_url`` to a local stand-in (see ``fake_model_server.py``) to exercise the
+whole path without the real API.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger("shared.model_client")
+
+
+class ModelClient:
+    def __init__(
+        self,
+        base_url: str | None = None,
+        api_key: str | None = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_seconds: float = 30.0,
+        connect_timeout_seconds: float = 5.0,
+        attempt_timeout_seconds: float = 60.0,
+        http2: bool = True,
+        warmup_url: str | None = None,
+        warmup_connections: int = 2,
+    ) -> None:
+        self.base_url = base_url
+        self.api_key = api_key
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_seconds = keepalive_seconds
+        self.connect_timeout_seconds = min(connect_timeout_seconds, attempt_timeout_seconds)
+        self.read_timeout_seconds = attempt_timeout_seconds
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        if http2 and not self.http2:
+            logger.info("h2 is not installed; the model client uses HTTP/1.1")
+        self.warmup_url = warmup_url
+        self.warmup_connections = warmup_connections
+        self.client: AsyncOpenAI | None = None
+        self.http_client: httpx.AsyncClient | None = None
+        self.warm_up_result: dict[str, Any] | None = None
+        self._warm_up_task: asyncio.Task[None] | None = None
+        self._lock = threading.Lock()
+        self._missing_key_logged = False
+
+    def install(self) -> AsyncOpenAI | None:
+        """Build the client once and make it the Agents SDK default; ``None`` without a key."""
+        with self._lock:
+            if self.client is None:
+                api_key = self.api_key or os.getenv("OPENAI_API_KEY")
+                if not api_key:
+                    if self.base_url is None:
+                        if not self._missing_key_logged:
+                            logger.warning("No OpenAI API key configured; the shared model client is not installed")
+                            self._missing_key_logged = True
+                        return None
+                    # Local stand-ins do not check the key, but the client requires one.
+                    api_key = "local"
+                import httpx
+                from agents import set_default_openai_client
+                from openai import AsyncOpenAI
+
+                limits = httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_seconds,
+                )
+                timeout = httpx.Timeout(self.read_timeout_seconds, connect=self.connect_timeout_seconds)
+                self.http_client = httpx.AsyncClient(limits=limits, timeout=timeout, http2=self.http2)
+                self.client = AsyncOpenAI(
+                    api_key=api_key,
+                    base_url=self.base_url,
+                    timeout=timeout,
+                    max_retries=0,
+                    http_client=self.http_client,
+                )
+                # Traces keep going to the default exporter, not to a stand-in base_url.
+                set_default_openai_client(self.client, use_for_tracing=False)
+            return self.client
+
+    async def warm_up(self) -> dict[str, Any] | None:
+        # install() imports openai and agents; keep that off the event loop.
+        client = self.client or await asyncio.to_thread(self.install)
+        if client is None or self.http_client is None:
+            return None
+        import httpx
+
+        url = self.warmup_url or f"{str(client.base_url).rstrip('/')}/models"
+        headers = {"Authorization": f"Bearer {client.api_key}"}
+        started = time.perf_counter()
+
+        async def touch() -> int | str:
+            try:
+                response = await self.http_client.get(url, headers=headers)
+                return response.status_code
+            except httpx.HTTPError as exc:
+                return type(exc).__name__
+
+        outcomes = await asyncio.gather(*(touch() for _ in range(self.warmup_connections)))
+        self.warm_up_result = {
+            "url": url,
+            "outcomes": list(outcomes),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        if not all(isinstance(outcome, int) for outcome in outcomes):
+            logger.warning("Model client warm-up against %s failed: %s", url, outcomes)
+        return self.warm_up_result
+
+    def start_warm_up(self) -> None:
+        """Warm up in the background on the running loop; startup does not wait for it."""
+        if self._warm_up_task is None:
+            self._warm_up_task = asyncio.get_running_loop().create_task(self._warm_up_logged())
+
+    async def _warm_up_logged(self) -> None:
+        try:
+            await self.warm_up()
+        except Exception:
+            logger.exception("Model client warm-up failed")
+
+    async def aclose(self) -> None:
+        if self._warm_up_task is not None:
+            self._warm_up_task.cancel()
+            self._warm_up_task = None
+        if self.http_client is not None:
+            await self.http_client.aclose()
+
+    def metrics(self) -> dict[str, Any]:
+        pool = getattr(self.http_client, "_transport", None)
+        connections = getattr(getattr(pool, "_pool", None), "connections", None)
+        return {
+            "installed": self.client is not None,
+            "base_url": str(self.client.base_url) if self.client is not None else self.base_url,
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections,
+            "keepalive_seconds": self.keepalive_seconds,
+            "connect_timeout_seconds": self.connect_timeout_seconds,
+            "read_timeout_seconds": self.read_timeout_seconds,
+            "open_connections": len(connections) if connections is not None else None,
+            "warm_up": self.warm_up_result,
+        }
@@ -0,0 +1,247 @@
+"""Opt-in sampling profiler for live requests.
+
+``ProfilerMiddleware`` picks ``sample_rate`` of the requests under ``path_prefix``. While
+a picked request is in flight, a background thread samples it every ``interval_ms``:
+
+- When the request's task is running on the event loop, the sample is the loop
+  thread's Python stack, cut at the task's outermost coroutine.
+- When the task is suspended, the sample is its ``await`` chain plus a ``[waiting]``
+  leaf. Wall time spent waiting on the model or the database write queue is attributed
+  to the call that awaits it.
+
+Every sample is also put into one category: ``json_serialization``,
+``pydantic_validation``, ``db_commit``, ``agent_run``, ``waiting`` or ``other``. The
+innermost frame that matches a rule decides.
+
+When a profiled request finishes, two files are written to ``directory``. The
+``.folded`` file holds collapsed stacks (``frame;frame;frame count``), which
+flamegraph.pl, inferno and speedscope read directly. The ``.json`` file has the
+per-category totals. Requests shorter than ``min_duration_ms`` are discarded.
+
+Code running in worker threads (sync endpoints and dependencies, ``asyncio.to_thread``)
+is not sampled. It shows up as waiting in the coroutine that dispatched it.
+
+Apps only install the middleware when ``sample_rate > 0``. Requests that are not picked
+cost one ``random()`` call, and the sampler thread sleeps while nothing is profiled.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from types import FrameType
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger("shared.profiling")
+
+Scope = dict[str, Any]
+Receive = Callable[[], Awaitable[dict[str, Any]]]
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+# (category, path fragment, function names or None for any, name substring or None)
+RULES: tuple[tuple[str, str, tuple[str, ...] | None, str | None], ...] = (
+    ("db_commit", "/sqlalchemy/", ("commit", "flush", "do_commit", "_commit_impl"), None),
+    ("db_commit", "/shared/db.py", None, None),
+    ("json_serialization", "/json/", None, None),
+    ("json_serialization", "/fastapi/encoders.py", None, None),
+    ("json_serialization", "/fastapi/routing.py", ("serialize_response",), None),
+    ("json_serialization", "/starlette/responses.py", ("render",), None),
+    ("json_serialization", "/pydantic/", ("model_dump", "model_dump_json", "dump_python", "dump_json"), None),
+    ("pydantic_validation", "/pydantic/", None, "validat"),
+    ("pydantic_validation", "/fastapi/", ("request_body_to_args",), "validat"),
+    ("agent_run", "/shared/model_calls.py", None, None),
+    ("agent_run", "/agents/", None, None),
+    ("agent_run", "/openai/", None, None),
+)
+WAITING = "[waiting]"
+
+
+def categorize(frames: list[FrameType], waiting: bool) -> str:
+    """Return the category of the innermost frame that matches a rule."""
+    for frame in reversed(frames):
+        filename = frame.f_code.co_filename.replace("\\", "/")
+        name = frame.f_code.co_name
+        for category, fragment, names, substring in RULES:
+            if fragment not in filename:
+                continue
+            if (names is None and substring is None) or (names and name in names) or (
+                substring and substring in name
+            ):
+                return category
+    return "waiting" if waiting else "other"
+
+
+def frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    filename = code.co_filename.replace("\\", "/")
+    filename = re.sub(r"^.*/(site-packages|projects|lib/python[\d.]+)/", "", filename)
+    name = getattr(code, "co_qualname", code.co_name)  # co_qualname is new in Python 3.11
+    return f"{name} ({filename}:{code.co_firstlineno})".replace(";", ",")
+
+
+def await_chain(coro: Any) -> list[FrameType]:
+    """Frames of a suspended coroutine chain, outermost first."""
+    frames: list[FrameType] = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return frames
+
+
+def thread_chain(frame: FrameType | None, root: FrameType | None) -> list[FrameType] | None:
+    """Frames from ``root`` down to ``frame``, or None if ``root`` is not on the stack."""
+    frames: list[FrameType] = []
+    while frame is not None:
+        frames.append(frame)
+        if frame is root:
+            frames.reverse()
+            return frames
+        frame = frame.f_back
+    return None
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str, coro: Any) -> None:
+        self.method = method
+        self.path = path
+        self.coro = coro
+        self.root_frame = getattr(coro, "cr_frame", None)
+        self.started = time.perf_counter()
+        self.status: int | None = None
+        self.stacks: Counter[str] = Counter()
+        self.categories: Counter[str] = Counter()
+
+    def sample(self, loop_frame: FrameType | None) -> None:
+        if getattr(self.coro, "cr_running", False):
+            frames = thread_chain(loop_frame, self.root_frame)
+            waiting = False
+        else:
+            frames = await_chain(self.coro)
+            waiting = True
+        if not frames:
+            return
+        labels = [frame_label(frame) for frame in frames]
+        if waiting:
+            labels.append(WAITING)
+        self.stacks[";".join(labels)] += 1
+        self.categories[categorize(frames, waiting)] += 1
+
+    def write(self, directory: Path, elapsed_ms: float, interval_ms: float) -> Path:
+        directory.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", self.path).strip("_") or "root"
+        stem = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{self.method}-{slug}-{int(elapsed_ms)}ms"
+        folded = directory / f"{stem}.folded"
+        folded.write_text("".join(f"{stack} {count}\n" for stack, count in self.stacks.items()), encoding="utf-8")
+        summary = {
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "elapsed_ms": round(elapsed_ms, 1),
+            "interval_ms": interval_ms,
+            "samples": sum(self.categories.values()),
+            "categories_ms": {
+                category: round(count * interval_ms, 1) for category, count in self.categories.most_common()
+            },
+        }
+        (directory / f"{stem}.json").write_text(json.dumps(summary, indent=2), encoding="utf-8")
+        return folded
+
+
+class ProfilerMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        directory: str | Path = "profiles",
+        sample_rate: float = 0.01,
+        interval_ms: float = 5.0,
+        min_duration_ms: float = 0.0,
+        path_prefix: str = "/api/",
+    ) -> None:
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 and 1")
+        if interval_ms <= 0:
+            raise ValueError("interval_ms must be positive")
+        self.app = app
+        self.directory = Path(directory)
+        self.sample_rate = sample_rate
+        self.interval_ms = interval_ms
+        self.min_duration_ms = min_duration_ms
+        self.path_prefix = path_prefix
+        self._active: dict[int, RequestProfile] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._sampler: threading.Thread | None = None
+        self._loop_thread: int | None = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not scope["path"].startswith(self.path_prefix)
+            or random.random() >= self.sample_rate
+        ):
+            await self.app(scope, receive, send)
+            return
+        task = asyncio.current_task()
+        if task is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], task.get_coro())
+
+        async def send_with_status(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+            await send(message)
+
+        self._start(profile)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            with self._lock:
+                self._active.pop(id(profile), None)
+            elapsed_ms = (time.perf_counter() - profile.started) * 1000
+            if profile.stacks and elapsed_ms >= self.min_duration_ms:
+                try:
+                    await asyncio.to_thread(profile.write, self.directory, elapsed_ms, self.interval_ms)
+                except OSError:
+                    logger.exception("Could not write profile for %s %s", profile.method, profile.path)
+
+    def _start(self, profile: RequestProfile) -> None:
+        with self._lock:
+            if self._sampler is None:
+                self._loop_thread = threading.get_ident()
+                self._sampler = threading.Thread(target=self._sample_forever, name="request-profiler", daemon=True)
+                self._sampler.start()
+            self._active[id(profile)] = profile
+            self._wake.set()
+
+    def _sample_forever(self) -> None:
+        interval = self.interval_ms / 1000
+        while True:
+            self._wake.wait()
+            time.sleep(interval)
+            with self._lock:
+                profiles = list(self._active.values())
+                if not profiles:
+                    self._wake.clear()
+                    continue
+            loop_frame = sys._current_frames().get(self._loop_thread)
+            for profile in profiles:
+                try:
+                    profile.sample(loop_frame)
+                except Exception:
+                    # Frames can change under us; a lost sample is harmless.
+                    continue
@@ -0,0 +1,32 @@
+"""Canonical agent input for provider-side prompt prefix caching.
+
+Providers cache the longest previously seen prompt prefix, so two requests only share
+cached tokens up to the first byte where they differ. ``build_input`` renders the user
+message deterministically: static fields (task type, project, client) come first and
+volatile ones (free text, drafts, per-call data) last, each group in sorted key order,
+with nested objects sorted too and compact separators.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Mapping
+
+
+def canonical(value: Any) -> Any:
+    """Return ``value`` with every nested mapping's keys in sorted order."""
+    if isinstance(value, Mapping):
+        return {str(key): canonical(value[key]) for key in sorted(value, key=str)}
+    if isinstance(value, (list, tuple)):
+        return [canonical(item) for item in value]
+    return value
+
+
+def build_input(static: Mapping[str, Any], volatile: Mapping[str, Any] | None = None) -> str:
+    """Serialize ``static`` fields first and ``volatile`` fields last as one JSON object."""
+    volatile = volatile or {}
+    overlap = set(static) & set(volatile)
+    if overlap:
+        raise ValueError(f"fields are both static and volatile: {sorted(overlap)}")
+    document = {**canonical(static), **canonical(volatile)}
+    return json.dumps(document, ensure_ascii=False, separators=(",", ":"), default=str)
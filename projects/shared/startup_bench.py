@@ -0,0 +1,129 @@
+"""Cold-start benchmark for the project apps.
+
+Run from the ``projects`` folder::
+
+    python shared/startup_bench.py --runs 3 --import-budget-ms 1500 --health-budget-ms 2500
+
+Each run starts a fresh interpreter in the project folder with an empty SQLite
+database. The run measures the import of ``app``, the startup hooks, the first
+``GET /health`` and the time from spawning the process to that response. It then
+measures how much longer the agents took to be ready (``Lazy`` values, see
+``lazy.py``). That extra time is what the first agent request would wait for.
+``--mode`` picks ``LAZY_STARTUP=true`` (``lazy``), ``false`` (``eager``) or both.
+
+The medians are printed per project and mode. The exit status is 1 when a budget is
+exceeded or when a module in ``--forbid-imports`` is loaded by the import itself.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+PROBE = """
+import asyncio, json, os, sys, time
+started = time.time()
+sys.path.insert(0, os.getcwd())
+import app as module
+imported = time.time()
+loaded = [name for name in os.environ["BENCH_FORBID"].split(",") if name and name in sys.modules]
+import httpx
+from shared.lazy import Lazy
+
+async def main():
+    before_startup = time.time()
+    async with module.app.router.lifespan_context(module.app):
+        after_startup = time.time()
+        transport = httpx.ASGITransport(app=module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get("/health")
+        healthy = time.time()
+        for value in vars(module).values():
+            if isinstance(value, Lazy):
+                await asyncio.to_thread(value.get)
+        ready = time.time()
+    spawned = float(os.environ["BENCH_SPAWNED_AT"])
+    print(json.dumps({
+        "status": response.status_code,
+        "interpreter_ms": (started - spawned) * 1000,
+        "import_ms": (imported - started) * 1000,
+        "startup_ms": (after_startup - before_startup) * 1000,
+        "health_ms": (healthy - after_startup) * 1000,
+        "cold_start_ms": (healthy - spawned) * 1000,
+        "agents_ready_ms": (ready - healthy) * 1000,
+        "forbidden_loaded": loaded,
+    }))
+
+asyncio.run(main())
+"""
+METRICS = ("interpreter_ms", "import_ms", "startup_ms", "health_ms", "cold_start_ms", "agents_ready_ms")
+
+
+def run_once(project: Path, lazy: bool, forbid: str) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory() as scratch:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{Path(scratch) / 'bench.db'}",
+            "LAZY_STARTUP": "true" if lazy else "false",
+            "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "bench"),
+            "TRACE_STORE_PATH": str(Path(scratch) / "traces.db"),
+            "MODEL_CLIENT_WARMUP": "false",
+            "BENCH_FORBID": forbid,
+            "BENCH_SPAWNED_AT": repr(time.time()),
+        }
+        completed = subprocess.run(
+            [sys.executable, "-c", PROBE], cwd=project, env=env, capture_output=True, text=True, timeout=120
+        )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{project.name} failed:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("projects", nargs="*", type=Path, help="project folders (default: all 0*_ folders)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--mode", choices=("lazy", "eager", "both"), default="both")
+    parser.add_argument("--import-budget-ms", type=float, help="fail when the median import is slower")
+    parser.add_argument("--health-budget-ms", type=float, help="fail when the median cold start to /health is slower")
+    parser.add_argument(
+        "--forbid-imports", default="agents,openai", help="modules that importing app must not load (comma-separated)"
+    )
+    args = parser.parse_args()
+
+    root = Path(__file__).resolve().parents[1]
+    projects = args.projects or sorted(path for path in root.glob("0*_*") if (path / "app.py").exists())
+    modes = {"lazy": [True], "eager": [False], "both": [True, False]}[args.mode]
+    failed = False
+    print(f"{'project':<30} {'mode':<6} " + " ".join(f"{name[:-3]:>14}" for name in METRICS) + "  notes")
+    for project in projects:
+        for lazy in modes:
+            runs = [run_once(project, lazy, args.forbid_imports) for _ in range(args.runs)]
+            medians = {name: statistics.median(run[name] for run in runs) for name in METRICS}
+            notes = []
+            loaded = sorted({name for run in runs for name in run["forbidden_loaded"]})
+            if loaded:
+                notes.append(f"imports {','.join(loaded)}")
+            if any(run["status"] != 200 for run in runs):
+                notes.append("health failed")
+            if args.import_budget_ms is not None and medians["import_ms"] > args.import_budget_ms:
+                notes.append("import over budget")
+            if args.health_budget_ms is not None and medians["cold_start_ms"] > args.health_budget_ms:
+                notes.append("cold start over budget")
+            failed = failed or bool(notes)
+            mode = "lazy" if lazy else "eager"
+            values = " ".join(f"{medians[name]:>14.0f}" for name in METRICS)
+            print(f"{project.name:<30} {mode:<6} {values}  {'; '.join(notes) or 'ok'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Latency report over spans written by ``LocalTraceStore``.
+
+Run from a project folder, e.g.::
+
+    python ../shared/trace_report.py traces/ai_saas_agent.db --hours 24 --slowest 10
+
+Prints count, errors and p50/p95/p99/max duration per span type (``--by-name`` splits
+each type by agent, model or tool name), then the slowest traces with their slowest
+spans. Reads both the SQLite and the JSONL format.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from shared.tracing import COLUMNS
+
+
+def load_spans(path: Path, since: datetime | None) -> list[dict[str, Any]]:
+    if path.suffix == ".jsonl":
+        with path.open(encoding="utf-8") as handle:
+            rows = [json.loads(line) for line in handle if line.strip()]
+    else:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            rows = [dict(zip(COLUMNS, row)) for row in connection.execute(f"SELECT {', '.join(COLUMNS)} FROM spans")]
+        finally:
+            connection.close()
+    if since is not None:
+        # Keep spans whose start time is inside the window; naive timestamps are UTC.
+        rows = [
+            row
+            for row in rows
+            if row["started_at"] and datetime.fromisoformat(row["started_at"]).replace(tzinfo=None) >= since
+        ]
+    return rows
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def print_latencies(spans: list[dict[str, Any]], by_name: bool) -> None:
+    groups: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    for span in spans:
+        if span["duration_ms"] is None:
+            continue
+        key = f"{span['type']}:{span['name']}" if by_name else span["type"]
+        groups[key].append(span)
+    width = max([len(key) for key in groups] + [4])
+    print(f"{'span':<{width}} {'count':>7} {'errors':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    for key in sorted(groups):
+        durations = sorted(span["duration_ms"] for span in groups[key])
+        errors = sum(1 for span in groups[key] if span["error"])
+        print(
+            f"{key:<{width}} {len(durations):>7} {errors:>6} {percentile(durations, 0.50):>10.1f} "
+            f"{percentile(durations, 0.95):>10.1f} {percentile(durations, 0.99):>10.1f} {durations[-1]:>10.1f}"
+        )
+
+
+def print_slowest(spans: list[dict[str, Any]], limit: int) -> None:
+    by_trace: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    for span in spans:
+        if span["type"] != "trace":
+            by_trace[span["trace_id"]].append(span)
+    traces = sorted(
+        (span for span in spans if span["type"] == "trace" and span["duration_ms"] is not None),
+        key=lambda span: span["duration_ms"],
+        reverse=True,
+    )
+    print(f"\nslowest {min(limit, len(traces))} of {len(traces)} traces")
+    for trace in traces[:limit]:
+        children = by_trace.get(trace["trace_id"], [])
+        print(f"{trace['duration_ms']:>10.1f} ms  {trace['name']}  {trace['trace_id']}  {trace['started_at']}")
+        for span in sorted(children, key=lambda span: span["duration_ms"] or 0, reverse=True)[:3]:
+            error = f"  error: {span['error']}" if span["error"] else ""
+            print(f"{'':>14}{(span['duration_ms'] or 0):>10.1f} ms  {span['type']}:{span['name']}{error}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", type=Path, help="SQLite (.db) or JSONL (.jsonl) trace store")
+    parser.add_argument("--hours", type=float, help="only spans that started in the last N hours")
+    parser.add_argument("--by-name", action="store_true", help="split span types by agent, model or tool name")
+    parser.add_argument("--slowest", type=int, default=10, help="number of slowest traces to list")
+    args = parser.parse_args()
+
+    since = datetime.utcnow() - timedelta(hours=args.hours) if args.hours else None
+    spans = load_spans(args.path, since)
+    if not spans:
+        print("no spans found")
+        return
+    print_latencies(spans, args.by_name)
+    print_slowest(spans, args.slowest)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Local store for Agents SDK traces.
+
+``LocalTraceStore`` implements the SDK's ``TracingProcessor`` interface and keeps one
+row per finished trace and per finished span (agent, generation/response, function
+tool, handoff, guardrail, ...): ids, parent, type, name, start/end and duration.
+``register()`` adds it next to the SDK's default exporter. Apps call it when they
+build their agents, so importing this module does not import ``agents``.
+
+The SDK calls processors synchronously on the event loop. ``on_span_end`` and
+``on_trace_end`` therefore only build a small row and ``put_nowait`` it on a bounded
+queue. Rows are dropped and counted when the queue is full. A daemon thread drains the
+queue in batches. It writes one transaction per batch to SQLite, or appends the batch
+to a JSONL file when the path ends in ``.jsonl``.
+
+``trace_report.py`` reads either format and prints latency percentiles per span type
+and the slowest traces.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from agents.tracing import Span, Trace
+
+logger = logging.getLogger("shared.tracing")
+
+COLUMNS = ("trace_id", "span_id", "parent_id", "type", "name", "started_at", "ended_at", "duration_ms", "error")
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS spans (
+        trace_id TEXT NOT NULL,
+        span_id TEXT NOT NULL,
+        parent_id TEXT,
+        type TEXT NOT NULL,
+        name TEXT,
+        started_at TEXT,
+        ended_at TEXT,
+        duration_ms REAL,
+        error TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_spans_type_duration ON spans (type, duration_ms)",
+    "CREATE INDEX IF NOT EXISTS ix_spans_trace ON spans (trace_id)",
+)
+
+
+def span_name(span_data: Any) -> str | None:
+    if span_data.type == "handoff":
+        return f"{span_data.from_agent} -> {span_data.to_agent}"
+    if span_data.type == "generation":
+        return span_data.model
+    if span_data.type == "response":
+        return getattr(span_data.response, "model", None)
+    return getattr(span_data, "name", None)
+
+
+def duration_ms(started_at: str | None, ended_at: str | None) -> float | None:
+    if not started_at or not ended_at:
+        return None
+    elapsed = datetime.fromisoformat(ended_at) - datetime.fromisoformat(started_at)
+    return round(elapsed.total_seconds() * 1000, 3)
+
+
+class LocalTraceStore:
+    def __init__(
+        self,
+        path: str | Path,
+        enabled: bool = True,
+        batch_size: int = 256,
+        flush_interval_seconds: float = 1.0,
+        max_queue: int = 10000,
+    ) -> None:
+        self.path = Path(path)
+        self.enabled = enabled
+        self.registered = False
+        self.jsonl = self.path.suffix == ".jsonl"
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self._queue: queue.Queue[tuple[Any, ...] | threading.Event] = queue.Queue(maxsize=max_queue)
+        self._traces: dict[str, tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self._writer: threading.Thread | None = None
+        self.written = 0
+        self.dropped = 0
+
+    def register(self) -> None:
+        """Add this store to the SDK's trace processors once, if enabled."""
+        with self._lock:
+            if not self.enabled or self.registered:
+                return
+            from agents import add_trace_processor
+
+            add_trace_processor(self)
+            self.registered = True
+
+    def on_trace_start(self, trace: Trace) -> None:
+        with self._lock:
+            self._traces[trace.trace_id] = (datetime.utcnow().isoformat(), time.perf_counter())
+
+    def on_trace_end(self, trace: Trace) -> None:
+        with self._lock:
+            started = self._traces.pop(trace.trace_id, None)
+        if started is None:
+            return
+        started_at, started_perf = started
+        elapsed = round((time.perf_counter() - started_perf) * 1000, 3)
+        ended_at = datetime.utcnow().isoformat()
+        self._enqueue((trace.trace_id, trace.trace_id, None, "trace", trace.name, started_at, ended_at, elapsed, None))
+
+    def on_span_start(self, span: Span[Any]) -> None:
+        pass
+
+    def on_span_end(self, span: Span[Any]) -> None:
+        try:
+            data = span.span_data
+            error = span.error
+            row = (
+                span.trace_id,
+                span.span_id,
+                span.parent_id,
+                data.type,
+                span_name(data),
+                span.started_at,
+                span.ended_at,
+                duration_ms(span.started_at, span.ended_at),
+                error["message"] if error else None,
+            )
+        except Exception:
+            logger.debug("Could not convert span %s", getattr(span, "span_id", None), exc_info=True)
+            return
+        self._enqueue(row)
+
+    def _enqueue(self, item: tuple[Any, ...] | threading.Event) -> None:
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._drain, name="trace-store", daemon=True)
+                    self._writer.start()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self) -> None:
+        connection = None
+        if not self.jsonl:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path)
+            connection.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                connection.execute(statement)
+            connection.commit()
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval_seconds)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [item for item in batch if isinstance(item, tuple)]
+            try:
+                if rows:
+                    self._write(connection, rows)
+                    self.written += len(rows)
+            except Exception:
+                logger.exception("Could not write %d spans to %s", len(rows), self.path)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _write(self, connection: sqlite3.Connection | None, rows: list[tuple[Any, ...]]) -> None:
+        if connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as handle:
+                handle.writelines(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + "\n" for row in rows)
+            return
+        with connection:
+            connection.executemany(f"INSERT INTO spans VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+
+    def force_flush(self, timeout: float = 5.0) -> None:
+        """Block until everything queued so far is written, or ``timeout`` passes."""
+        if self._writer is None:
+            return
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def shutdown(self) -> None:
+        self.force_flush()
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "registered": self.registered,
+            "path": str(self.path),
+            "format": "jsonl" if self.jsonl else "sqlite",
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+        }
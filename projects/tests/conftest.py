@@ -0,0 +1,9 @@
+import sys
+from pathlib import Path
+
+PROJECTS = Path(__file__).resolve().parents[1]
+
+# Apps import shared modules as ``shared.*`` and their own modules as top-level names.
+for path in (PROJECTS, PROJECTS / "04_ai_automation_agency"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
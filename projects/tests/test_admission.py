@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from shared.admission import AdmissionLimiter
+from shared.lanes import lane
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def _blocking_handler(gate, order=None, label=None):
+    async def handler():
+        if order is not None:
+            order.append(label)
+        await gate.wait()
+        return label
+
+    return handler
+
+
+def test_sheds_with_429_when_queue_is_full():
+    async def scenario():
+        limiter = AdmissionLimiter("test", limit=1, queue_size=1, adaptive=False)
+        gate = asyncio.Event()
+        running = asyncio.create_task(limiter.run(_blocking_handler(gate)))
+        queued = asyncio.create_task(limiter.run(_blocking_handler(gate)))
+        await _settle()
+        with pytest.raises(HTTPException) as excinfo:
+            await limiter.run(_blocking_handler(gate))
+        gate.set()
+        await asyncio.gather(running, queued)
+        return limiter, excinfo.value
+
+    limiter, exc = asyncio.run(scenario())
+    assert exc.status_code == 429
+    assert int(exc.headers["Retry-After"]) >= 1
+    metrics = limiter.metrics()
+    assert metrics["admitted"] == 2 and metrics["shed_queue_full"] == 1
+    assert metrics["in_flight"] == 0 and metrics["queued"] == 0
+
+
+def test_queue_wait_times_out():
+    async def scenario():
+        limiter = AdmissionLimiter("test", limit=1, queue_size=4, queue_timeout=0.05, adaptive=False)
+        gate = asyncio.Event()
+        running = asyncio.create_task(limiter.run(_blocking_handler(gate)))
+        await _settle()
+        with pytest.raises(HTTPException):
+            await limiter.run(_blocking_handler(gate))
+        gate.set()
+        await running
+        return limiter.metrics()
+
+    metrics = asyncio.run(scenario())
+    assert metrics["shed_timeout"] == 1 and metrics["queued"] == 0 and metrics["in_flight"] == 0
+
+
+def test_interactive_waiters_go_before_batch():
+    async def scenario():
+        limiter = AdmissionLimiter("test", limit=1, queue_size=4, adaptive=False)
+        gate = asyncio.Event()
+        order: list[str] = []
+        running = asyncio.create_task(limiter.run(_blocking_handler(gate)))
+        await _settle()
+
+        async def submit(name, label):
+            with lane(name):
+                return await limiter.run(_blocking_handler(gate, order, label))
+
+        batch = asyncio.create_task(submit("batch", "batch"))
+        await _settle()
+        interactive = asyncio.create_task(submit("interactive", "interactive"))
+        await _settle()
+        assert limiter.metrics()["queued_by_lane"] == {"interactive": 1, "batch": 1}
+        gate.set()
+        await asyncio.gather(running, batch, interactive)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "batch"]
+
+
+def test_batch_queue_cannot_fill_interactive_queue():
+    async def scenario():
+        limiter = AdmissionLimiter("test", limit=1, queue_size=1, adaptive=False)
+        gate = asyncio.Event()
+        running = asyncio.create_task(limiter.run(_blocking_handler(gate)))
+        await _settle()
+        with lane("batch"):
+            batch = asyncio.create_task(limiter.run(_blocking_handler(gate)))
+        await _settle()
+        interactive = asyncio.create_task(limiter.run(_blocking_handler(gate)))
+        await _settle()
+        gate.set()
+        return await asyncio.gather(running, batch, interactive, return_exceptions=True)
+
+    assert not any(isinstance(result, Exception) for result in asyncio.run(scenario()))
+
+
+def test_cancelled_waiter_leaves_queue():
+    async def scenario():
+        limiter = AdmissionLimiter("test", limit=1, queue_size=4, adaptive=False)
+        gate = asyncio.Event()
+        running = asyncio.create_task(limiter.run(_blocking_handler(gate)))
+        await _settle()
+        waiting = asyncio.create_task(limiter.run(_blocking_handler(gate)))
+        await _settle()
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        gate.set()
+        await running
+        return limiter.metrics()
+
+    metrics = asyncio.run(scenario())
+    assert metrics["in_flight"] == 0 and metrics["queued"] == 0
+
+
+def test_slow_burst_decreases_limit_once():
+    limiter = AdmissionLimiter("test", limit=8, latency_target_ms=100, backoff=0.5)
+    started = 0.0
+    # Three slow runs that all started before the first decrease.
+    for _ in range(3):
+        limiter._observe(started, elapsed=1.0, failed=False)
+    assert limiter.current_limit == 4 and limiter.decreases == 1
+
+
+def test_limit_grows_only_while_saturated():
+    limiter = AdmissionLimiter("test", limit=2, max_limit=3, latency_target_ms=1000)
+    limiter._observe(0.0, elapsed=0.01, failed=False)
+    assert limiter.limit == 2.0
+
+    limiter._in_flight = 2
+    for _ in range(10):
+        limiter._observe(0.0, elapsed=0.01, failed=False)
+    assert limiter.current_limit == 3 and limiter.increases == 1
+
+
+def test_server_errors_count_as_failures():
+    async def scenario():
+        limiter = AdmissionLimiter("test", limit=4, latency_target_ms=10000, backoff=0.5)
+
+        async def broken():
+            raise HTTPException(status_code=502)
+
+        async def rejected():
+            raise HTTPException(status_code=400)
+
+        for handler in (rejected, broken):
+            with pytest.raises(HTTPException):
+                await limiter.run(handler)
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.decreases == 1 and limiter.current_limit == 2
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytest
+
+from cron import CronSchedule
+
+
+def test_every_minute_rounds_up_to_next_minute():
+    assert CronSchedule("* * * * *").next_after(datetime(2024, 1, 1, 10, 0, 30)) == datetime(2024, 1, 1, 10, 1)
+
+
+@pytest.mark.parametrize(
+    ("alias", "expected"),
+    [
+        ("@hourly", datetime(2024, 1, 1, 11, 0)),
+        ("@daily", datetime(2024, 1, 2, 0, 0)),
+        ("@weekly", datetime(2024, 1, 7, 0, 0)),
+        ("@monthly", datetime(2024, 2, 1, 0, 0)),
+        ("@yearly", datetime(2025, 1, 1, 0, 0)),
+    ],
+)
+def test_aliases(alias, expected):
+    assert CronSchedule(alias).next_after(datetime(2024, 1, 1, 10, 15)) == expected
+
+
+def test_lists_ranges_steps_and_names():
+    schedule = CronSchedule("*/15 9-17 * jan-mar mon-fri")
+    assert schedule.minutes == [0, 15, 30, 45]
+    assert schedule.hours == frozenset(range(9, 18))
+    assert schedule.months == frozenset({1, 2, 3})
+    assert schedule.weekdays == frozenset({1, 2, 3, 4, 5})
+    # Saturday evening -> Monday 09:00.
+    assert schedule.next_after(datetime(2024, 1, 6, 18, 0)) == datetime(2024, 1, 8, 9, 0)
+
+
+def test_seven_is_sunday():
+    assert CronSchedule("0 0 * * 7").weekdays == frozenset({0})
+
+
+def test_restricted_day_and_weekday_match_either():
+    # The 15th or any Monday: Monday 2024-01-08 comes first.
+    assert CronSchedule("0 0 15 * mon").next_after(datetime(2024, 1, 2)) == datetime(2024, 1, 8)
+
+
+def test_starred_step_weekday_counts_as_unrestricted():
+    # "*/2" starts with "*", so the 1st must also fall on Sun/Tue/Thu/Sat (Vixie cron)
+    # rather than either matching, which would give Thursday 2024-01-04.
+    schedule = CronSchedule("0 0 1 * */2")
+    assert schedule.next_after(datetime(2024, 1, 2)) == datetime(2024, 2, 1)
+
+
+def test_leap_day():
+    assert CronSchedule("0 0 29 2 *").next_after(datetime(2024, 3, 1)) == datetime(2028, 2, 29)
+
+
+@pytest.mark.parametrize(
+    "expression",
+    ["", "* * * *", "* * * * * *", "60 * * * *", "* 24 * * *", "*/0 * * * *", "5-1 * * * *", "a * * * *", "1,,2 * * * *"],
+)
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_never_matching_schedule_raises():
+    with pytest.raises(ValueError, match="never matches"):
+        CronSchedule("0 0 31 2 *").next_after(datetime(2024, 1, 1))
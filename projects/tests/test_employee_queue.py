@@ -0,0 +1,126 @@
+"""Claim/finish lease path of the AI Employee task queue (03_ai_employee/app.py)."""
+
+import importlib.util
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import delete
+from sqlmodel import Session
+
+APP_DIR = Path(__file__).resolve().parents[1] / "03_ai_employee"
+
+
+@pytest.fixture(scope="module")
+def employee(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("ai_employee")
+    patch = pytest.MonkeyPatch()
+    patch.setenv("DATABASE_URL", f"sqlite:///{tmp / 'tasks.db'}")
+    patch.setenv("TRACE_STORE_PATH", str(tmp / "traces.db"))
+    patch.setenv("TASK_EVENTS_BACKEND", "local")
+    patch.setenv("RUN_EMBEDDED_WORKER", "false")
+    patch.syspath_prepend(str(APP_DIR))
+    spec = importlib.util.spec_from_file_location("ai_employee_app", APP_DIR / "app.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    module.init_db()
+    yield module
+    sys.modules.pop(spec.name, None)
+    patch.undo()
+
+
+@pytest.fixture
+def session(employee):
+    with Session(employee.engine) as session:
+        session.execute(delete(employee.EmployeeTask))
+        session.commit()
+        yield session
+
+
+def _enqueue(employee, session, priority="interactive", available_at=None):
+    task = employee.EmployeeTask(task_type="write_content", description="x", priority=priority)
+    employee.enqueue_task(task, session)
+    if available_at is not None:
+        task.available_at = available_at
+        session.add(task)
+        session.commit()
+    return task.id
+
+
+def _expire_lease(employee, session, task_id):
+    task = session.get(employee.EmployeeTask, task_id)
+    task.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    session.add(task)
+    session.commit()
+
+
+def test_claim_leases_task_once(employee, session):
+    task_id = _enqueue(employee, session)
+    task, token = employee.claim_task(session, "worker-a")
+    assert task.id == task_id and task.status == "in_progress" and task.attempts == 1
+    assert task.lease_owner == token and token.startswith("worker-a:")
+    assert task.lease_expires_at > datetime.utcnow()
+    assert employee.claim_task(session, "worker-b") is None
+
+
+def test_finish_releases_lease(employee, session):
+    task_id = _enqueue(employee, session)
+    _, token = employee.claim_task(session, "worker-a")
+    assert employee.renew_lease(session, task_id, token)
+    assert employee.finish_task(session, task_id, token, status="completed", result="done")
+
+    session.expire_all()
+    task = session.get(employee.EmployeeTask, task_id)
+    assert task.status == "completed" and task.lease_owner is None and task.lease_expires_at is None
+    assert task.result_digest is not None
+    assert not employee.renew_lease(session, task_id, token)
+
+
+def test_expired_lease_is_reclaimed_and_old_worker_is_fenced(employee, session):
+    task_id = _enqueue(employee, session)
+    _, stale = employee.claim_task(session, "worker-a")
+    _expire_lease(employee, session, task_id)
+
+    task, fresh = employee.claim_task(session, "worker-b")
+    assert task.id == task_id and task.attempts == 2 and fresh != stale
+
+    assert not employee.renew_lease(session, task_id, stale)
+    assert not employee.finish_task(session, task_id, stale, status="failed", last_error="late")
+    assert employee.finish_task(session, task_id, fresh, status="completed", result="done")
+    session.expire_all()
+    task = session.get(employee.EmployeeTask, task_id)
+    assert task.status == "completed" and task.last_error is None
+
+
+def test_exhausted_task_is_failed_not_reclaimed(employee, session, monkeypatch):
+    monkeypatch.setattr(employee.settings, "task_max_attempts", 1)
+    task_id = _enqueue(employee, session)
+    employee.claim_task(session, "worker-a")
+    _expire_lease(employee, session, task_id)
+
+    assert employee.claim_task(session, "worker-b") is None
+    assert employee.fail_exhausted_tasks(session) == 1
+    session.expire_all()
+    task = session.get(employee.EmployeeTask, task_id)
+    assert task.status == "failed" and task.lease_owner is None
+
+
+def test_interactive_claimed_before_fresh_batch(employee, session):
+    batch_id = _enqueue(employee, session, priority="batch")
+    interactive_id = _enqueue(employee, session)
+    assert employee.claim_task(session, "w")[0].id == interactive_id
+    assert employee.claim_task(session, "w")[0].id == batch_id
+
+
+def test_long_waiting_batch_ranks_with_interactive(employee, session):
+    waited = datetime.utcnow() - timedelta(seconds=employee.settings.lane_max_wait_seconds + 1)
+    batch_id = _enqueue(employee, session, priority="batch", available_at=waited)
+    _enqueue(employee, session)
+    assert employee.claim_task(session, "w")[0].id == batch_id
+
+
+def test_task_not_due_is_not_claimed(employee, session):
+    _enqueue(employee, session, available_at=datetime.utcnow() + timedelta(minutes=5))
+    assert employee.claim_task(session, "w") is None
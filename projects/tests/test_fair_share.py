@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from fair_share import ClientQueueFull, FairShareLimiter
+
+
+async def _hold(limiter, client, order, release):
+    async with limiter.slot(client):
+        order.append(client)
+        await release.wait()
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def _run_behind_blocker(limiter, clients):
+    """Queue ``clients`` behind one running request, then let them run; returns admission order."""
+
+    async def scenario():
+        order: list[str] = []
+
+        async def run(client):
+            async with limiter.slot(client):
+                order.append(client)
+                await asyncio.sleep(0)
+
+        gate = asyncio.Event()
+        blocker = asyncio.create_task(_hold(limiter, "blocker", order, gate))
+        await _settle()
+        tasks = [asyncio.create_task(run(client)) for client in clients]
+        await _settle()
+        gate.set()
+        await asyncio.gather(blocker, *tasks)
+        return order[1:]
+
+    return asyncio.run(scenario())
+
+
+def test_burst_client_does_not_starve_others():
+    limiter = FairShareLimiter(total_concurrency=1, client_concurrency=1, client_queue_limit=10)
+    order = _run_behind_blocker(limiter, ["big"] * 4 + ["small"] * 2)
+    # Round-robin: the small client gets every other slot instead of waiting behind the burst.
+    assert order == ["big", "small", "big", "small", "big", "big"]
+
+
+def test_weight_grants_consecutive_turns():
+    limiter = FairShareLimiter(total_concurrency=1, client_concurrency=1, client_queue_limit=10, weights={"heavy": 2})
+    order = _run_behind_blocker(limiter, ["heavy"] * 4 + ["light"] * 2)
+    assert order == ["heavy", "heavy", "light", "heavy", "heavy", "light"]
+
+
+def test_client_queue_limit():
+    async def scenario():
+        limiter = FairShareLimiter(total_concurrency=1, client_concurrency=1, client_queue_limit=1)
+        gate = asyncio.Event()
+        order: list[str] = []
+        first = asyncio.create_task(_hold(limiter, "a", order, gate))
+        await _settle()
+        queued = asyncio.create_task(_hold(limiter, "a", order, gate))
+        await _settle()
+        with pytest.raises(ClientQueueFull):
+            async with limiter.slot("a"):
+                pass
+        gate.set()
+        await asyncio.gather(first, queued)
+        return limiter.metrics()
+
+    metrics = asyncio.run(scenario())
+    assert metrics["running"] == 0
+    assert metrics["clients"]["a"]["admitted"] == 2
+    assert metrics["clients"]["a"]["rejected"] == 1
+
+
+def test_cancelled_waiter_releases_nothing_and_frees_queue():
+    async def scenario():
+        limiter = FairShareLimiter(total_concurrency=1, client_concurrency=1, client_queue_limit=5)
+        gate = asyncio.Event()
+        order: list[str] = []
+        holder = asyncio.create_task(_hold(limiter, "a", order, gate))
+        await _settle()
+        waiter = asyncio.create_task(_hold(limiter, "b", order, gate))
+        await _settle()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        gate.set()
+        await holder
+        return limiter, order
+
+    limiter, order = asyncio.run(scenario())
+    assert order == ["a"]
+    assert limiter.metrics()["running"] == 0
+    assert limiter._queues == {} and not limiter._ring
+
+
+def test_idle_client_stats_are_bounded():
+    async def scenario():
+        limiter = FairShareLimiter(
+            total_concurrency=4, client_concurrency=1, client_queue_limit=1, max_tracked_clients=3
+        )
+        for i in range(10):
+            async with limiter.slot(f"client-{i}"):
+                pass
+        return limiter.metrics()["clients"]
+
+    assert list(asyncio.run(scenario())) == ["client-7", "client-8", "client-9"]
@@ -0,0 +1,144 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlmodel import Session, create_engine
+
+from shared.idempotency import IdempotencyRecord, IdempotencyStore, request_hash
+
+
+class Reply(BaseModel):
+    value: int
+
+
+@pytest.fixture
+def store(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'idempotency.db'}")
+    IdempotencyRecord.__table__.create(engine)
+    return IdempotencyStore(engine, ttl_seconds=60, wait_seconds=2.0, lease_seconds=0.3)
+
+
+def _counting_handler(calls, delay=0.0):
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return Reply(value=len(calls))
+
+    return handler
+
+
+def test_repeat_replays_stored_response(store):
+    calls = []
+
+    async def scenario():
+        first = await store.run("s", "k", {"a": 1}, Reply, _counting_handler(calls))
+        second = await store.run("s", "k", {"a": 1}, Reply, _counting_handler(calls))
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == (Reply(value=1), False)
+    assert second == (Reply(value=1), True)
+    assert len(calls) == 1
+
+
+def test_key_reused_with_different_body_is_rejected(store):
+    async def scenario():
+        await store.run("s", "k", {"a": 1}, Reply, _counting_handler([]))
+        await store.run("s", "k", {"a": 2}, Reply, _counting_handler([]))
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(scenario())
+    assert excinfo.value.status_code == 422
+
+
+def test_no_key_always_runs(store):
+    calls = []
+
+    async def scenario():
+        for _ in range(2):
+            assert (await store.run("s", None, {}, Reply, _counting_handler(calls)))[1] is False
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_overlong_key_is_rejected(store):
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(store.run("s", "k" * 256, {}, Reply, _counting_handler([])))
+    assert excinfo.value.status_code == 400
+
+
+def test_concurrent_repeat_waits_for_first(store):
+    calls = []
+
+    async def scenario():
+        return await asyncio.gather(
+            store.run("s", "k", {}, Reply, _counting_handler(calls, delay=0.2)),
+            store.run("s", "k", {}, Reply, _counting_handler(calls, delay=0.2)),
+        )
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert sorted(replayed for _, replayed in results) == [False, True]
+
+
+def test_failed_handler_releases_key(store):
+    async def failing():
+        raise RuntimeError("boom")
+
+    calls = []
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await store.run("s", "k", {}, Reply, failing)
+        return await store.run("s", "k", {}, Reply, _counting_handler(calls))
+
+    assert asyncio.run(scenario()) == (Reply(value=1), False)
+
+
+def test_heartbeat_keeps_lease_alive(store):
+    async def scenario():
+        return await store.run("s", "k", {}, Reply, _counting_handler([], delay=1.0))
+
+    # The run takes several lease periods; renewals keep the row owned until completion.
+    assert asyncio.run(scenario()) == (Reply(value=1), False)
+    assert store._get("s", "k").status == "completed"
+
+
+def test_lapsed_lease_is_taken_over(store):
+    with Session(store.engine) as session:
+        session.add(
+            IdempotencyRecord(
+                scope="s",
+                key="k",
+                request_hash=request_hash({}),
+                owner="crashed",
+                expires_at=datetime.utcnow() - timedelta(seconds=1),
+            )
+        )
+        session.commit()
+
+    assert asyncio.run(store.run("s", "k", {}, Reply, _counting_handler([]))) == (Reply(value=1), False)
+    assert store._get("s", "k").owner != "crashed"
+
+
+def test_previous_owner_cannot_touch_taken_over_row(store):
+    digest = request_hash({})
+    old_token, _ = store._claim("s", "k", digest)
+    with Session(store.engine) as session:
+        row = session.get(IdempotencyRecord, ("s", "k"))
+        row.expires_at = datetime.utcnow() - timedelta(seconds=1)
+        session.add(row)
+        session.commit()
+    new_token, existing = store._claim("s", "k", digest)
+    assert existing is None and new_token != old_token
+
+    assert store._renew("s", "k", old_token) is False
+    assert store._complete("s", "k", old_token, Reply(value=9).model_dump_json()) is False
+    store._release("s", "k", old_token)
+
+    row = store._get("s", "k")
+    assert row.owner == new_token and row.status == "in_progress" and row.response_json is None
+    assert store._complete("s", "k", new_token, Reply(value=1).model_dump_json()) is True